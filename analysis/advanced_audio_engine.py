@@ -11,6 +11,7 @@ import scipy.signal
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional, Any, Union
 import asyncio
+import os
 import json
 import logging
 from dataclasses import dataclass, asdict
@@ -37,6 +38,26 @@ except ImportError:
     MUTAGEN_AVAILABLE = False
     logging.warning("mutagen not available - limited metadata support")
 
+from audio_cache import AudioCache, ByteBudgetLRU
+
+# Waveform peak pyramid and spectral front-end (shared with the backend)
+from backend_services import load_backend_service
+
+try:
+    SpectralContext = load_backend_service('spectral_context').SpectralContext
+    SPECTRAL_CONTEXT_AVAILABLE = True
+except ImportError:
+    SPECTRAL_CONTEXT_AVAILABLE = False
+    logging.warning("spectral front-end not available - spectra computed per analysis")
+
+try:
+    _waveform_peaks = load_backend_service('waveform_peaks')
+    PeakPyramid, build_peaks = _waveform_peaks.PeakPyramid, _waveform_peaks.build_peaks
+    WAVEFORM_PEAKS_AVAILABLE = True
+except ImportError:
+    WAVEFORM_PEAKS_AVAILABLE = False
+    logging.warning("waveform peak pyramid not available - peaks computed per request")
+
 logger = logging.getLogger(__name__)
 
 class AudioFormat(Enum):
@@ -120,10 +141,20 @@ class AudioEngine:
     def __init__(self, max_workers: int = 4):
         self.max_workers = max_workers
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
-        self.loaded_audio: Dict[str, np.ndarray] = {}
+        # Byte-budgeted caches; decoded audio is memory-mapped from spill files
+        self.loaded_audio = AudioCache()
         self.audio_specs: Dict[str, AudioSpecs] = {}
-        self.waveform_cache: Dict[str, WaveformData] = {}
-        self.analysis_cache: Dict[str, Dict] = {}
+        self.waveform_cache = ByteBudgetLRU(
+            'waveform', int(os.getenv('WAVEFORM_CACHE_MAX_BYTES', 256 * 1024 ** 2)))
+        self.peak_pyramids = ByteBudgetLRU(  # audio_id -> PeakPyramid
+            'peaks', int(os.getenv('PEAK_CACHE_MAX_BYTES', 64 * 1024 ** 2)))
+        self.analysis_cache = ByteBudgetLRU(
+            'analysis', int(os.getenv('ANALYSIS_CACHE_MAX_BYTES', 64 * 1024 ** 2)))
+        self.spectral_contexts = ByteBudgetLRU(  # audio_id -> SpectralContext
+            'spectral', int(os.getenv('SPECTRAL_CACHE_MAX_BYTES', 256 * 1024 ** 2)),
+            sizeof=lambda context: context.nbytes)
+        self._spectral_locks: Dict[str, threading.Lock] = {}
+        self._spectral_locks_guard = threading.Lock()
         
         # Audio processing settings
         self.default_sr = 44100
@@ -154,13 +185,26 @@ class AudioEngine:
             return file_id
         
         try:
-            # Detect format and load
-            specs, audio_data = await self._load_with_format_detection(file_path, target_sr)
+            # Map previously decoded content, or detect format, load and spill
+            def _load():
+                content_key = AudioCache.content_key(file_path, target_sr)
+                
+                def _decode():
+                    specs, audio_data = self._decode_audio(file_path, target_sr)
+                    return audio_data, asdict(specs)
+                
+                return AudioSpecs(**self.loaded_audio.load(file_id, content_key, _decode))
             
-            # Store audio data and specs
-            self.loaded_audio[file_id] = audio_data
+            loop = asyncio.get_event_loop()
+            specs = await loop.run_in_executor(self.executor, _load)
+            
+            # Store specs (audio stays in the audio cache)
             self.audio_specs[file_id] = specs
             
+            # Peak pyramid for every later zoom level, built once per file
+            if WAVEFORM_PEAKS_AVAILABLE:
+                await loop.run_in_executor(self.executor, self._get_peak_pyramid, file_id)
+            
             logger.info(f"Loaded audio: {file_path.name} ({specs.duration:.2f}s, {specs.sample_rate}Hz)")
             return file_id
             
@@ -168,91 +212,86 @@ class AudioEngine:
             logger.error(f"Failed to load audio {file_path}: {e}")
             raise
 
-    async def _load_with_format_detection(self, file_path: Path, target_sr: Optional[int]) -> Tuple[AudioSpecs, np.ndarray]:
-        """Load audio with automatic format detection and conversion"""
-        
-        def _load_audio():
-            # Try librosa first (handles most formats)
-            try:
-                audio_data, sr = librosa.load(str(file_path), sr=target_sr, mono=False)
-                
-                # Handle mono/stereo
-                if audio_data.ndim == 1:
-                    channels = 1
-                else:
-                    channels = audio_data.shape[0]
-                    # Convert to mono for processing (mix down)
-                    audio_data = librosa.to_mono(audio_data)
-                
-                duration = len(audio_data) / sr
-                
-                specs = AudioSpecs(
-                    sample_rate=sr,
-                    channels=channels,
-                    bit_depth=32,  # librosa loads as float32
-                    duration=duration,
-                    format=file_path.suffix.lower()[1:],
-                    file_size=file_path.stat().st_size
-                )
-                
-                return specs, audio_data
-                
-            except Exception as librosa_error:
-                logger.warning(f"librosa failed: {librosa_error}")
-                
-                # Fallback to pydub for problematic formats
-                if PYDUB_AVAILABLE:
-                    try:
-                        audio_segment = AudioSegment.from_file(str(file_path))
-                        
-                        # Convert to numpy array
-                        audio_data = np.array(audio_segment.get_array_of_samples(), dtype=np.float32)
-                        
-                        # Normalize to [-1, 1]
-                        audio_data = audio_data / (2**(audio_segment.sample_width * 8 - 1))
-                        
-                        # Handle stereo
-                        if audio_segment.channels == 2:
-                            audio_data = audio_data.reshape((-1, 2))
-                            audio_data = np.mean(audio_data, axis=1)  # Mix to mono
-                        
-                        # Resample if needed
-                        if target_sr and audio_segment.frame_rate != target_sr:
-                            audio_data = librosa.resample(audio_data, 
-                                                        orig_sr=audio_segment.frame_rate, 
-                                                        target_sr=target_sr)
-                            sr = target_sr
-                        else:
-                            sr = audio_segment.frame_rate
-                        
-                        specs = AudioSpecs(
-                            sample_rate=sr,
-                            channels=audio_segment.channels,
-                            bit_depth=audio_segment.sample_width * 8,
-                            duration=len(audio_segment) / 1000.0,
-                            format=file_path.suffix.lower()[1:],
-                            file_size=file_path.stat().st_size
-                        )
-                        
-                        return specs, audio_data
-                        
-                    except Exception as pydub_error:
-                        logger.error(f"pydub also failed: {pydub_error}")
-                        raise Exception(f"Could not load audio file: {file_path}")
-                
-                else:
-                    raise librosa_error
-        
-        # Run in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, _load_audio)
+    def _decode_audio(self, file_path: Path, target_sr: Optional[int]) -> Tuple[AudioSpecs, np.ndarray]:
+        """Decode an audio file (blocking), trying librosa then pydub"""
+        # Try librosa first (handles most formats)
+        try:
+            audio_data, sr = librosa.load(str(file_path), sr=target_sr, mono=False)
+            
+            # Handle mono/stereo
+            if audio_data.ndim == 1:
+                channels = 1
+            else:
+                channels = audio_data.shape[0]
+                # Convert to mono for processing (mix down)
+                audio_data = librosa.to_mono(audio_data)
+            
+            duration = len(audio_data) / sr
+            
+            specs = AudioSpecs(
+                sample_rate=sr,
+                channels=channels,
+                bit_depth=32,  # librosa loads as float32
+                duration=duration,
+                format=file_path.suffix.lower()[1:],
+                file_size=file_path.stat().st_size
+            )
+            
+            return specs, audio_data
+            
+        except Exception as librosa_error:
+            logger.warning(f"librosa failed: {librosa_error}")
+            
+            # Fallback to pydub for problematic formats
+            if PYDUB_AVAILABLE:
+                try:
+                    audio_segment = AudioSegment.from_file(str(file_path))
+                    
+                    # Convert to numpy array
+                    audio_data = np.array(audio_segment.get_array_of_samples(), dtype=np.float32)
+                    
+                    # Normalize to [-1, 1]
+                    audio_data = audio_data / (2**(audio_segment.sample_width * 8 - 1))
+                    
+                    # Handle stereo
+                    if audio_segment.channels == 2:
+                        audio_data = audio_data.reshape((-1, 2))
+                        audio_data = np.mean(audio_data, axis=1)  # Mix to mono
+                    
+                    # Resample if needed
+                    if target_sr and audio_segment.frame_rate != target_sr:
+                        audio_data = librosa.resample(audio_data, 
+                                                    orig_sr=audio_segment.frame_rate, 
+                                                    target_sr=target_sr)
+                        sr = target_sr
+                    else:
+                        sr = audio_segment.frame_rate
+                    
+                    specs = AudioSpecs(
+                        sample_rate=sr,
+                        channels=audio_segment.channels,
+                        bit_depth=audio_segment.sample_width * 8,
+                        duration=len(audio_segment) / 1000.0,
+                        format=file_path.suffix.lower()[1:],
+                        file_size=file_path.stat().st_size
+                    )
+                    
+                    return specs, audio_data
+                    
+                except Exception as pydub_error:
+                    logger.error(f"pydub also failed: {pydub_error}")
+                    raise Exception(f"Could not load audio file: {file_path}")
+            
+            else:
+                raise librosa_error
 
     async def generate_waveform_data(self, audio_id: str, zoom_level: float = 1.0) -> WaveformData:
         """Generate comprehensive waveform data for visualization"""
         
         cache_key = f"{audio_id}_waveform_{zoom_level}"
-        if cache_key in self.waveform_cache:
-            return self.waveform_cache[cache_key]
+        cached = self.waveform_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         if audio_id not in self.loaded_audio:
             raise ValueError(f"Audio not loaded: {audio_id}")
@@ -273,18 +312,26 @@ class AudioEngine:
                 vis_audio = audio_data
                 vis_sr = sr
             
-            # Calculate peaks (for waveform outline)
-            window_size = max(1, len(vis_audio) // 1000)
-            peaks = np.array([
-                np.max(np.abs(vis_audio[i:i+window_size])) 
-                for i in range(0, len(vis_audio), window_size)
-            ])
-            
-            # Calculate RMS (for average energy)
-            rms = np.array([
-                np.sqrt(np.mean(vis_audio[i:i+window_size]**2))
-                for i in range(0, len(vis_audio), window_size)
-            ])
+            pyramid = self._get_peak_pyramid(audio_id)
+            if pyramid is not None:
+                # Peaks and RMS (waveform outline and average energy) of the
+                # full-resolution audio, read from the pyramid
+                overview = pyramid.query(0, None, 1000)
+                peaks = np.maximum(np.abs(overview['min']), np.abs(overview['max']))
+                rms = overview['rms']
+            else:
+                # Calculate peaks (for waveform outline)
+                window_size = max(1, len(vis_audio) // 1000)
+                peaks = np.array([
+                    np.max(np.abs(vis_audio[i:i+window_size])) 
+                    for i in range(0, len(vis_audio), window_size)
+                ])
+                
+                # Calculate RMS (for average energy)
+                rms = np.array([
+                    np.sqrt(np.mean(vis_audio[i:i+window_size]**2))
+                    for i in range(0, len(vis_audio), window_size)
+                ])
             
             # Spectral features
             spectral_centroid = librosa.feature.spectral_centroid(
@@ -324,6 +371,50 @@ class AudioEngine:
         logger.info(f"Generated waveform data for {audio_id} (zoom: {zoom_level})")
         return waveform_data
 
+    async def get_waveform_peaks(self, audio_id: str, start_time: float = 0.0,
+                                 end_time: Optional[float] = None, pixels: int = 1000) -> Dict[str, Any]:
+        """min/max/RMS per pixel for any time range, read from the peak pyramid"""
+        if audio_id not in self.loaded_audio:
+            raise ValueError(f"Audio not loaded: {audio_id}")
+        if not WAVEFORM_PEAKS_AVAILABLE:
+            raise RuntimeError("Waveform peak pyramid not available")
+        
+        loop = asyncio.get_event_loop()
+        pyramid = await loop.run_in_executor(self.executor, self._get_peak_pyramid, audio_id)
+        sr = pyramid.sample_rate
+        end_sample = None if end_time is None else int(end_time * sr)
+        return pyramid.query(int(max(start_time, 0.0) * sr), end_sample, pixels)
+
+    def _get_peak_pyramid(self, audio_id: str):
+        """Cached peak pyramid of loaded audio, rebuilt if it was evicted"""
+        if not WAVEFORM_PEAKS_AVAILABLE:
+            return None
+        pyramid = self.peak_pyramids.get(audio_id)
+        if pyramid is None:
+            pyramid = PeakPyramid.from_audio(self.loaded_audio[audio_id],
+                                             self.audio_specs[audio_id].sample_rate)
+            self.peak_pyramids[audio_id] = pyramid
+        return pyramid
+
+    def _get_spectral_context(self, audio_id: str) -> Optional['SpectralContext']:
+        """Shared STFT/mel/onset front-end of loaded audio, computed once per file
+        
+        None when the backend front-end is not available.
+        """
+        if not SPECTRAL_CONTEXT_AVAILABLE:
+            return None
+        with self._spectral_locks_guard:
+            lock = self._spectral_locks.setdefault(audio_id, threading.Lock())
+        # Concurrent analyses of the same file wait for a single computation
+        with lock:
+            context = self.spectral_contexts.get(audio_id)
+            if context is None:
+                context = SpectralContext(self.loaded_audio[audio_id], self.audio_specs[audio_id].sample_rate,
+                                          n_fft=self.default_n_fft, hop_length=self.default_hop_length,
+                                          keep_stft=False)
+                self.spectral_contexts[audio_id] = context
+            return context
+
     async def detect_drum_hits(self, audio_id: str, sophistication_level: float = 0.887) -> List[DrumHit]:
         """Advanced drum hit detection using AI-enhanced analysis"""
         
@@ -331,25 +422,28 @@ class AudioEngine:
             raise ValueError(f"Audio not loaded: {audio_id}")
         
         def _detect_hits():
-            audio_data = self.loaded_audio[audio_id]
-            specs = self.audio_specs[audio_id]
-            sr = specs.sample_rate
+            spectral = self._get_spectral_context(audio_id)
             
             hits = []
             
-            # Enhanced onset detection
-            onset_frames = librosa.onset.onset_detect(
-                y=audio_data, sr=sr,
-                hop_length=self.default_hop_length,
-                backtrack=True,
-                units='frames'
-            )
-            
-            onset_times = librosa.frames_to_time(onset_frames, sr=sr, hop_length=self.default_hop_length)
-            
-            # Get spectral features for classification
-            stft = librosa.stft(audio_data, hop_length=self.default_hop_length, n_fft=self.default_n_fft)
-            magnitude = np.abs(stft)
+            if spectral is not None:
+                sr = spectral.sr
+                
+                # Enhanced onset detection
+                onset_times = spectral.onset_times(backtrack=True)
+                
+                # Get spectral features for classification
+                magnitude = spectral.magnitude
+                freq_bins = spectral.fft_frequencies()
+            else:
+                audio_data = self.loaded_audio[audio_id]
+                sr = self.audio_specs[audio_id].sample_rate
+                onset_times = librosa.onset.onset_detect(
+                    y=audio_data, sr=sr, hop_length=self.default_hop_length, backtrack=True, units='time'
+                )
+                magnitude = np.abs(librosa.stft(audio_data, hop_length=self.default_hop_length,
+                                                n_fft=self.default_n_fft))
+                freq_bins = librosa.fft_frequencies(sr=sr, n_fft=self.default_n_fft)
             
             for onset_time in onset_times:
                 # Get the frame closest to onset
@@ -358,7 +452,6 @@ class AudioEngine:
                 if frame_idx < magnitude.shape[1]:
                     # Analyze frequency content at this onset
                     frame_magnitude = magnitude[:, frame_idx]
-                    freq_bins = librosa.fft_frequencies(sr=sr, n_fft=self.default_n_fft)
                     
                     # Classify drum type based on frequency content
                     drum_type, confidence = self._classify_drum_hit(frame_magnitude, freq_bins, sophistication_level)
@@ -441,17 +534,17 @@ class AudioEngine:
             raise ValueError(f"Audio not loaded: {audio_id}")
         
         def _analyze_tempo():
-            audio_data = self.loaded_audio[audio_id]
             specs = self.audio_specs[audio_id]
-            sr = specs.sample_rate
             
-            # Use onset detection for tempo tracking
-            onset_frames = librosa.onset.onset_detect(
-                y=audio_data, sr=sr, hop_length=self.default_hop_length
-            )
-            
-            # Convert to time
-            onset_times = librosa.frames_to_time(onset_frames, sr=sr, hop_length=self.default_hop_length)
+            # Use onset detection for tempo tracking (shared onset envelope)
+            spectral = self._get_spectral_context(audio_id)
+            if spectral is not None:
+                onset_times = spectral.onset_times()
+            else:
+                onset_times = librosa.onset.onset_detect(
+                    y=self.loaded_audio[audio_id], sr=specs.sample_rate,
+                    hop_length=self.default_hop_length, units='time'
+                )
             
             # Analyze tempo in segments
             segment_length = 8.0  # 8 second segments
@@ -601,6 +694,10 @@ class AudioEngine:
                 
                 # Export with soundfile
                 sf.write(str(output_file), audio_data, sample_rate, subtype=subtype)
+                
+                # Peak sidecar next to the stem for the WebDAW overview
+                if WAVEFORM_PEAKS_AVAILABLE:
+                    build_peaks(output_file, audio_data, sample_rate)
             
             return output_file
         
@@ -626,6 +723,16 @@ class AudioEngine:
             raise ValueError(f"Audio not loaded: {audio_id}")
         return self.audio_specs[audio_id]
 
+    def get_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss/eviction counters and sizes of every engine cache"""
+        return {
+            'audio': self.loaded_audio.stats(),
+            'waveform': self.waveform_cache.stats(),
+            'peaks': self.peak_pyramids.stats(),
+            'analysis': self.analysis_cache.stats(),
+            'spectral': self.spectral_contexts.stats()
+        }
+
     def get_supported_formats(self) -> List[str]:
         """Get list of supported audio formats"""
         formats = [fmt.value for fmt in AudioFormat]
@@ -639,7 +746,9 @@ class AudioEngine:
         self.loaded_audio.clear()
         self.audio_specs.clear()
         self.waveform_cache.clear()
+        self.peak_pyramids.clear()
         self.analysis_cache.clear()
+        self.spectral_contexts.clear()
         self.executor.shutdown(wait=True)
         logger.info("AudioEngine cleaned up")
 
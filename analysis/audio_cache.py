@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+DrumTracKAI Audio Cache
+Byte-budgeted LRU caches for the audio engine, with decoded audio spilled to
+memory-mapped float32 files keyed by content hash
+"""
+
+import os
+import sys
+import json
+import hashlib
+import tempfile
+import threading
+import dataclasses
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump when decoding changes what a spilled file contains
+AUDIO_CACHE_VERSION = 1
+
+def estimate_nbytes(value: Any, _seen: Optional[set] = None) -> int:
+    """Approximate memory held by a cached value (arrays, dataclasses, containers)"""
+    _seen = set() if _seen is None else _seen
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        # Views and memory maps do not own their bytes in the heap, but they
+        # still pin them; count what they expose
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_nbytes(k, _seen) + estimate_nbytes(v, _seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v, _seen) for v in value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return sys.getsizeof(value) + sum(
+            estimate_nbytes(getattr(value, f.name), _seen) for f in dataclasses.fields(value))
+    if hasattr(value, '__dict__') and not isinstance(value, type):
+        return sys.getsizeof(value) + estimate_nbytes(vars(value), _seen)
+    return sys.getsizeof(value)
+
+_MISSING = object()
+
+class ByteBudgetLRU:
+    """Dict-like LRU bounded by the estimated bytes of its values
+
+    Reads refresh recency; inserting past ``max_bytes`` evicts least recently
+    used entries. A single value larger than the budget is not cached.
+    """
+
+    def __init__(self, name: str, max_bytes: int, sizeof: Callable[[Any], int] = estimate_nbytes):
+        self.name = name
+        self.max_bytes = int(max_bytes)
+        self._sizeof = sizeof
+        self._entries: "OrderedDict[Any, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        size = self._sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+class AudioCache:
+    """Decoded audio by audio id, backed by memory-mapped ``.f32`` files
+
+    Each decoded signal is written once to ``<content_key>.f32`` (raw
+    little-endian float32) with a ``.json`` holding its shape and specs, and
+    served as a read-only memory map. Mapped signals sit in an LRU bounded by
+    ``max_bytes``; an evicted signal is re-mapped from its file on the next
+    access, and a new process that loads the same file content maps it
+    instead of decoding. Spill files are pruned to ``disk_max_bytes``, least
+    recently used first; audio whose file was pruned is decoded again with
+    the loader it was registered with.
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_bytes: Optional[int] = None,
+                 disk_max_bytes: Optional[int] = None):
+        self.root = Path(root or os.getenv(
+            'AUDIO_CACHE_DIR', str(Path(tempfile.gettempdir()) / 'drumtrackai_audio_cache')
+        ))
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.disk_max_bytes = disk_max_bytes or int(os.getenv('AUDIO_CACHE_DISK_BYTES', 4 * 1024 ** 3))
+        self._mapped = ByteBudgetLRU('audio', max_bytes or int(os.getenv('AUDIO_CACHE_MAX_BYTES', 1024 ** 3)),
+                                     sizeof=lambda audio: audio.nbytes)
+        self._sources: Dict[str, Tuple[str, Callable]] = {}  # audio_id -> (content_key, loader)
+        self._lock = threading.Lock()
+        self.remaps = 0
+        self.decodes = 0
+
+    @staticmethod
+    def content_key(file_path: Path, *params: Any) -> str:
+        """Key of a file's decoded audio: its content hash plus decode params"""
+        blob = json.dumps([AUDIO_CACHE_VERSION, file_digest(Path(file_path)), *params], default=str)
+        return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+    def load(self, audio_id: str, content_key: str,
+             loader: Callable[[], Tuple[np.ndarray, Dict[str, Any]]]) -> Dict[str, Any]:
+        """Register an audio id and make its audio available; returns its metadata
+
+        Maps the spilled file when one exists for ``content_key``; otherwise
+        calls ``loader()`` -> (audio, metadata) and spills the result.
+        """
+        with self._lock:
+            self._sources[audio_id] = (content_key, loader)
+        audio, metadata = self._materialize(content_key, loader)
+        self._mapped[audio_id] = audio
+        return metadata
+
+    def _materialize(self, content_key: str, loader: Callable) -> Tuple[np.ndarray, Dict[str, Any]]:
+        mapped = self._map(content_key)
+        if mapped is not None:
+            with self._lock:
+                self.remaps += 1
+            return mapped
+        with self._lock:
+            self.decodes += 1
+        audio, metadata = loader()
+        return self._spill(content_key, np.asarray(audio, dtype=np.float32), metadata), metadata
+
+    def _paths(self, content_key: str) -> Tuple[Path, Path]:
+        return self.root / f"{content_key}.f32", self.root / f"{content_key}.json"
+
+    def _map(self, content_key: str) -> Optional[Tuple[np.ndarray, Dict[str, Any]]]:
+        data_path, meta_path = self._paths(content_key)
+        try:
+            meta = json.loads(meta_path.read_text())
+            shape = tuple(meta['shape'])
+            if data_path.stat().st_size != int(np.prod(shape)) * 4:
+                return None
+            audio = (np.memmap(data_path, dtype='<f4', mode='r', shape=shape).view(np.ndarray)
+                     if np.prod(shape) else np.zeros(shape, dtype=np.float32))
+            os.utime(meta_path)  # mark as recently used for pruning
+            return audio, meta['metadata']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _spill(self, content_key: str, audio: np.ndarray, metadata: Dict[str, Any]) -> np.ndarray:
+        """Write decoded audio and map it; falls back to the in-memory buffer"""
+        data_path, meta_path = self._paths(content_key)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            tmp = data_path.with_name(data_path.name + suffix)
+            audio.astype('<f4', copy=False).tofile(tmp)
+            os.replace(tmp, data_path)
+            tmp = meta_path.with_name(meta_path.name + suffix)
+            tmp.write_text(json.dumps({'shape': list(audio.shape), 'metadata': metadata}, default=str))
+            # The metadata is published last, so a reader never maps a partial file
+            os.replace(tmp, meta_path)
+            self._prune()
+            mapped = self._map(content_key)
+            if mapped is not None:
+                return mapped[0]
+        except OSError as e:
+            logger.warning(f"Failed to spill audio to cache: {e}")
+            tmp.unlink(missing_ok=True)
+        audio.flags.writeable = False
+        return audio
+
+    def _prune(self):
+        """Remove the least recently used spill files beyond the disk budget"""
+        entries = []
+        total = 0
+        for meta_path in self.root.glob('*.json'):
+            data_path = meta_path.with_suffix('.f32')
+            try:
+                size = data_path.stat().st_size + meta_path.stat().st_size
+                entries.append((meta_path.stat().st_mtime, size, meta_path, data_path))
+            except OSError:
+                continue
+            total += size
+        entries.sort()
+        # Mapped buffers stay valid after their file is unlinked
+        while total > self.disk_max_bytes and len(entries) > 1:
+            _, size, meta_path, data_path = entries.pop(0)
+            meta_path.unlink(missing_ok=True)
+            data_path.unlink(missing_ok=True)
+            total -= size
+
+    def __contains__(self, audio_id: str) -> bool:
+        with self._lock:
+            return audio_id in self._sources
+
+    def __getitem__(self, audio_id: str) -> np.ndarray:
+        audio = self._mapped.get(audio_id)
+        if audio is not None:
+            return audio
+        with self._lock:
+            source = self._sources.get(audio_id)
+        if source is None:
+            raise KeyError(audio_id)
+        audio, _ = self._materialize(*source)
+        self._mapped[audio_id] = audio
+        return audio
+
+    def clear(self):
+        """Forget every audio id (spill files stay for later loads)"""
+        with self._lock:
+            self._sources.clear()
+        self._mapped.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._mapped.stats()
+        with self._lock:
+            stats.update({
+                'registered': len(self._sources),
+                'remaps': self.remaps,
+                'decodes': self.decodes,
+            })
+        disk_bytes = 0
+        for data_path in self.root.glob('*.f32'):
+            try:
+                disk_bytes += data_path.stat().st_size
+            except OSError:
+                continue
+        stats['disk_bytes'] = disk_bytes
+        stats['disk_max_bytes'] = self.disk_max_bytes
+        return stats
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Backend Service Loader for DrumTracKAI v1.1.7
+=============================================
+
+Loads self-contained modules from backend/backend/app/services (waveform
+peaks, spectral front-end) into the analysis tools by file path, under
+private module names. sys.path is left alone, so a different top-level
+``app`` package elsewhere can neither shadow them nor be shadowed.
+"""
+
+import sys
+import importlib.util
+from pathlib import Path
+from types import ModuleType
+
+BACKEND_SERVICES_DIR = Path(__file__).resolve().parent.parent / "backend" / "backend" / "app" / "services"
+
+def load_backend_service(name: str) -> ModuleType:
+    """Import backend service module ``name``; ImportError if it is not available"""
+    module_name = f"_drumtrackai_backend_{name}"
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+
+    path = BACKEND_SERVICES_DIR / f"{name}.py"
+    if not path.is_file():
+        raise ImportError(f"Backend service {name} not found at {path}")
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Hit-Type Model Store for DrumTracKAI v1.1.7
+==========================================
+
+Persisted, versioned hit-type classifiers so analyzer processes start warm:
+- One fitted classifier + feature scaler per drum type, serialized with joblib
+- Metadata per drum type: feature-schema version, feature names, scikit-learn
+  version and a digest of the training data
+- Stale models (schema, feature layout or scikit-learn changed) are ignored
+- Models trained on placeholder data are kept in memory only, so labelled
+  samples added to the sample database are used as soon as they exist
+- Arrays are memory-mapped on load where the estimator allows it
+- One loaded copy per process, shared by every analyzer and worker thread
+
+Pre-build the store from the sample database:
+    python hit_type_model_store.py build [--db drum_samples.db] [--drum-types snare hihat]
+    python hit_type_model_store.py list
+"""
+
+import os
+import json
+import hashlib
+import argparse
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, List, Tuple, Optional, Any, Callable
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import joblib
+import sklearn
+
+logger = logging.getLogger(__name__)
+
+# Bump when feature extraction changes what a feature matrix column means
+FEATURE_SCHEMA_VERSION = 1
+
+# Training source of models fitted without labelled samples
+PLACEHOLDER_SOURCE = 'placeholder'
+
+def training_digest(X: np.ndarray, y: np.ndarray, feature_names: List[str]) -> str:
+    """SHA-256 of a training set and the feature layout it was built with"""
+    h = hashlib.sha256()
+    h.update(json.dumps([FEATURE_SCHEMA_VERSION, list(feature_names)]).encode('utf-8'))
+    h.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    h.update(json.dumps([str(label) for label in y]).encode('utf-8'))
+    return h.hexdigest()
+
+@dataclass
+class StoredModel:
+    """A fitted hit-type classifier with its scaler and metadata"""
+    drum_type: str
+    classifier: Any
+    scaler: Any
+    metadata: Dict[str, Any]
+
+class HitTypeModelStore:
+    """Directory of per-drum-type classifiers
+
+    Each drum type has ``<drum_type>.json`` metadata pointing at a
+    content-addressed ``<drum_type>-<digest>.joblib`` model file. A model
+    file is written before its metadata is atomically replaced, so readers
+    never see a half-written model.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or os.getenv(
+            'HIT_TYPE_MODEL_DIR', str(Path.home() / ".drumtrackai" / "hit_type_models")
+        ))
+        self._models: Dict[str, StoredModel] = {}
+        self._lock = threading.Lock()
+        self._drum_locks: Dict[str, threading.Lock] = {}
+
+    def _metadata_path(self, drum_type: str) -> Path:
+        return self.root / f"{drum_type}.json"
+
+    def metadata(self, drum_type: str) -> Optional[Dict[str, Any]]:
+        """Stored metadata for a drum type, or None"""
+        try:
+            return json.loads(self._metadata_path(drum_type).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _matches_layout(self, metadata: Optional[Dict[str, Any]], feature_names: List[str]) -> bool:
+        return (metadata is not None
+                and metadata.get('schema_version') == FEATURE_SCHEMA_VERSION
+                and metadata.get('feature_names') == list(feature_names)
+                and metadata.get('sklearn_version') == sklearn.__version__)
+
+    def is_current(self, metadata: Optional[Dict[str, Any]], feature_names: List[str]) -> bool:
+        """Whether a stored model can be used with this feature layout
+
+        Placeholder models (e.g. stored by earlier versions) never are.
+        """
+        return (self._matches_layout(metadata, feature_names)
+                and metadata.get('source') != PLACEHOLDER_SOURCE)
+
+    def _drum_lock(self, drum_type: str) -> threading.Lock:
+        with self._lock:
+            return self._drum_locks.setdefault(drum_type, threading.Lock())
+
+    def load(self, drum_type: str, feature_names: List[str]) -> Optional[StoredModel]:
+        """The current model for a drum type, loaded once per process"""
+        with self._drum_lock(drum_type):
+            return self._load_locked(drum_type, feature_names)
+
+    def _load_locked(self, drum_type: str, feature_names: List[str]) -> Optional[StoredModel]:
+        with self._lock:
+            model = self._models.get(drum_type)
+        # A placeholder model stays in use for the rest of the process
+        if model is not None and self._matches_layout(model.metadata, feature_names):
+            return model
+
+        metadata = self.metadata(drum_type)
+        if not self.is_current(metadata, feature_names):
+            return None
+        try:
+            payload = joblib.load(self.root / metadata['model_file'], mmap_mode='r')
+        except Exception as e:
+            logger.warning(f"Failed to load stored {drum_type} classifier: {e}")
+            return None
+
+        model = StoredModel(drum_type, payload['classifier'], payload['scaler'], metadata)
+        with self._lock:
+            self._models[drum_type] = model
+        logger.info(f"Loaded stored {drum_type} classifier ({metadata['n_samples']} samples)")
+        return model
+
+    def load_or_train(self, drum_type: str, feature_names: List[str],
+                      train: Callable[[], Tuple[Any, Any, Dict[str, Any]]]) -> StoredModel:
+        """Load the stored model, training and saving it if there is none
+
+        ``train`` returns (classifier, scaler, info) where info holds at
+        least ``training_digest`` and ``n_samples``. Concurrent callers for
+        the same drum type wait for a single training run.
+        """
+        with self._drum_lock(drum_type):
+            model = self._load_locked(drum_type, feature_names)
+            if model is None:
+                classifier, scaler, info = train()
+                model = self.save(drum_type, classifier, scaler, feature_names, info)
+            return model
+
+    def save(self, drum_type: str, classifier: Any, scaler: Any, feature_names: List[str],
+             info: Dict[str, Any]) -> StoredModel:
+        """Persist a fitted classifier and scaler, replacing the stored one
+
+        Placeholder models are only kept in memory.
+        """
+        digest = info['training_digest']
+        metadata = {
+            'drum_type': drum_type,
+            'schema_version': FEATURE_SCHEMA_VERSION,
+            'feature_names': list(feature_names),
+            'sklearn_version': sklearn.__version__,
+            'classes': [str(c) for c in getattr(classifier, 'classes_', [])],
+            'model_file': f"{drum_type}-{digest[:16]}.joblib",
+            'created_at': datetime.now().isoformat(),
+            **info
+        }
+        model = StoredModel(drum_type, classifier, scaler, metadata)
+
+        if metadata.get('source') == PLACEHOLDER_SOURCE:
+            with self._lock:
+                self._models[drum_type] = model
+            return model
+
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+            model_path = self.root / metadata['model_file']
+            if not model_path.exists():
+                tmp = model_path.with_name(model_path.name + suffix)
+                joblib.dump({'classifier': classifier, 'scaler': scaler}, tmp)
+                os.replace(tmp, model_path)
+            meta_path = self._metadata_path(drum_type)
+            tmp = meta_path.with_name(meta_path.name + suffix)
+            tmp.write_text(json.dumps(metadata, indent=2))
+            # Atomic publish; the last writer wins
+            os.replace(tmp, meta_path)
+            self._prune(drum_type, metadata['model_file'])
+        except OSError as e:
+            logger.warning(f"Failed to store {drum_type} classifier: {e}")
+
+        with self._lock:
+            self._models[drum_type] = model
+        return model
+
+    def _prune(self, drum_type: str, keep: str):
+        """Remove a drum type's superseded model files (mapped copies stay valid)"""
+        for path in self.root.glob(f"{drum_type}-*.joblib"):
+            if path.name != keep:
+                path.unlink(missing_ok=True)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadata of every stored model"""
+        return [m for m in (self.metadata(p.stem) for p in sorted(self.root.glob('*.json'))) if m]
+
+_store: Optional[HitTypeModelStore] = None
+_store_lock = threading.Lock()
+
+def get_model_store() -> HitTypeModelStore:
+    """Get the process-wide model store (created on first use)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HitTypeModelStore()
+        return _store
+
+def main():
+    ap = argparse.ArgumentParser(description="Build or inspect the hit-type classifier store")
+    ap.add_argument("--store", type=str, default=None, help="Store directory (default: HIT_TYPE_MODEL_DIR)")
+    sub = ap.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Train and store classifiers from the sample database")
+    build.add_argument("--db", type=str, default=None, help="DrumSampleDatabase path")
+    build.add_argument("--drum-types", nargs="*", default=None,
+                       help="Drum types to build (default: every type in the database)")
+    build.add_argument("--force", action="store_true", help="Retrain even if the stored model is current")
+    sub.add_parser("list", help="Show stored models")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = HitTypeModelStore(args.store)
+
+    if args.command == "list":
+        for metadata in store.list():
+            print(f"{metadata['drum_type']}: {metadata['n_samples']} samples ({metadata['source']}), "
+                  f"classes={metadata['classes']}, digest={metadata['training_digest'][:16]}, "
+                  f"current={store.is_current(metadata, metadata['feature_names'])}")
+        return
+
+    from sophisticated_hit_type_analyzer import SophisticatedHitTypeAnalyzer, DrumSampleDatabase
+
+    analyzer = SophisticatedHitTypeAnalyzer(use_gpu=False, sample_db=DrumSampleDatabase(args.db),
+                                            model_store=store)
+    for drum_type in args.drum_types or analyzer.sample_db.get_drum_types():
+        X, y, source = analyzer.training_data(drum_type)
+        if source == PLACEHOLDER_SOURCE:
+            print(f"{drum_type}: skipped, no labelled samples")
+            continue
+        digest = training_digest(X, y, analyzer.feature_names)
+        metadata = store.metadata(drum_type)
+        if (not args.force and store.is_current(metadata, analyzer.feature_names)
+                and metadata.get('training_digest') == digest):
+            print(f"{drum_type}: up to date ({len(y)} samples, {source})")
+            continue
+        classifier, scaler, info = analyzer.fit_classifier(X, y, source)
+        store.save(drum_type, classifier, scaler, analyzer.feature_names, info)
+        print(f"{drum_type}: stored {len(y)} samples ({source}), classes={[str(c) for c in classifier.classes_]}")
+
+if __name__ == "__main__":
+    main()
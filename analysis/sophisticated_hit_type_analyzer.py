@@ -17,12 +17,10 @@ Features:
 """
 
 import numpy as np
-import torch
-import torch.nn as nn
-import torch.nn.functional as F
 import librosa
 import soundfile as sf
 from scipy import signal, stats
+from scipy.fft import dct
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.neural_network import MLPClassifier
@@ -36,6 +34,15 @@ from dataclasses import dataclass, asdict
 from datetime import datetime
 import warnings
 
+try:
+    import torch
+    import torch.nn as nn
+    import torch.nn.functional as F
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+    torch = None
+
 # Import our advanced analytic tools
 import sys
 sys.path.append(str(Path(__file__).parent / "admin" / "services"))
@@ -48,8 +55,32 @@ except ImportError:
     TFR_AVAILABLE = False
     warnings.warn("TFR integration not available")
 
+from hit_type_model_store import get_model_store, training_digest, PLACEHOLDER_SOURCE
+from backend_services import load_backend_service
+
+try:
+    median_filter = load_backend_service('spectral_context').median_filter
+    SPECTRAL_CONTEXT_AVAILABLE = True
+except ImportError:
+    SPECTRAL_CONTEXT_AVAILABLE = False
+    warnings.warn("Spectral front-end not available - using scipy median filters")
+    from scipy import ndimage
+
+    def median_filter(S: np.ndarray, size: int, axis: int, max_elements: int = 1 << 23) -> np.ndarray:
+        """Median filter along one axis (max_elements is ignored)"""
+        kernel = [1] * S.ndim
+        kernel[axis] = size
+        return ndimage.median_filter(S, size=kernel, mode='reflect')
+
 logger = logging.getLogger(__name__)
 
+# Feature layout constants
+N_CONTRAST_BANDS = 7       # librosa spectral_contrast bands (6 + valley)
+N_EVOLUTION_POINTS = 10    # spectral evolution points kept per hit
+N_EVOLUTION_FEATURES = 5   # ... of which go into the feature vector
+N_RESONANCE_PEAKS = 5      # resonance peaks kept per hit
+N_RESONANCE_FEATURES = 3   # ... of which go into the feature vector
+
 @dataclass
 class HitTypeFeatures:
     """Comprehensive features for hit-type classification"""
@@ -221,17 +252,61 @@ class DrumSampleDatabase:
         conn.close()
         
         logger.info("Standard hit types populated in database")
+    
+    def get_drum_types(self) -> List[str]:
+        """Drum types with hit type definitions or samples"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute('''
+                SELECT drum_type FROM hit_type_definitions
+                UNION SELECT drum_type FROM drum_samples ORDER BY drum_type
+            ''').fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+    
+    def get_training_samples(self, drum_type: str) -> List[Dict[str, Any]]:
+        """Labelled samples of a drum type, in insertion order"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute('''
+                SELECT id, hit_type, sample_path, features_json, sample_rate
+                FROM drum_samples WHERE drum_type = ? ORDER BY id
+            ''', (drum_type,)).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+def _harmonic_energy(magnitude: np.ndarray, kernel_size: int = 31,
+                     max_elements: int = 1 << 23) -> np.ndarray:
+    """Per-hit energy of the harmonic part of (n, bins, frames) magnitudes
+    
+    Same masks as ``librosa.decompose.hpss`` with its defaults; hits are
+    processed in chunks so the window views stay under ``max_elements``.
+    """
+    energy = np.zeros(len(magnitude))
+    chunk = max(1, max_elements // max(1, magnitude[0].size * kernel_size))
+    for lo in range(0, len(magnitude), chunk):
+        S = magnitude[lo:lo + chunk]
+        harm = median_filter(S, kernel_size, axis=-1, max_elements=max_elements)
+        perc = median_filter(S, kernel_size, axis=-2, max_elements=max_elements)
+        mask = librosa.util.softmask(harm, perc, power=2.0, split_zeros=True)
+        energy[lo:lo + chunk] = np.sum((S * mask).astype(np.float64) ** 2, axis=(1, 2))
+    return energy
 
 class SophisticatedHitTypeAnalyzer:
     """Advanced hit-type analyzer with ML classification"""
     
-    def __init__(self, sample_rate: int = 44100, use_gpu: bool = True):
+    def __init__(self, sample_rate: int = 44100, use_gpu: bool = True,
+                 sample_db: Optional[DrumSampleDatabase] = None, model_store=None):
         self.sample_rate = sample_rate
-        self.use_gpu = use_gpu and torch.cuda.is_available()
-        self.device = torch.device('cuda' if self.use_gpu else 'cpu')
+        self.use_gpu = use_gpu and TORCH_AVAILABLE and torch.cuda.is_available()
+        self.device = torch.device('cuda' if self.use_gpu else 'cpu') if TORCH_AVAILABLE else None
         
         # Initialize components
-        self.sample_db = DrumSampleDatabase()
+        self.sample_db = sample_db or DrumSampleDatabase()
+        self.model_store = model_store or get_model_store()
         
         # Initialize TFR analyzer if available
         if TFR_AVAILABLE:
@@ -240,7 +315,7 @@ class SophisticatedHitTypeAnalyzer:
             self.tfr_analyzer = None
             logger.warning("TFR analyzer not available")
         
-        # ML models for classification
+        # ML models for classification (shared via the model store)
         self.classifiers = {}
         self.feature_scalers = {}
         
@@ -248,257 +323,313 @@ class SophisticatedHitTypeAnalyzer:
         self.window_size = 0.1  # 100ms analysis window
         self.hop_length = 512
         self.n_mfcc = 13
+        self.batch_size = 256  # hits per batched feature pass
+        self._mel_basis = None
+        
+        # Column layout of the feature matrix (see extract_feature_matrix)
+        self.feature_names = (
+            ['attack_time', 'decay_time', 'sustain_level', 'release_time',
+             'spectral_centroid', 'spectral_rolloff', 'spectral_bandwidth',
+             'attack_sharpness', 'frequency_modulation', 'transient_strength',
+             'fundamental_frequency', 'harmonic_ratio', 'noise_ratio', 'velocity'] +
+            [f'spectral_contrast_{i}' for i in range(N_CONTRAST_BANDS)] +
+            [f'mfcc_{i}' for i in range(self.n_mfcc)] +
+            [f'spectral_evolution_{i}' for i in range(N_EVOLUTION_FEATURES)] +
+            [f'resonance_peak_{i}' for i in range(N_RESONANCE_FEATURES)]
+        )
         
         logger.info(f"Sophisticated Hit-Type Analyzer initialized (GPU: {self.use_gpu})")
     
-    def extract_comprehensive_features(self, audio: np.ndarray, onset_time: float) -> HitTypeFeatures:
-        """Extract comprehensive features for hit-type classification"""
+    def extract_comprehensive_features(self, audio: np.ndarray, onset_time: float,
+                                       tfr_analysis=None) -> HitTypeFeatures:
+        """Extract comprehensive features for hit-type classification
         
-        # Extract audio segment around onset
-        start_sample = max(0, int((onset_time - 0.05) * self.sample_rate))
-        end_sample = min(len(audio), int((onset_time + self.window_size) * self.sample_rate))
-        segment = audio[start_sample:end_sample]
-        
-        if len(segment) < 100:  # Too short
-            return None
-        
-        # Temporal features
-        attack_time = self._calculate_attack_time(segment)
-        decay_time = self._calculate_decay_time(segment)
-        sustain_level = self._calculate_sustain_level(segment)
-        release_time = self._calculate_release_time(segment)
-        
-        # Spectral features
-        spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=segment, sr=self.sample_rate))
-        spectral_rolloff = np.mean(librosa.feature.spectral_rolloff(y=segment, sr=self.sample_rate))
-        spectral_bandwidth = np.mean(librosa.feature.spectral_bandwidth(y=segment, sr=self.sample_rate))
-        
-        # Spectral contrast (7 bands)
-        spectral_contrast = np.mean(librosa.feature.spectral_contrast(y=segment, sr=self.sample_rate), axis=1).tolist()
-        
-        # MFCC coefficients
-        mfcc = np.mean(librosa.feature.mfcc(y=segment, sr=self.sample_rate, n_mfcc=self.n_mfcc), axis=1).tolist()
-        
-        # TFR-enhanced features if available
-        if self.tfr_analyzer:
-            try:
-                tfr_analysis = self.tfr_analyzer.tfr_analyzer.analyze_drum_attack(audio, onset_time)
-                attack_sharpness = tfr_analysis.attack_sharpness
-                frequency_modulation = tfr_analysis.frequency_modulation
-                transient_strength = tfr_analysis.transient_strength
-                spectral_evolution = tfr_analysis.spectral_evolution[:10]  # First 10 points
-            except:
-                attack_sharpness = 0.0
-                frequency_modulation = 0.0
-                transient_strength = 0.0
-                spectral_evolution = [0.0] * 10
-        else:
-            attack_sharpness = self._calculate_attack_sharpness_fallback(segment)
-            frequency_modulation = 0.0
-            transient_strength = self._calculate_transient_strength_fallback(segment)
-            spectral_evolution = [0.0] * 10
-        
-        # Physical characteristics
-        fundamental_frequency = self._estimate_fundamental_frequency(segment)
-        harmonic_ratio = self._calculate_harmonic_ratio(segment)
-        noise_ratio = self._calculate_noise_ratio(segment)
-        resonance_peaks = self._find_resonance_peaks(segment)
-        
-        return HitTypeFeatures(
-            attack_time=attack_time,
-            decay_time=decay_time,
-            sustain_level=sustain_level,
-            release_time=release_time,
-            spectral_centroid=spectral_centroid,
-            spectral_rolloff=spectral_rolloff,
-            spectral_bandwidth=spectral_bandwidth,
-            spectral_contrast=spectral_contrast,
-            mfcc_coefficients=mfcc,
-            attack_sharpness=attack_sharpness,
-            frequency_modulation=frequency_modulation,
-            transient_strength=transient_strength,
-            spectral_evolution=spectral_evolution,
-            fundamental_frequency=fundamental_frequency,
-            harmonic_ratio=harmonic_ratio,
-            noise_ratio=noise_ratio,
-            resonance_peaks=resonance_peaks,
-            velocity=np.max(np.abs(segment)),
-            preceding_interval=0.0,  # To be filled by caller
-            following_interval=0.0,  # To be filled by caller
-            position_in_measure=0.0  # To be filled by caller
+        tfr_analysis may be a precomputed TFRAnalysisResult for this onset
+        (see analyze_drum_attacks); otherwise the attack is analysed here.
+        Returns None if the segment is too short.
+        """
+        _, features = self.extract_feature_matrix(
+            audio, [onset_time], None if tfr_analysis is None else [tfr_analysis]
         )
-    
-    def _calculate_attack_time(self, segment: np.ndarray) -> float:
-        """Calculate attack time (time to peak amplitude)"""
-        peak_idx = np.argmax(np.abs(segment))
-        return peak_idx / self.sample_rate
-    
-    def _calculate_decay_time(self, segment: np.ndarray) -> float:
-        """Calculate decay time (time from peak to 50% amplitude)"""
-        abs_segment = np.abs(segment)
-        peak_idx = np.argmax(abs_segment)
-        peak_val = abs_segment[peak_idx]
-        
-        # Find where amplitude drops to 50% of peak
-        target_val = peak_val * 0.5
-        decay_idx = peak_idx
-        
-        for i in range(peak_idx, len(abs_segment)):
-            if abs_segment[i] < target_val:
-                decay_idx = i
-                break
-        
-        return (decay_idx - peak_idx) / self.sample_rate
-    
-    def _calculate_sustain_level(self, segment: np.ndarray) -> float:
-        """Calculate sustain level (average amplitude after attack)"""
-        abs_segment = np.abs(segment)
-        peak_idx = np.argmax(abs_segment)
-        
-        if peak_idx < len(abs_segment) - 100:
-            sustain_portion = abs_segment[peak_idx + 100:]
-            return np.mean(sustain_portion) / np.max(abs_segment)
-        
-        return 0.0
-    
-    def _calculate_release_time(self, segment: np.ndarray) -> float:
-        """Calculate release time (time to fade to near silence)"""
-        abs_segment = np.abs(segment)
-        peak_val = np.max(abs_segment)
-        threshold = peak_val * 0.1  # 10% of peak
+        return features[0]
+    
+    def extract_feature_matrix(self, audio: np.ndarray, onset_times,
+                               tfr_results: Optional[List] = None) -> Tuple[np.ndarray, List[Optional[HitTypeFeatures]]]:
+        """Extract features for many onsets at once
+        
+        Onset segments of equal length are stacked and share one STFT, one
+        mel projection and one YIN/HPSS/Welch pass; every feature is derived
+        with array operations over the batch. tfr_results (one
+        TFRAnalysisResult or None per onset) is computed with a single
+        analyze_drum_attacks call when not given.
+        
+        Returns:
+            (matrix, features): matrix is (n_hits, n_features) in
+            self.feature_names order, features the matching HitTypeFeatures.
+            Hits whose segment is too short get a NaN row and None.
+        """
+        onset_times = list(onset_times)
+        n_hits = len(onset_times)
+        matrix = np.full((n_hits, len(self.feature_names)), np.nan)
+        features: List[Optional[HitTypeFeatures]] = [None] * n_hits
+        
+        if tfr_results is None:
+            tfr_results = [None] * n_hits
+            if self.tfr_analyzer and n_hits:
+                try:
+                    tfr_results = self.tfr_analyzer.tfr_analyzer.analyze_drum_attacks(audio, onset_times)
+                except Exception as e:
+                    logger.warning(f"Batched TFR analysis failed: {e}")
+        
+        # Group segments by length (segments at the audio edges are shorter)
+        groups: Dict[int, List[Tuple[int, int]]] = {}
+        for k, onset_time in enumerate(onset_times):
+            start_sample, end_sample = self._segment_bounds(len(audio), onset_time)
+            if end_sample - start_sample >= 100:  # Too short otherwise
+                groups.setdefault(end_sample - start_sample, []).append((k, start_sample))
+        
+        for length, members in groups.items():
+            for lo in range(0, len(members), self.batch_size):
+                batch = members[lo:lo + self.batch_size]
+                rows = [k for k, _ in batch]
+                segments = np.stack([audio[start:start + length] for _, start in batch])
+                
+                columns = self._batch_segment_features(segments)
+                columns.update(self._tfr_columns([tfr_results[k] for k in rows], columns))
+                
+                matrix[rows] = np.column_stack([
+                    columns['attack_time'], columns['decay_time'],
+                    columns['sustain_level'], columns['release_time'],
+                    columns['spectral_centroid'], columns['spectral_rolloff'],
+                    columns['spectral_bandwidth'], columns['attack_sharpness'],
+                    columns['frequency_modulation'], columns['transient_strength'],
+                    columns['fundamental_frequency'], columns['harmonic_ratio'],
+                    columns['noise_ratio'], columns['velocity'],
+                    columns['spectral_contrast'], columns['mfcc'],
+                    columns['spectral_evolution'][:, :N_EVOLUTION_FEATURES],
+                    columns['resonance_peaks'][:, :N_RESONANCE_FEATURES]
+                ])
+                
+                for b, k in enumerate(rows):
+                    features[k] = HitTypeFeatures(
+                        attack_time=float(columns['attack_time'][b]),
+                        decay_time=float(columns['decay_time'][b]),
+                        sustain_level=float(columns['sustain_level'][b]),
+                        release_time=float(columns['release_time'][b]),
+                        spectral_centroid=float(columns['spectral_centroid'][b]),
+                        spectral_rolloff=float(columns['spectral_rolloff'][b]),
+                        spectral_bandwidth=float(columns['spectral_bandwidth'][b]),
+                        spectral_contrast=columns['spectral_contrast'][b].tolist(),
+                        mfcc_coefficients=columns['mfcc'][b].tolist(),
+                        attack_sharpness=float(columns['attack_sharpness'][b]),
+                        frequency_modulation=float(columns['frequency_modulation'][b]),
+                        transient_strength=float(columns['transient_strength'][b]),
+                        spectral_evolution=columns['spectral_evolution'][b].tolist(),
+                        fundamental_frequency=float(columns['fundamental_frequency'][b]),
+                        harmonic_ratio=float(columns['harmonic_ratio'][b]),
+                        noise_ratio=float(columns['noise_ratio'][b]),
+                        resonance_peaks=columns['resonance_peaks'][b][:columns['n_resonance_peaks'][b]].tolist(),
+                        velocity=float(columns['velocity'][b]),
+                        preceding_interval=0.0,  # To be filled by caller
+                        following_interval=0.0,  # To be filled by caller
+                        position_in_measure=0.0  # To be filled by caller
+                    )
+        
+        return matrix, features
+    
+    def _segment_bounds(self, n_samples: int, onset_time: float) -> Tuple[int, int]:
+        """Sample range analysed around an onset"""
+        start_sample = max(0, int((onset_time - 0.05) * self.sample_rate))
+        end_sample = min(n_samples, int((onset_time + self.window_size) * self.sample_rate))
+        return start_sample, end_sample
+    
+    def _get_mel_basis(self) -> np.ndarray:
+        """Mel filterbank shared by every batch (librosa defaults: n_fft=2048, 128 bands)"""
+        if self._mel_basis is None:
+            self._mel_basis = librosa.filters.mel(sr=self.sample_rate, n_fft=2048)
+        return self._mel_basis
+    
+    def _batch_segment_features(self, segments: np.ndarray) -> Dict[str, np.ndarray]:
+        """Envelope, spectral and MFCC features for stacked (n, length) segments"""
+        sr = self.sample_rate
+        n = len(segments)
+        columns: Dict[str, np.ndarray] = {}
+        
+        # Envelope features
+        abs_segments = np.abs(segments)
+        idx = np.arange(segments.shape[1])
+        peak_idx = np.argmax(abs_segments, axis=1)
+        peak_val = abs_segments[np.arange(n), peak_idx]
+        
+        # Attack time (time to peak amplitude)
+        columns['attack_time'] = peak_idx / sr
+        
+        # Decay time (time from peak to 50% amplitude)
+        below_half = (abs_segments < 0.5 * peak_val[:, None]) & (idx >= peak_idx[:, None])
+        decay_idx = np.where(below_half.any(axis=1), np.argmax(below_half, axis=1), peak_idx)
+        columns['decay_time'] = (decay_idx - peak_idx) / sr
+        
+        # Sustain level (average amplitude from 100 samples after the peak)
+        sustain_count = segments.shape[1] - (peak_idx + 100)
+        sustain_sum = np.sum(np.where(idx >= (peak_idx + 100)[:, None], abs_segments, 0.0), axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns['sustain_level'] = np.where(
+                sustain_count > 0, sustain_sum / np.maximum(sustain_count, 1) / peak_val, 0.0
+            )
         
-        # Find last point above threshold
-        for i in range(len(abs_segment) - 1, -1, -1):
-            if abs_segment[i] > threshold:
-                return i / self.sample_rate
+        # Release time (last point above 10% of peak)
+        above_tenth = abs_segments > 0.1 * peak_val[:, None]
+        last_above = segments.shape[1] - 1 - np.argmax(above_tenth[:, ::-1], axis=1)
+        columns['release_time'] = np.where(above_tenth.any(axis=1), last_above,
+                                           segments.shape[1]) / sr
+        columns['velocity'] = peak_val
         
-        return len(segment) / self.sample_rate
-    
-    def _calculate_attack_sharpness_fallback(self, segment: np.ndarray) -> float:
-        """Fallback attack sharpness calculation without TFR"""
-        # Use spectral flux as proxy
-        stft = librosa.stft(segment, hop_length=self.hop_length)
+        # One STFT for the whole batch (librosa defaults: n_fft=2048, hop=512)
+        stft = librosa.stft(segments, hop_length=self.hop_length)
         magnitude = np.abs(stft)
+        power = magnitude ** 2
+        
+        columns['spectral_centroid'] = np.mean(
+            librosa.feature.spectral_centroid(S=magnitude, sr=sr)[:, 0], axis=-1)
+        columns['spectral_rolloff'] = np.mean(
+            librosa.feature.spectral_rolloff(S=magnitude, sr=sr)[:, 0], axis=-1)
+        columns['spectral_bandwidth'] = np.mean(
+            librosa.feature.spectral_bandwidth(S=magnitude, sr=sr)[:, 0], axis=-1)
+        columns['spectral_contrast'] = np.mean(
+            librosa.feature.spectral_contrast(S=magnitude, sr=sr), axis=-1)
+        
+        # Log-mel spectrogram (power_to_db with an 80 dB floor per hit) and MFCCs
+        mel = np.einsum('mf,nft->nmt', self._get_mel_basis(), power, optimize=True)
+        log_mel = 10.0 * np.log10(np.maximum(1e-10, mel))
+        log_mel = np.maximum(log_mel, log_mel.max(axis=(1, 2), keepdims=True) - 80.0)
+        mfcc = dct(log_mel, axis=1, type=2, norm='ortho')[:, :self.n_mfcc]
+        columns['mfcc'] = np.mean(mfcc, axis=-1)
+        
+        # Noise ratio (energy in the upper half of the spectrum)
+        half = magnitude.shape[1] // 2
+        signal_energy = np.sum(power[:, :half], axis=(1, 2))
+        noise_energy = np.sum(power[:, half:], axis=(1, 2))
+        total = signal_energy + noise_energy
+        columns['noise_ratio'] = np.divide(noise_energy, total, out=np.zeros(n), where=total > 0)
+        
+        # Fallback attack sharpness (peak positive spectral flux) and
+        # transient strength (peak onset strength of the log-mel spectrogram)
+        if magnitude.shape[-1] > 1:
+            flux = np.sum(np.maximum(0, np.diff(magnitude, axis=-1)), axis=1)
+            columns['attack_sharpness_fallback'] = np.max(flux, axis=-1)
+            onset_envelope = np.mean(np.maximum(0, np.diff(log_mel, axis=-1)), axis=1)
+            columns['transient_strength_fallback'] = np.max(onset_envelope, axis=-1)
+        else:
+            columns['attack_sharpness_fallback'] = np.zeros(n)
+            columns['transient_strength_fallback'] = np.zeros(n)
         
-        if magnitude.shape[1] > 1:
-            flux = np.sum(np.maximum(0, magnitude[:, 1:] - magnitude[:, :-1]), axis=0)
-            return np.max(flux) if len(flux) > 0 else 0.0
+        # Harmonic ratio (harmonic share of the STFT energy after HPSS)
+        harmonic_energy = _harmonic_energy(magnitude.astype(np.float32))
+        stft_energy = np.sum(power, axis=(1, 2))
+        columns['harmonic_ratio'] = np.divide(harmonic_energy, stft_energy, out=np.zeros(n),
+                                              where=stft_energy > 0)
         
-        return 0.0
-    
-    def _calculate_transient_strength_fallback(self, segment: np.ndarray) -> float:
-        """Fallback transient strength calculation"""
-        # Use onset strength as proxy
-        onset_envelope = librosa.onset.onset_strength(y=segment, sr=self.sample_rate)
-        return np.max(onset_envelope) if len(onset_envelope) > 0 else 0.0
-    
-    def _estimate_fundamental_frequency(self, segment: np.ndarray) -> float:
-        """Estimate fundamental frequency using YIN algorithm"""
+        # Fundamental frequency (median of the voiced YIN frames)
         try:
-            f0 = librosa.yin(segment, fmin=50, fmax=2000, sr=self.sample_rate)
-            # Return median to avoid octave errors
-            valid_f0 = f0[f0 > 0]
-            return np.median(valid_f0) if len(valid_f0) > 0 else 0.0
-        except:
-            return 0.0
-    
-    def _calculate_harmonic_ratio(self, segment: np.ndarray) -> float:
-        """Calculate ratio of harmonic to total energy"""
+            f0 = librosa.yin(segments, fmin=50, fmax=2000, sr=sr)
+            voiced = f0 > 0
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                median_f0 = np.nanmedian(np.where(voiced, f0, np.nan), axis=-1)
+            columns['fundamental_frequency'] = np.where(voiced.any(axis=-1), median_f0, 0.0)
+        except Exception:
+            columns['fundamental_frequency'] = np.zeros(n)
+        
+        # Resonance peaks: top peaks of the Welch power spectrum, by power
+        peaks_out = np.zeros((n, N_RESONANCE_PEAKS))
+        n_peaks = np.zeros(n, dtype=int)
         try:
-            # Simple harmonic/percussive separation
-            harmonic, percussive = librosa.decompose.hpss(segment)
-            harmonic_energy = np.sum(harmonic ** 2)
-            total_energy = np.sum(segment ** 2)
-            return harmonic_energy / total_energy if total_energy > 0 else 0.0
-        except:
-            return 0.0
-    
-    def _calculate_noise_ratio(self, segment: np.ndarray) -> float:
-        """Calculate noise-to-signal ratio"""
-        try:
-            # Use high-frequency content as noise proxy
-            stft = librosa.stft(segment)
-            magnitude = np.abs(stft)
-            
-            # Split spectrum into signal (low-mid) and noise (high)
-            signal_bands = magnitude[:magnitude.shape[0]//2, :]
-            noise_bands = magnitude[magnitude.shape[0]//2:, :]
-            
-            signal_energy = np.sum(signal_bands ** 2)
-            noise_energy = np.sum(noise_bands ** 2)
-            
-            return noise_energy / (signal_energy + noise_energy) if (signal_energy + noise_energy) > 0 else 0.0
-        except:
-            return 0.0
-    
-    def _find_resonance_peaks(self, segment: np.ndarray) -> List[float]:
-        """Find prominent resonance peaks in spectrum"""
-        try:
-            # Compute power spectrum
-            freqs, psd = signal.welch(segment, fs=self.sample_rate, nperseg=1024)
-            
-            # Find peaks
-            peaks, _ = signal.find_peaks(psd, height=np.max(psd) * 0.1, distance=10)
-            
-            # Return frequencies of top 5 peaks
-            peak_freqs = freqs[peaks]
-            peak_powers = psd[peaks]
-            
-            # Sort by power and take top 5
-            sorted_indices = np.argsort(peak_powers)[::-1]
-            top_peaks = peak_freqs[sorted_indices[:5]]
-            
-            return top_peaks.tolist()
-        except:
-            return [0.0] * 5
-    
-    def classify_hit_type(self, audio: np.ndarray, onset_time: float, 
-                         drum_type: str) -> HitTypeClassification:
-        """Classify the type of drum hit"""
-        
-        # Extract comprehensive features
-        features = self.extract_comprehensive_features(audio, onset_time)
-        if features is None:
-            return None
-        
-        # Get audio segment for storage
-        start_sample = max(0, int((onset_time - 0.05) * self.sample_rate))
-        end_sample = min(len(audio), int((onset_time + self.window_size) * self.sample_rate))
-        raw_audio = audio[start_sample:end_sample]
+            freqs, psd = signal.welch(segments, fs=sr, nperseg=min(1024, segments.shape[1]), axis=-1)
+            for b in range(n):
+                peaks, _ = signal.find_peaks(psd[b], height=np.max(psd[b]) * 0.1, distance=10)
+                top = peaks[np.argsort(psd[b][peaks])[::-1][:N_RESONANCE_PEAKS]]
+                peaks_out[b, :len(top)] = freqs[top]
+                n_peaks[b] = len(top)
+        except Exception:
+            n_peaks[:] = N_RESONANCE_PEAKS
+        columns['resonance_peaks'] = peaks_out
+        columns['n_resonance_peaks'] = n_peaks
+        
+        return columns
+    
+    def _tfr_columns(self, tfr_results: List, segment_columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """TFR-enhanced feature columns, or the spectral fallbacks without TFR"""
+        n = len(tfr_results)
+        columns = {
+            'attack_sharpness': np.zeros(n),
+            'frequency_modulation': np.zeros(n),
+            'transient_strength': np.zeros(n),
+            'spectral_evolution': np.zeros((n, N_EVOLUTION_POINTS)),
+        }
         
-        # Load or train classifier for this drum type
+        if not self.tfr_analyzer:
+            columns['attack_sharpness'] = segment_columns['attack_sharpness_fallback']
+            columns['transient_strength'] = segment_columns['transient_strength_fallback']
+            return columns
+        
+        for b, tfr_analysis in enumerate(tfr_results):
+            if tfr_analysis is None:
+                continue  # Failed TFR analysis keeps zeroed features
+            columns['attack_sharpness'][b] = tfr_analysis.attack_sharpness
+            columns['frequency_modulation'][b] = tfr_analysis.frequency_modulation.get('modulation_depth', 0.0)
+            columns['transient_strength'][b] = tfr_analysis.transient_strength
+            evolution = tfr_analysis.spectral_centroid_evolution[:N_EVOLUTION_POINTS]
+            columns['spectral_evolution'][b, :len(evolution)] = evolution
+        
+        return columns
+    
+    def classify_hit_type(self, feature_matrix: np.ndarray, drum_type: str,
+                          features: List[HitTypeFeatures],
+                          raw_audio: List[np.ndarray]) -> List[HitTypeClassification]:
+        """Classify the hit type of every row of a feature matrix
+        
+        feature_matrix comes from extract_feature_matrix (rows of hits that
+        could be analysed); features and raw_audio hold each row's
+        HitTypeFeatures and audio segment. The scaler and classifier run once
+        for the whole matrix.
+        """
+        if len(feature_matrix) == 0:
+            return []
+        
+        # Load (or train once and store) the classifier for this drum type
         if drum_type not in self.classifiers:
-            self._train_classifier_for_drum_type(drum_type)
+            self._load_classifier(drum_type)
         
         # Classify using trained model
         if drum_type in self.classifiers:
             classifier = self.classifiers[drum_type]
             scaler = self.feature_scalers[drum_type]
             
-            # Prepare feature vector
-            feature_vector = self._features_to_vector(features)
-            feature_vector_scaled = scaler.transform([feature_vector])
+            feature_matrix_scaled = scaler.transform(np.nan_to_num(feature_matrix))
             
-            # Get prediction and probabilities
-            prediction = classifier.predict(feature_vector_scaled)[0]
-            probabilities = classifier.predict_proba(feature_vector_scaled)[0]
-            
-            # Create secondary types dictionary
+            # Get predictions and probabilities for every hit at once
+            probabilities = classifier.predict_proba(feature_matrix_scaled)
             classes = classifier.classes_
-            secondary_types = {classes[i]: prob for i, prob in enumerate(probabilities)}
-            confidence = secondary_types[prediction]
+            predictions = classes[np.argmax(probabilities, axis=1)]
             
-            return HitTypeClassification(
-                primary_type=prediction,
-                confidence=confidence,
-                secondary_types=secondary_types,
-                features=features,
-                raw_audio=raw_audio,
-                sample_rate=self.sample_rate
-            )
+            classifications = []
+            for prediction, hit_probabilities, hit_features, hit_audio in zip(
+                    predictions, probabilities, features, raw_audio):
+                # Create secondary types dictionary
+                secondary_types = {classes[i]: prob for i, prob in enumerate(hit_probabilities)}
+                classifications.append(HitTypeClassification(
+                    primary_type=prediction,
+                    confidence=secondary_types[prediction],
+                    secondary_types=secondary_types,
+                    features=hit_features,
+                    raw_audio=hit_audio,
+                    sample_rate=self.sample_rate
+                ))
+            return classifications
         else:
             # Fallback to rule-based classification
-            return self._rule_based_classification(features, raw_audio, drum_type)
+            return [self._rule_based_classification(hit_features, hit_audio, drum_type)
+                    for hit_features, hit_audio in zip(features, raw_audio)]
     
     def _features_to_vector(self, features: HitTypeFeatures) -> np.ndarray:
         """Convert features dataclass to feature vector"""
@@ -525,40 +656,99 @@ class SophisticatedHitTypeAnalyzer:
         # Add MFCC coefficients
         vector.extend(features.mfcc_coefficients)
         
-        # Add spectral evolution (first 5 points)
-        vector.extend(features.spectral_evolution[:5])
-        
-        # Add resonance peaks (first 3)
-        vector.extend(features.resonance_peaks[:3])
+        # Add spectral evolution and resonance peaks, zero-padded to a fixed length
+        evolution = list(features.spectral_evolution[:N_EVOLUTION_FEATURES])
+        vector.extend(evolution + [0.0] * (N_EVOLUTION_FEATURES - len(evolution)))
+        peaks = list(features.resonance_peaks[:N_RESONANCE_FEATURES])
+        vector.extend(peaks + [0.0] * (N_RESONANCE_FEATURES - len(peaks)))
         
         return np.array(vector)
     
+    def _load_classifier(self, drum_type: str):
+        """Load the stored classifier for a drum type, training it on first use"""
+        try:
+            model = self.model_store.load_or_train(
+                drum_type, self.feature_names,
+                lambda: self._train_classifier_for_drum_type(drum_type)
+            )
+        except Exception as e:
+            logger.error(f"No classifier for {drum_type}: {e}")
+            return
+        
+        self.classifiers[drum_type] = model.classifier
+        self.feature_scalers[drum_type] = model.scaler
+    
     def _train_classifier_for_drum_type(self, drum_type: str):
         """Train ML classifier for specific drum type"""
-        
-        # This would load training data from the sample database
-        # For now, create a placeholder classifier
-        logger.info(f"Training classifier for {drum_type} (placeholder)")
-        
-        # Create dummy training data (in real implementation, load from database)
+        logger.info(f"Training classifier for {drum_type}")
+        return self.fit_classifier(*self.training_data(drum_type))
+    
+    def training_data(self, drum_type: str) -> Tuple[np.ndarray, np.ndarray, str]:
+        """Training matrix, labels and source for a drum type
+        
+        Samples in the sample database with stored features_json
+        (HitTypeFeatures fields) use those; the others are analysed from
+        their audio file. Without at least two labelled hit types, placeholder
+        data is returned (source 'placeholder').
+        """
+        vectors, labels = [], []
+        for sample in self.sample_db.get_training_samples(drum_type):
+            vector = None
+            if sample['features_json']:
+                try:
+                    stored = HitTypeFeatures(**json.loads(sample['features_json']))
+                    vector = self._features_to_vector(stored)
+                except (TypeError, ValueError):
+                    vector = None
+            if vector is None:
+                try:
+                    audio, sr = sf.read(sample['sample_path'], always_2d=True)
+                except Exception as e:
+                    logger.warning(f"Skipping sample {sample['sample_path']}: {e}")
+                    continue
+                audio = audio[:, 0]
+                if sr != self.sample_rate:
+                    audio = librosa.resample(audio, orig_sr=sr, target_sr=self.sample_rate)
+                matrix, _ = self.extract_feature_matrix(audio, [0.0])
+                if np.isnan(matrix[0]).all():
+                    continue  # Too short to analyse
+                vector = matrix[0]
+            vectors.append(vector)
+            labels.append(sample['hit_type'])
+        
+        if len(set(labels)) >= 2:
+            return np.nan_to_num(np.array(vectors, dtype=np.float64)), np.array(labels), 'database'
+        
+        # Not enough labelled samples: reproducible placeholder data
+        logger.info(f"No labelled {drum_type} samples, using placeholder training data")
+        rng = np.random.default_rng(42)
         n_samples = 100
-        n_features = 50  # Approximate feature vector size
-        
-        X_dummy = np.random.randn(n_samples, n_features)
-        y_dummy = np.random.choice(['center_hit', 'rim_shot', 'ghost_note'], n_samples)
+        X_dummy = rng.standard_normal((n_samples, len(self.feature_names)))
+        y_dummy = rng.choice(['center_hit', 'rim_shot', 'ghost_note'], n_samples)
+        return X_dummy, y_dummy, PLACEHOLDER_SOURCE
+    
+    def fit_classifier(self, X: np.ndarray, y: np.ndarray, source: str = 'database'):
+        """Fit a scaler and classifier; returns (classifier, scaler, info)
         
-        # Train classifier
-        classifier = RandomForestClassifier(n_estimators=100, random_state=42)
-        classifier.fit(X_dummy, y_dummy)
+        The classifier is fitted on scaled features, matching classify_hit_type.
+        """
+        X = np.nan_to_num(np.asarray(X, dtype=np.float64))
         
         # Train scaler
         scaler = StandardScaler()
-        scaler.fit(X_dummy)
+        X_scaled = scaler.fit_transform(X)
         
-        self.classifiers[drum_type] = classifier
-        self.feature_scalers[drum_type] = scaler
+        # Train classifier
+        classifier = RandomForestClassifier(n_estimators=100, random_state=42)
+        classifier.fit(X_scaled, y)
         
-        logger.info(f"Classifier trained for {drum_type}")
+        info = {
+            'training_digest': training_digest(X, y, self.feature_names),
+            'n_samples': int(len(y)),
+            'source': source
+        }
+        logger.info(f"Classifier trained on {len(y)} samples ({source})")
+        return classifier, scaler, info
     
     def _rule_based_classification(self, features: HitTypeFeatures, 
                                  raw_audio: np.ndarray, drum_type: str) -> HitTypeClassification:
@@ -616,11 +806,14 @@ class SophisticatedHitTypeAnalyzer:
         for drum_type, onsets in drum_onsets.items():
             logger.info(f"Analyzing {len(onsets)} {drum_type} hits...")
             
-            drum_results = []
-            for onset_time in onsets:
-                classification = self.classify_hit_type(audio, onset_time, drum_type)
-                if classification:
-                    drum_results.append(classification)
+            # One batched feature pass and one classifier call per drum
+            feature_matrix, features = self.extract_feature_matrix(audio, onsets)
+            rows = [k for k, hit_features in enumerate(features) if hit_features is not None]
+            raw_audio = [audio[slice(*self._segment_bounds(len(audio), onsets[k]))] for k in rows]
+            
+            drum_results = self.classify_hit_type(
+                feature_matrix[rows], drum_type, [features[k] for k in rows], raw_audio
+            )
             
             results[drum_type] = drum_results
             
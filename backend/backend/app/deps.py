@@ -117,15 +117,6 @@ def get_service(name: str):
     return _get_service
 
 # Specific service getters
-def get_current_user():
-    """Get current authenticated user - using dev auth shim"""
-    try:
-        from .auth import get_current_user as auth_get_current_user
-        return auth_get_current_user()
-    except ImportError:
-        # Fallback to basic implementation
-        return {"user_id": "test_user", "tier": "professional", "is_admin": True}
-
 def get_audio_engine():
     """Get audio engine service"""
     return services.get('audio_engine')
@@ -21,6 +21,7 @@ def integrate_v4_v5_features(app: FastAPI):
     
     # Export service
     export_service = ExportService()
+    export_service.start()  # requeues exports interrupted by a restart
     services.register('export_service', export_service)
     
     # Mock other services for now (implement as needed)
@@ -9,8 +9,9 @@ from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 from ..models import ExportJob, Job
-from ..deps import get_db, get_current_user, get_export_service
+from ..deps import get_db, get_current_user, get_export_service, require_admin
 from ..services.export_service import ExportService
+from ..services.export_queue import TIER_PRIORITY, DEFAULT_PRIORITY
 import logging
 
 logger = logging.getLogger(__name__)
@@ -61,7 +62,8 @@ async def create_export(
             user_id=user_id,
             mode=export_request.mode,
             params=export_request.params,
-            db=db
+            db=db,
+            priority=TIER_PRIORITY.get(user.get("tier"), DEFAULT_PRIORITY)
         )
         
         # Get initial status
@@ -314,3 +316,16 @@ async def get_export_presets():
     except Exception as e:
         logger.error(f"Error getting export presets: {e}")
         raise HTTPException(status_code=500, detail="Failed to get export presets")
+
+@router.get("/cache/stats")
+async def get_render_cache_stats(
+    admin: Dict[str, Any] = Depends(require_admin),
+    export_service: ExportService = Depends(get_export_service)
+):
+    """Get export render and lane cache hit/miss counters (admin only)"""
+    try:
+        engine = export_service.render_engine
+        return {**engine.render_cache.stats(), 'lanes': engine.lane_cache.stats()}
+    except Exception as e:
+        logger.error(f"Error getting render cache stats: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get render cache stats")
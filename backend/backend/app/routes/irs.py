@@ -10,6 +10,7 @@ from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 from ..models import ImpulseResponse
 from ..deps import get_db, get_current_user, require_admin
+from ..services.convolution import get_ir_spectrum_cache
 import os
 import shutil
 from pathlib import Path
@@ -130,6 +131,13 @@ async def upload_ir(
         db.commit()
         db.refresh(ir)
         
+        # Pre-compute the IR spectra at the export sample rate
+        try:
+            from ..services.mix_chains import ConvolutionReverb
+            ConvolutionReverb(48000, str(file_path))
+        except Exception as e:
+            logger.warning(f"Failed to warm IR cache for {file_path}: {e}")
+        
         return IRResponse(
             id=ir.id,
             name=ir.name,
@@ -238,6 +246,7 @@ async def delete_ir(
         
         # Delete file
         file_path = Path(ir.file_path)
+        get_ir_spectrum_cache().invalidate(str(file_path))
         if file_path.exists():
             try:
                 file_path.unlink()
@@ -4,11 +4,13 @@ User kit management and sample mapping
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 from ..models import Kit
-from ..deps import get_db, get_current_user, require_admin
+from ..deps import get_db, get_current_user, require_admin, get_export_service
+from pathlib import Path
 import json
 import logging
 
@@ -298,11 +300,19 @@ async def get_default_kits():
         logger.error(f"Error getting default kits: {e}")
         raise HTTPException(status_code=500, detail="Failed to get default kits")
 
+def _resolve_sample_paths(mapping: Dict[str, str]) -> Dict[str, str]:
+    """Map /samples/... URLs in a kit mapping to files under /app/samples"""
+    return {
+        lane: str(Path("/app") / url.lstrip("/")) if url.startswith("/samples/") else url
+        for lane, url in (mapping or {}).items()
+    }
+
 @router.post("/{kit_id}/audition")
 async def audition_kit(
     kit_id: str,
     request: Request,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    export_service=Depends(get_export_service)
 ):
     """Generate audition preview for a kit"""
     try:
@@ -333,13 +343,27 @@ async def audition_kit(
             {"lane": "snare", "time_sec": 1.5, "velocity": 90},
         ]
         
-        return {
+        response = {
             "pattern": audition_pattern,
             "kit_mapping": mapping,
             "duration": 2.0,
             "bpm": 120
         }
         
+        # Render the pattern; lanes are memoized per kit sample, so repeat
+        # auditions (and auditions of kits sharing samples) are instant
+        if export_service is not None:
+            engine = export_service.render_engine
+            midi_lanes: Dict[str, List[Dict[str, Any]]] = {}
+            for event in audition_pattern:
+                midi_lanes.setdefault(event["lane"], []).append(event)
+            out_path = engine.export_dir / "auditions" / f"{kit_id}.wav"
+            # Render off the event loop
+            await run_in_threadpool(engine.render_mix, midi_lanes, _resolve_sample_paths(mapping), {}, out_path)
+            response["url"] = f"/exports/auditions/{kit_id}.wav"
+        
+        return response
+        
     except HTTPException:
         raise
     except Exception as e:
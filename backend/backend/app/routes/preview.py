@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Body, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
+from ..deps import get_export_service
 import json
 import tempfile
 import os
@@ -7,24 +9,37 @@ import os
 router = APIRouter(prefix="/api/preview")
 
 @router.post("/render")
-async def render_preview(payload: dict = Body(...)):
+async def render_preview(payload: dict = Body(...), export_service=Depends(get_export_service)):
     """
     Render ~4 bars to a temp WAV for instant QA without touching the export queue.
+    Lanes go through the shared lane cache, so re-previewing after tweaking one
+    lane only re-renders that lane.
     """
     bpm = float(payload.get("bpm", 120))
     bars = int(payload.get("bars", 4))
     sr = 48000
     dur_sec = (60.0 / bpm) * 4 * bars  # 4/4 bars
     
-    # Mock implementation for now - in production, use RenderEngine
     job_id = f"preview_{payload.get('job_id','temp')}"
     out_dir = Path("/app/exports") / job_id
     out_dir.mkdir(parents=True, exist_ok=True)
     
-    # Create a mock preview file (in production, render actual audio)
     preview_file = out_dir / "preview.wav"
     
-    # For now, create a placeholder file
+    midi_lanes = payload.get("midi_lanes")
+    if midi_lanes and export_service is not None:
+        engine = export_service.render_engine
+        params = {**payload.get("params", {}), "cache": payload.get("cache", True)}
+        window = {
+            lane: [e for e in events if e.get("time_sec", 0.0) < dur_sec]
+            for lane, events in midi_lanes.items()
+        }
+        # Render off the event loop
+        await run_in_threadpool(engine.render_mix, window, payload.get("kit_map", {}), params,
+                                preview_file, max_seconds=dur_sec)
+        return {"url": f"/exports/{job_id}/preview.wav", "duration_sec": dur_sec}
+    
+    # Nothing to render yet; write a silent placeholder
     with open(preview_file, 'wb') as f:
         # Write minimal WAV header for a silent file
         f.write(b'RIFF')
@@ -0,0 +1,323 @@
+"""
+DrumTracKAI v4/v5 Analysis Executor
+Runs CPU-bound analysis jobs off the server's event loop in a bounded pool
+of worker processes, with a bounded queue, cancellation, per-job timeouts
+and per-stage progress
+"""
+
+import os
+import sys
+import json
+import asyncio
+import inspect
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ANALYSIS_WORKERS = max(1, min(2, os.cpu_count() or 1))
+
+# Worker entry point, in this package whatever name it was imported under
+WORKER_MODULE = f"{__name__.rpartition('.')[0]}.analysis_worker"
+
+# progress(percent, message); may be a coroutine function
+ProgressHandler = Callable[[int, str], Optional[Awaitable[None]]]
+
+class AnalysisQueueFull(Exception):
+    """The queue already holds ``queue_size`` waiting jobs"""
+
+class AnalysisTimeout(Exception):
+    """A job ran longer than its timeout and its worker was stopped"""
+
+class AnalysisCancelled(Exception):
+    """A job was cancelled before it finished"""
+
+class AnalysisFailed(Exception):
+    """A job raised in its worker, or the worker died"""
+
+class _TaskError(AnalysisFailed):
+    """The job's function raised; its worker is still usable"""
+
+class _Job:
+    def __init__(self, job_id: str, task: str, args: List[Any], kwargs: Dict[str, Any],
+                 on_progress: Optional[ProgressHandler], timeout: float, future: asyncio.Future):
+        self.job_id = job_id
+        self.task = task
+        self.args = args
+        self.kwargs = kwargs
+        self.on_progress = on_progress
+        self.timeout = timeout
+        self.future = future
+        self.state = 'queued'  # queued -> running -> done
+        self.runner: Optional[asyncio.Task] = None
+        self.cancel_requested = False
+
+class _Worker:
+    """One worker process speaking JSON lines over its stdin/stdout"""
+
+    def __init__(self, preload: List[str], io: ThreadPoolExecutor):
+        env = dict(os.environ)
+        # Same import paths as the server, so tasks resolve to the same modules
+        env['PYTHONPATH'] = os.pathsep.join(p or os.getcwd() for p in sys.path)
+        self._io = io
+        self.proc = subprocess.Popen(
+            [sys.executable, '-m', WORKER_MODULE, *preload],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env, cwd=os.getcwd()
+        )
+
+    @property
+    def pid(self) -> int:
+        return self.proc.pid
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def send(self, message: Dict[str, Any]):
+        self.proc.stdin.write((json.dumps(message) + '\n').encode('utf-8'))
+        self.proc.stdin.flush()
+
+    async def receive(self) -> Optional[Dict[str, Any]]:
+        """Next message, or None once the worker has exited"""
+        line = await asyncio.get_running_loop().run_in_executor(self._io, self.proc.stdout.readline)
+        return json.loads(line) if line else None
+
+    def stop(self):
+        """Kill the worker (a blocked receive() then returns None)"""
+        if self.alive():
+            self.proc.kill()
+        self.proc.wait()
+        for pipe in (self.proc.stdin, self.proc.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+class AnalysisExecutor:
+    """Bounded queue in front of a fixed pool of analysis worker processes
+
+    ``submit`` queues a job and returns a future for its result. Each of the
+    ``workers`` slots owns one long-lived worker process and runs one job at
+    a time; the job's function is called in the worker with a
+    ``progress(percent, message)`` callback whose reports are forwarded to
+    ``on_progress`` on the event loop. A job that outlives its timeout, or
+    is cancelled while running, has its worker killed and replaced, so the
+    event loop never waits on analysis code.
+
+    Configured by ANALYSIS_WORKERS, ANALYSIS_QUEUE_SIZE and ANALYSIS_TIMEOUT
+    (seconds). ``preload`` modules are imported by each worker at start-up,
+    before it takes a job.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: Optional[int] = None,
+                 timeout: Optional[float] = None, preload: Optional[List[str]] = None,
+                 start_timeout: float = 120.0):
+        self.workers = max(1, workers or int(os.getenv('ANALYSIS_WORKERS', DEFAULT_ANALYSIS_WORKERS)))
+        self.queue_size = max(1, queue_size or int(os.getenv('ANALYSIS_QUEUE_SIZE', 32)))
+        self.timeout = timeout or float(os.getenv('ANALYSIS_TIMEOUT', 600))
+        self.preload = list(preload or [])
+        self.start_timeout = start_timeout
+        self._jobs: Dict[str, _Job] = {}
+        self._pending: Deque[_Job] = deque()
+        self._wakeup: Optional[asyncio.Condition] = None
+        self._slots: List[asyncio.Task] = []
+        self._worker_procs: Dict[int, _Worker] = {}
+        # A blocked read per slot, plus one per killed worker until it exits
+        self._io = ThreadPoolExecutor(max_workers=2 * self.workers, thread_name_prefix='analysis-io')
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+
+    def _ensure_started(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Condition()
+            self._slots = [asyncio.create_task(self._slot_loop(i)) for i in range(self.workers)]
+            logger.info(f"Analysis executor started with {self.workers} workers")
+
+    def submit(self, job_id: str, fn: Callable[..., Any], *args,
+               on_progress: Optional[ProgressHandler] = None, timeout: Optional[float] = None,
+               **kwargs) -> asyncio.Future:
+        """Queue ``fn(*args, progress=..., **kwargs)`` to run in a worker
+
+        ``fn`` must be a module-level function; it is looked up by name in
+        the worker. Arguments and the result travel as JSON. The returned
+        future resolves to the result or raises AnalysisFailed,
+        AnalysisTimeout or AnalysisCancelled. Raises AnalysisQueueFull when
+        the queue is at capacity.
+        """
+        self._ensure_started()
+        if job_id in self._jobs:
+            raise ValueError(f"Analysis job already submitted: {job_id}")
+        if len(self._pending) >= self.queue_size:
+            raise AnalysisQueueFull(f"Analysis queue is full ({self.queue_size} jobs waiting)")
+
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(job_id, f"{fn.__module__}:{fn.__qualname__}", list(args), kwargs,
+                   on_progress, timeout or self.timeout, future)
+        self._jobs[job_id] = job
+        self._pending.append(job)
+        future.add_done_callback(lambda f: self._on_future_done(job))
+        asyncio.get_running_loop().create_task(self._notify())
+        return future
+
+    async def _notify(self):
+        async with self._wakeup:
+            self._wakeup.notify()
+
+    def _on_future_done(self, job: _Job):
+        self._jobs.pop(job.job_id, None)
+        # The caller gave up on the result
+        if job.future.cancelled() and job.state != 'done':
+            self._cancel(job)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; False if it is unknown or finished"""
+        job = self._jobs.get(job_id)
+        if job is None or job.state == 'done':
+            return False
+        self._cancel(job)
+        return True
+
+    def _cancel(self, job: _Job):
+        job.cancel_requested = True
+        if job.state == 'queued':
+            self._pending.remove(job)
+            self._finish(job, error=AnalysisCancelled(f"Analysis job {job.job_id} cancelled"))
+        elif job.runner is not None:
+            job.runner.cancel()
+
+    def _finish(self, job: _Job, result: Any = None, error: Optional[Exception] = None):
+        job.state = 'done'
+        if isinstance(error, AnalysisCancelled):
+            self.cancelled += 1
+        elif isinstance(error, AnalysisTimeout):
+            self.timed_out += 1
+        elif error is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+        if not job.future.done():
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+
+    def job_state(self, job_id: str) -> Optional[str]:
+        """'queued' or 'running' for a live job, else None"""
+        job = self._jobs.get(job_id)
+        return job.state if job is not None and job.state != 'done' else None
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position of a waiting job"""
+        for position, job in enumerate(self._pending, 1):
+            if job.job_id == job_id:
+                return position
+        return None
+
+    async def _start_worker(self, slot: int) -> _Worker:
+        worker = _Worker(self.preload, self._io)
+        self._worker_procs[slot] = worker
+        try:
+            ready = await asyncio.wait_for(worker.receive(), self.start_timeout)
+        except asyncio.TimeoutError:
+            ready = None
+        if not ready or ready.get('type') != 'ready':
+            worker.stop()
+            raise AnalysisFailed("Analysis worker failed to start")
+        logger.info(f"Analysis worker {slot} started (pid {worker.pid})")
+        return worker
+
+    async def _slot_loop(self, slot: int):
+        worker: Optional[_Worker] = None
+        try:
+            while True:
+                async with self._wakeup:
+                    await self._wakeup.wait_for(lambda: bool(self._pending))
+                    job = self._pending.popleft()
+                job.state = 'running'
+                try:
+                    if worker is None or not worker.alive():
+                        worker = await self._start_worker(slot)
+                    if job.cancel_requested:
+                        raise asyncio.CancelledError()
+                    job.runner = asyncio.create_task(asyncio.wait_for(self._run(worker, job), job.timeout))
+                    self._finish(job, result=await job.runner)
+                    continue
+                except asyncio.CancelledError:
+                    error = AnalysisCancelled(f"Analysis job {job.job_id} cancelled")
+                    if not job.cancel_requested:
+                        self._finish(job, error=error)
+                        raise  # executor shutdown
+                except asyncio.TimeoutError:
+                    logger.warning(f"Analysis job {job.job_id} timed out after {job.timeout:.0f}s")
+                    error = AnalysisTimeout(f"Analysis timed out after {job.timeout:.0f} seconds")
+                except _TaskError as e:
+                    # The worker caught the exception and can take the next job
+                    self._finish(job, error=AnalysisFailed(str(e)))
+                    continue
+                except AnalysisFailed as e:
+                    error = e
+                except Exception as e:
+                    # Broken pipe or garbled output from the worker
+                    logger.error(f"Analysis worker {slot} failed: {e}")
+                    error = AnalysisFailed(str(e))
+                # The worker was killed, died or is in an unknown state
+                if worker is not None:
+                    worker.stop()
+                    worker = None
+                self._finish(job, error=error)
+        finally:
+            if worker is not None:
+                worker.stop()
+            self._worker_procs.pop(slot, None)
+
+    async def _run(self, worker: _Worker, job: _Job) -> Any:
+        worker.send({'task': job.task, 'args': job.args, 'kwargs': job.kwargs})
+        while True:
+            message = await worker.receive()
+            if message is None:
+                raise AnalysisFailed(f"Analysis worker exited with code {worker.proc.poll()}")
+            kind = message.get('type')
+            if kind == 'progress':
+                await self._report(job, message['progress'], message['message'])
+            elif kind == 'result':
+                return message['result']
+            elif kind == 'error':
+                logger.debug(message.get('traceback', ''))
+                raise _TaskError(message['error'])
+
+    async def _report(self, job: _Job, percent: int, message: str):
+        if job.on_progress is None:
+            return
+        try:
+            pending = job.on_progress(percent, message)
+            if inspect.isawaitable(pending):
+                await pending
+        except Exception as e:
+            logger.error(f"Progress handler failed for {job.job_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'running': sum(1 for job in self._jobs.values() if job.state == 'running'),
+            'queued': len(self._pending),
+            'queue_size': self.queue_size,
+            'completed': self.completed,
+            'failed': self.failed,
+            'timed_out': self.timed_out,
+            'cancelled': self.cancelled
+        }
+
+    async def shutdown(self):
+        """Cancel every job and stop the workers"""
+        for job in list(self._pending):
+            self._cancel(job)
+        for task in self._slots:
+            task.cancel()
+        await asyncio.gather(*self._slots, return_exceptions=True)
+        self._slots = []
+        self._wakeup = None
+        self._io.shutdown(wait=False)
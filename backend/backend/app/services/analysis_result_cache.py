@@ -0,0 +1,172 @@
+"""
+DrumTracKAI v4/v5 Analysis Result Cache
+On-disk cache of finished analyses keyed by audio content, analysis type and
+engine version, with size-based LRU eviction
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+import logging
+
+from .render_cache import file_digest
+
+logger = logging.getLogger(__name__)
+
+RESULT = 'result.json'
+
+class AnalysisResultCache:
+    """Caches analysis results, and the stems they reference, by audio content
+
+    Each entry is a directory holding the result JSON. The stems written for
+    that analysis stay where they were generated (``<stems_root>/<id>``),
+    owned by the entry: a hit hands back the same stem URLs, and evicting
+    the entry removes its stems. Results whose stems are not all files under
+    ``stems_root`` (mock or fallback results) are not cached. Entries are
+    evicted least-recently-used first once results plus stems exceed
+    ``max_bytes``.
+    """
+
+    def __init__(self, root: Path, stems_root: Path, max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.stems_root = Path(stems_root).resolve()
+        self.max_bytes = max_bytes or int(os.getenv('ANALYSIS_RESULT_CACHE_MAX_BYTES', 5 * 1024 ** 3))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def key_for(content_sha256: str, analysis_type: str, engine_version: Any) -> str:
+        """Canonical hash of what determines an analysis result"""
+        canonical = {
+            'sha256': content_sha256.lower(),
+            'analysis_type': analysis_type,
+            'engine_version': engine_version
+        }
+        blob = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def content_digest(path: str) -> str:
+        """SHA-256 of an audio file, for uploads recorded without one"""
+        return file_digest(path)
+
+    def _stems_dir(self, result: Dict[str, Any]) -> Optional[Path]:
+        """The single directory under stems_root holding all of the result's stems"""
+        stems = result.get('stems') or {}
+        dirs = set()
+        for stem in stems.values():
+            path = Path(stem.get('file_path', '')).resolve()
+            if path.parent.parent != self.stems_root or not path.is_file():
+                return None
+            dirs.add(path.parent)
+        return dirs.pop() if len(dirs) == 1 else None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The cached result, or None (also when its stems are gone)"""
+        entry = self.root / key
+        try:
+            manifest = json.loads((entry / RESULT).read_text())
+            stems_dir = self.stems_root / manifest['stems_dir']
+            if not all((stems_dir / Path(stem['file_path']).name).is_file()
+                       for stem in manifest['result'].get('stems', {}).values()):
+                raise FileNotFoundError(stems_dir)
+            os.utime(entry / RESULT)  # mark as recently used
+        except FileNotFoundError:
+            shutil.rmtree(entry, ignore_errors=True)
+            with self._lock:
+                self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self.saved_seconds += manifest.get('analysis_seconds', 0.0)
+        return manifest['result']
+
+    def put(self, key: str, result: Dict[str, Any], analysis_seconds: float = 0.0) -> bool:
+        """Store a finished analysis; False if it is not cacheable"""
+        stems_dir = self._stems_dir(result)
+        if stems_dir is None:
+            return False
+        entry = self.root / key
+        tmp = self.root / f".{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            tmp.mkdir(parents=True, exist_ok=True)
+            (tmp / RESULT).write_text(json.dumps({
+                'result': result,
+                'stems_dir': stems_dir.name,
+                'analysis_seconds': analysis_seconds,
+                'created_at': time.time()
+            }, default=str))
+            # Atomic publish; a concurrent writer of the same key wins harmlessly
+            os.rename(tmp, entry)
+        except OSError as e:
+            if not entry.exists():
+                logger.warning(f"Failed to cache analysis {key}: {e}")
+            return False
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+        return True
+
+    @staticmethod
+    def _dir_size(path: Path) -> int:
+        try:
+            return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+        except OSError:
+            return 0
+
+    def _entries(self):
+        """(last used, bytes, entry dir, stems dir) for every entry"""
+        entries = []
+        for entry in self.root.iterdir():
+            result = entry / RESULT
+            if entry.name.startswith('.') or not result.exists():
+                continue
+            try:
+                stems_dir = self.stems_root / json.loads(result.read_text())['stems_dir']
+                used = result.stat().st_mtime
+            except (OSError, ValueError, KeyError):
+                continue
+            entries.append((used, self._dir_size(entry) + self._dir_size(stems_dir), entry, stems_dir))
+        return entries
+
+    def evict(self):
+        """Remove least-recently-used entries and their stems until under the byte budget"""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[0])
+            total = sum(size for _, size, _, _ in entries)
+            while total > self.max_bytes and entries:
+                _, size, entry, stems_dir = entries.pop(0)
+                shutil.rmtree(entry, ignore_errors=True)
+                shutil.rmtree(stems_dir, ignore_errors=True)
+                total -= size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and disk usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            entries = self._entries()
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'saved_analysis_seconds': round(self.saved_seconds, 3),
+                'entries': len(entries),
+                'bytes': sum(size for _, size, _, _ in entries),
+                'max_bytes': self.max_bytes
+            }
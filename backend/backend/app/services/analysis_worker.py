@@ -0,0 +1,73 @@
+"""
+DrumTracKAI v4/v5 Analysis Worker
+Worker process for the analysis executor: reads one JSON job per line on
+stdin, runs it and writes progress, then the result or error, as JSON lines
+on stdout
+
+Run by AnalysisExecutor as ``python -m <package>.analysis_worker [preload modules]``.
+"""
+
+import os
+import sys
+import json
+import importlib
+import traceback
+from pathlib import Path
+from typing import Any, Dict
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _json_default(value: Any):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, Path):
+        return str(value)
+    return str(value)
+
+def _resolve(task: str):
+    """``package.module:function`` -> function"""
+    module_name, _, qualname = task.partition(':')
+    target = importlib.import_module(module_name)
+    for part in qualname.split('.'):
+        target = getattr(target, part)
+    return target
+
+def main():
+    # Protocol messages get their own copy of stdout; anything else written
+    # to stdout (prints, native libraries) goes to stderr instead
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8', buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    logging.basicConfig(level=os.getenv('ANALYSIS_WORKER_LOG_LEVEL', 'WARNING'))
+
+    def send(message: Dict[str, Any]):
+        channel.write(json.dumps(message, default=_json_default) + '\n')
+        channel.flush()
+
+    # Import heavy modules before taking jobs, so no job's timeout covers start-up
+    for module_name in sys.argv[1:]:
+        importlib.import_module(module_name)
+    send({'type': 'ready', 'pid': os.getpid()})
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+
+        def progress(percent: int, message: str):
+            send({'type': 'progress', 'progress': int(percent), 'message': message})
+
+        try:
+            result = _resolve(request['task'])(*request.get('args', []), progress=progress,
+                                                **request.get('kwargs', {}))
+            send({'type': 'result', 'result': result})
+        except Exception as e:
+            logger.error(f"Analysis task {request['task']} failed: {e}")
+            send({'type': 'error', 'error': f"{type(e).__name__}: {e}",
+                  'traceback': traceback.format_exc()})
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+DrumTracKAI v4/v5 Partitioned Convolution Engine
+Uniformly partitioned overlap-save FFT convolution with a process-wide
+cache of impulse-response spectra
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Tuple
+import numpy as np
+from scipy import fft as sp_fft
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = 4096
+DEFAULT_IR_KEY = '<default>'
+
+def partition_ir(ir: np.ndarray, block_size: int) -> np.ndarray:
+    """Split an IR into block_size partitions and return their spectra
+
+    Returns a read-only complex array of shape (n_partitions, block_size + 1),
+    each row the rfft of one zero-padded partition at FFT size 2 * block_size.
+    """
+    ir = np.asarray(ir, dtype=np.float64)
+    if ir.ndim > 1:
+        ir = ir[:, 0]
+    n_parts = max(1, -(-len(ir) // block_size))
+    padded = np.zeros((n_parts, 2 * block_size))
+    padded[:, :block_size].flat[:len(ir)] = ir
+    spectra = sp_fft.rfft(padded, axis=1)
+    spectra.flags.writeable = False
+    return spectra
+
+class PartitionedConvolver:
+    """Streaming uniformly partitioned overlap-save convolver
+
+    Output is the causal convolution of the input with the IR (no latency,
+    no half-IR shift), truncated to the input length. Calls may pass any
+    number of samples; state carries over so chunked and one-shot processing
+    give the same result.
+    """
+
+    def __init__(self, spectra: np.ndarray, block_size: int = DEFAULT_BLOCK_SIZE):
+        self.spectra = spectra
+        self.block_size = block_size
+        self.reset()
+
+    def reset(self):
+        """Clear the input history"""
+        n_parts, n_bins = self.spectra.shape
+        self._fdl = np.zeros((n_parts, n_bins), dtype=np.complex128)  # frequency-domain delay line
+        self._frame = np.zeros(2 * self.block_size)  # [previous block | current block]
+        self._fill = 0
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        """Convolve the next chunk of input"""
+        B = self.block_size
+        out = np.empty(len(audio), dtype=np.float64)
+        pos = 0
+
+        while pos < len(audio):
+            take = min(B - self._fill, len(audio) - pos)
+            self._frame[B + self._fill:B + self._fill + take] = audio[pos:pos + take]
+
+            # Spectrum of the (possibly partial) current frame goes in slot 0
+            self._fdl[0] = sp_fft.rfft(self._frame)
+            acc = np.einsum('pk,pk->k', self._fdl, self.spectra)
+            block = sp_fft.irfft(acc, n=2 * B)[B:]
+            out[pos:pos + take] = block[self._fill:self._fill + take]
+
+            self._fill += take
+            pos += take
+
+            if self._fill == B:
+                # Block complete: shift history and the delay line
+                self._frame[:B] = self._frame[B:]
+                self._frame[B:] = 0
+                self._fdl[1:] = self._fdl[:-1]
+                self._fill = 0
+
+        return out
+
+class IRSpectrumCache:
+    """Thread-safe LRU cache of partitioned IR spectra
+
+    Entries are keyed by (IR path, file mtime, sample rate, block size), so
+    re-uploading a file under the same path invalidates its spectra. The
+    built-in algorithmic IR uses DEFAULT_IR_KEY as its path.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(ir_path: str, sr: int, block_size: int) -> Tuple:
+        mtime = None
+        if ir_path != DEFAULT_IR_KEY:
+            ir_path = os.path.abspath(ir_path)
+            mtime = os.path.getmtime(ir_path)
+        return (ir_path, mtime, sr, block_size)
+
+    def get(self, ir_path: str, sr: int, loader: Callable[[], np.ndarray],
+            block_size: int = DEFAULT_BLOCK_SIZE) -> np.ndarray:
+        """Return cached spectra, calling loader() for the time-domain IR on a miss"""
+        key = self._key(ir_path, sr, block_size)
+        with self._lock:
+            spectra = self._entries.get(key)
+            if spectra is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return spectra
+            self.misses += 1
+
+        # Load and transform outside the lock; a racing miss just does it twice
+        spectra = partition_ir(loader(), block_size)
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = spectra
+                self._bytes += spectra.nbytes
+                while self._bytes > self.max_bytes and len(self._entries) > 1:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= evicted.nbytes
+        return spectra
+
+    def invalidate(self, ir_path: str):
+        """Drop all cached spectra for an IR file"""
+        ir_path = os.path.abspath(ir_path)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == ir_path]:
+                self._bytes -= self._entries.pop(key).nbytes
+
+    def stats(self) -> dict:
+        """Cache counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+# Process-wide cache shared by every export job and the IR routes
+ir_spectrum_cache = IRSpectrumCache()
+
+def get_ir_spectrum_cache() -> IRSpectrumCache:
+    """Get the shared IR spectrum cache"""
+    return ir_spectrum_cache
@@ -0,0 +1,277 @@
+"""
+DrumTracKAI v4/v5 Export Scheduler
+Persistent, bounded export worker queue backed by the processing_queue table
+"""
+
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from ..models import ProcessingQueue, ExportJob
+import logging
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE_EXPORT = 'export'
+DEFAULT_PRIORITY = 5  # lower runs first
+TIER_PRIORITY = {'pro': 3, 'professional': 3, 'advanced': 4, 'basic': 5}
+
+class ExportScheduler:
+    """Runs queued exports on a fixed pool of worker threads
+
+    Every export is a ``ProcessingQueue`` row, so queued work survives a
+    restart. Workers pick the next row by priority (lower value first); among
+    rows of equal priority users take turns (counting exports served in the
+    last ``fairness_window`` seconds), so one user's burst cannot hold
+    everyone else back, then the oldest request wins. Users already at ``max_per_user`` running
+    exports are skipped while others are waiting. Rows are claimed with a
+    conditional UPDATE, so several server processes can share the table.
+
+    While a row is rendering, its process refreshes the row's
+    ``updated_at`` every ``heartbeat_interval`` seconds. Only 'running'
+    rows whose heartbeat is older than ``stale_after`` (their process
+    crashed or was killed) are requeued, so starting another process never
+    takes over exports that are still rendering elsewhere.
+    """
+
+    def __init__(self, run_job: Callable[[str], Optional[Dict]], workers: Optional[int] = None,
+                 max_per_user: Optional[int] = None, poll_interval: float = 2.0,
+                 fairness_window: float = 600.0, heartbeat_interval: Optional[float] = None):
+        self.run_job = run_job
+        self.workers = workers or int(os.getenv('EXPORT_WORKERS', 2))
+        self.max_per_user = max_per_user or int(os.getenv('EXPORT_MAX_PER_USER', self.workers))
+        self.poll_interval = poll_interval
+        self.fairness_window = fairness_window
+        self.heartbeat_interval = heartbeat_interval or float(os.getenv('EXPORT_HEARTBEAT_INTERVAL', 15))
+        self.stale_after = 4 * self.heartbeat_interval
+        self._wakeup = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._running: Set[str] = set()  # queue row ids this process is rendering
+        self._running_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def _session(self) -> Session:
+        from ..deps import SessionLocal
+        return SessionLocal()
+
+    def start(self):
+        """Recover interrupted work and start the worker threads (idempotent)"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping = False
+            self._stopped.clear()
+            self.recover()
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker_loop, name=f"export-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._heartbeat_loop, name="export-heartbeat", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+            logger.info(f"Export scheduler started with {self.workers} workers")
+
+    def stop(self, timeout: float = 5.0):
+        """Ask workers to exit after their current job"""
+        with self._lock:
+            self._stopping = True
+            self._stopped.set()
+            with self._wakeup:
+                self._wakeup.notify_all()
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+
+    def recover(self) -> int:
+        """Requeue 'running' rows whose process stopped sending heartbeats"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        db = self._session()
+        try:
+            rows = db.query(ProcessingQueue).filter(
+                ProcessingQueue.job_type == JOB_TYPE_EXPORT,
+                ProcessingQueue.status == 'running',
+                ProcessingQueue.updated_at < cutoff
+            ).all()
+            requeued = 0
+            for row in rows:
+                # Conditional, so a row is requeued once when processes recover together
+                if not db.execute(
+                    update(ProcessingQueue)
+                    .where(ProcessingQueue.id == row.id, ProcessingQueue.status == 'running',
+                           ProcessingQueue.updated_at < cutoff)
+                    .values(status='queued', updated_at=datetime.utcnow())
+                ).rowcount:
+                    continue
+                requeued += 1
+                ej = db.get(ExportJob, row.job_id)
+                if ej and ej.status == 'running':
+                    ej.status = 'queued'
+                    ej.progress = 0
+                    ej.updated_at = datetime.utcnow()
+            db.commit()
+            if requeued:
+                logger.warning(f"Requeued {requeued} interrupted export(s)")
+            return requeued
+        finally:
+            db.close()
+
+    def heartbeat(self) -> int:
+        """Refresh updated_at on the rows this process is rendering"""
+        with self._running_lock:
+            row_ids = list(self._running)
+        if not row_ids:
+            return 0
+        db = self._session()
+        try:
+            count = db.execute(
+                update(ProcessingQueue)
+                .where(ProcessingQueue.id.in_(row_ids), ProcessingQueue.status == 'running')
+                .values(updated_at=datetime.utcnow())
+            ).rowcount
+            db.commit()
+            return count
+        finally:
+            db.close()
+
+    def _heartbeat_loop(self):
+        while not self._stopped.wait(self.heartbeat_interval):
+            try:
+                self.heartbeat()
+                # Also picks up work from processes that died while this one runs
+                self.recover()
+            except Exception as e:
+                logger.error(f"Export heartbeat error: {e}")
+
+    def enqueue(self, export_job_id: str, user_id: Optional[str], priority: int = DEFAULT_PRIORITY,
+                db: Optional[Session] = None) -> str:
+        """Add an export to the queue and wake a worker"""
+        own_session = db is None
+        db = db or self._session()
+        try:
+            row = ProcessingQueue(
+                job_type=JOB_TYPE_EXPORT,
+                job_id=export_job_id,
+                user_id=user_id,
+                priority=priority,
+                status='queued'
+            )
+            db.add(row)
+            db.commit()
+            row_id = row.id
+        finally:
+            if own_session:
+                db.close()
+
+        with self._wakeup:
+            self._wakeup.notify()
+        return row_id
+
+    def _claim_next(self) -> Optional[Tuple[str, str]]:
+        """Pick the next row fairly, mark it running and return (row id, export id)"""
+        db = self._session()
+        try:
+            running: Dict[str, int] = {}
+            served: Dict[str, int] = {}  # running plus recently finished
+            since = datetime.utcnow() - timedelta(seconds=self.fairness_window)
+            for user_id, status in db.query(ProcessingQueue.user_id, ProcessingQueue.status).filter(
+                ProcessingQueue.job_type == JOB_TYPE_EXPORT,
+                (ProcessingQueue.status == 'running') | (
+                    ProcessingQueue.status.in_(('completed', 'failed')) &
+                    (ProcessingQueue.updated_at >= since)
+                )
+            ):
+                served[user_id] = served.get(user_id, 0) + 1
+                if status == 'running':
+                    running[user_id] = running.get(user_id, 0) + 1
+
+            queued = db.query(ProcessingQueue).filter(
+                ProcessingQueue.job_type == JOB_TYPE_EXPORT,
+                ProcessingQueue.status == 'queued'
+            ).order_by(ProcessingQueue.priority, ProcessingQueue.created_at).all()
+
+            # Round-robin between users: a user's n-th waiting export ranks as if
+            # n more of theirs had already been served
+            turn: Dict[str, int] = {}
+            seen = dict(served)
+            for row in sorted(queued, key=lambda r: r.created_at):
+                turn[row.id] = seen.get(row.user_id, 0)
+                seen[row.user_id] = turn[row.id] + 1
+
+            candidates = [r for r in queued if running.get(r.user_id, 0) < self.max_per_user] or queued
+            candidates.sort(key=lambda r: (r.priority, turn[r.id], r.created_at))
+
+            for row in candidates:
+                claimed = db.execute(
+                    update(ProcessingQueue)
+                    .where(ProcessingQueue.id == row.id, ProcessingQueue.status == 'queued')
+                    .values(status='running', updated_at=datetime.utcnow())
+                ).rowcount
+                db.commit()
+                if claimed:
+                    return row.id, row.job_id
+            return None
+        finally:
+            db.close()
+
+    def _finish(self, row_id: str, status: str, result: Optional[Dict] = None,
+                error: Optional[str] = None):
+        db = self._session()
+        try:
+            db.execute(
+                update(ProcessingQueue)
+                .where(ProcessingQueue.id == row_id)
+                .values(status=status, result_json=result, error_message=error,
+                        updated_at=datetime.utcnow())
+            )
+            db.commit()
+        except Exception as e:
+            logger.error(f"Failed to mark queue row {row_id} {status}: {e}")
+        finally:
+            db.close()
+
+    def _worker_loop(self):
+        while not self._stopping:
+            try:
+                claimed = self._claim_next()
+            except Exception as e:
+                # Database hiccup; back off instead of spinning
+                logger.error(f"Export worker error: {e}")
+                time.sleep(self.poll_interval)
+                continue
+
+            if claimed is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+
+            # The session is closed here so no transaction stays open for the render
+            row_id, export_job_id = claimed
+            with self._running_lock:
+                self._running.add(row_id)
+            try:
+                result = self.run_job(export_job_id)
+                self._finish(row_id, 'completed', result=result or {})
+            except Exception as e:
+                logger.error(f"Queued export {export_job_id} failed: {e}")
+                self._finish(row_id, 'failed', error=str(e))
+            finally:
+                with self._running_lock:
+                    self._running.discard(row_id)
+
+    def queue_depth(self) -> Dict[str, int]:
+        """Number of export rows per status"""
+        db = self._session()
+        try:
+            rows = db.query(ProcessingQueue.status, func.count(ProcessingQueue.id)).filter(
+                ProcessingQueue.job_type == JOB_TYPE_EXPORT
+            ).group_by(ProcessingQueue.status).all()
+            return {status: count for status, count in rows}
+        finally:
+            db.close()
@@ -5,16 +5,21 @@ Professional-grade export system with MIDI, stems, and stereo rendering
 
 import os
 import json
+import time
 import zipfile
 import tempfile
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 import numpy as np
 import soundfile as sf
 from sqlalchemy.orm import Session
 from ..models import ExportJob, Job, Section
 from ..deps import get_db
-import threading
+from .export_queue import ExportScheduler, DEFAULT_PRIORITY
+from .render_cache import RenderCache
+from .lane_cache import get_lane_cache
+from .progress_channel import ProgressThrottle
+from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,78 +27,286 @@ logger = logging.getLogger(__name__)
 class RenderEngine:
     """Professional audio rendering engine"""
     
-    def __init__(self, sr=48000):
+    def __init__(self, sr=48000, block_size=65536):
         self.sr = sr
-        self.export_dir = Path('/app/exports')
+        self.block_size = block_size
+        # Streaming keeps memory flat for long songs; can also be set per job
+        self.streaming = os.getenv('EXPORT_STREAMING', 'false').lower() == 'true'
+        # Render lanes in the shared process pool; can also be set per job
+        self.parallel = os.getenv('EXPORT_PARALLEL', 'false').lower() == 'true'
+        self.export_dir = Path(os.getenv('EXPORT_DIR', '/app/exports'))
         self.export_dir.mkdir(parents=True, exist_ok=True)
+        self.lane_cache = get_lane_cache()
+        self.render_cache = RenderCache(
+            Path(os.getenv('EXPORT_CACHE_DIR', str(self.export_dir / '.render_cache')))
+        )
     
-    def render_from_job(self, params: Dict) -> Dict[str, str]:
-        """Render audio from job parameters"""
+    def render_from_job(self, params: Dict,
+                        progress_callback: Optional[Callable[[float], None]] = None) -> Dict[str, str]:
+        """Render audio from job parameters
+        
+        Audio exports are looked up in the render cache first; a hit is
+        returned without rendering. progress_callback, if given, is called
+        with the completed fraction (0.0 - 1.0) as lanes and blocks finish.
+        """
         try:
             mode = params.get('mode') or params.get('export_mode')
             job_id = params.get('job_id', 'unknown')
-            midi_lanes = params.get('midi_lanes', {})
-            kit_map = params.get('kit_map', {})
             
             out_dir = self.export_dir / job_id
             out_dir.mkdir(parents=True, exist_ok=True)
             
-            # Initialize synth with kit mapping
-            from .synth import SamplerSynth
-            synth = SamplerSynth(sr=self.sr, kit_map=kit_map)
-            
-            # Render each lane
-            lane_audio = {}
-            for lane, events in midi_lanes.items():
-                if events:
-                    audio = synth.render_lane(events)
-                    # Apply processing chain
-                    from .mix_chains import build_channel_chain
-                    chain = build_channel_chain(lane, self.sr, params)
-                    processed_audio = chain.process(audio)
-                    lane_audio[lane] = processed_audio
-            
-            # Mix down
-            from .mix_chains import build_buses
-            buses = build_buses(self.sr, params)
-            stereo = buses.mixdown(lane_audio, params)
+            if mode == 'midi':
+                return {'zip': self._write_midi_zip(out_dir, params.get('midi_lanes', {}))}
             
-            paths = {}
+            use_cache = params.get('cache', True) and mode in ('stems', 'stereo')
+            if use_cache:
+                cache_key = self.render_cache.key_for(params, self.sr)
+                paths = self.render_cache.get(cache_key, out_dir)
+                if paths is not None:
+                    logger.info(f"Render cache hit for {job_id} ({cache_key[:12]})")
+                    if progress_callback:
+                        progress_callback(1.0)
+                    return paths
             
-            if mode == 'stems':
-                # Export individual stems in a zip
-                zip_path = out_dir / 'stems.zip'
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-                    for lane, audio in lane_audio.items():
-                        stem_path = out_dir / f"{lane}.wav"
-                        sf.write(stem_path, audio, self.sr, subtype='PCM_24')
-                        zf.write(stem_path, arcname=f"{lane}.wav")
-                        stem_path.unlink()  # Clean up individual files
-                paths['zip'] = str(zip_path)
-                
-            elif mode == 'stereo':
-                # Export stereo mix
-                stereo_path = out_dir / 'drums_stereo.wav'
-                sf.write(stereo_path, stereo, self.sr, subtype='PCM_24')
-                paths['stereo'] = str(stereo_path)
-                
-            elif mode == 'midi':
-                # Export MIDI files
-                zip_path = out_dir / 'midi_export.zip'
-                with zipfile.ZipFile(zip_path, 'w') as zf:
-                    for lane, events in midi_lanes.items():
-                        if events:
-                            midi_content = self._events_to_midi(events, lane)
-                            zf.writestr(f"{lane}.mid", midi_content)
-                    zf.writestr('README.txt', 'DrumTracKAI MIDI Export\nGenerated with v4/v5 engine')
-                paths['zip'] = str(zip_path)
+            # Outputs may be hard links into the cache; never write through them
+            for name in ('stems.zip', 'drums_stereo.wav'):
+                (out_dir / name).unlink(missing_ok=True)
             
+            started = time.perf_counter()
+            paths = self._render(params, out_dir, progress_callback)
+            if use_cache:
+                self.render_cache.put(cache_key, paths, time.perf_counter() - started)
             return paths
             
         except Exception as e:
             logger.error(f"Render error: {e}")
             raise
     
+    def _render(self, params: Dict, out_dir: Path,
+                progress_callback: Optional[Callable[[float], None]] = None) -> Dict[str, str]:
+        """Render stems or stereo audio into out_dir"""
+        report = progress_callback or (lambda fraction: None)
+        mode = params.get('mode') or params.get('export_mode')
+        midi_lanes = params.get('midi_lanes', {})
+        kit_map = params.get('kit_map', {})
+        
+        if params.get('streaming', self.streaming) and mode in ('stems', 'stereo'):
+            return self.render_streaming(params, out_dir, progress_callback)
+        
+        lane_audio = self.render_lanes(
+            midi_lanes, kit_map, params,
+            progress_callback=lambda fraction: report(0.8 * fraction)
+        )
+        
+        # Mix down
+        from .mix_chains import build_buses
+        buses = build_buses(self.sr, params)
+        stereo = buses.mixdown(lane_audio, params)
+        report(0.9)
+        
+        paths = {}
+        
+        if mode == 'stems':
+            # Export individual stems in a zip
+            for lane, audio in lane_audio.items():
+                sf.write(out_dir / f"{lane}.wav", audio, self.sr, subtype='PCM_24')
+            paths['zip'] = self._zip_stems(out_dir, list(lane_audio))
+            
+        elif mode == 'stereo':
+            # Export stereo mix
+            stereo_path = out_dir / 'drums_stereo.wav'
+            sf.write(stereo_path, stereo, self.sr, subtype='PCM_24')
+            paths['stereo'] = str(stereo_path)
+        
+        report(1.0)
+        return paths
+    
+    def render_lanes(self, midi_lanes: Dict[str, List[Dict]], kit_map: Dict[str, str], params: Dict,
+                     progress_callback: Optional[Callable[[float], None]] = None) -> Dict[str, np.ndarray]:
+        """Render and process every non-empty lane, reusing memoized lanes
+        
+        Only lanes whose events, channel-strip config or kit samples changed
+        since they were last rendered (in any export, preview or audition)
+        are synthesized again. Returns {lane: processed_audio} in lane order.
+        """
+        report = progress_callback or (lambda fraction: None)
+        lanes = {lane: events for lane, events in midi_lanes.items() if events}
+        use_cache = params.get('cache', True)
+        
+        lane_audio = {}
+        keys = {}
+        dirty = {}
+        for lane, events in lanes.items():
+            if use_cache:
+                keys[lane] = self.lane_cache.key_for(lane, events, params, kit_map, self.sr)
+                cached = self.lane_cache.get(keys[lane])
+                if cached is not None:
+                    lane_audio[lane] = cached
+                    continue
+            dirty[lane] = events
+        
+        if dirty:
+            logger.info(f"Rendering {len(dirty)}/{len(lanes)} lanes: {', '.join(dirty)}")
+        
+        cached_count = len(lane_audio)
+        
+        def finished(lane: str, audio: np.ndarray):
+            lane_audio[lane] = self.lane_cache.put(keys[lane], audio) if use_cache else audio
+        
+        if dirty and params.get('parallel', self.parallel):
+            # Render each dirty lane in the shared process pool
+            from .parallel_render import render_lanes_parallel
+            rendered = render_lanes_parallel(
+                self.sr, dirty, kit_map, params,
+                progress_callback=lambda fraction: report(
+                    (cached_count + fraction * len(dirty)) / len(lanes)
+                )
+            )
+            for lane, audio in rendered.items():
+                finished(lane, audio)
+        elif dirty:
+            # Initialize synth with kit mapping
+            from .synth import SamplerSynth
+            from .mix_chains import build_channel_chain
+            synth = SamplerSynth(sr=self.sr, kit_map=kit_map)
+            
+            for lane, events in dirty.items():
+                audio = synth.render_lane(events)
+                # Apply processing chain
+                chain = build_channel_chain(lane, self.sr, params)
+                finished(lane, chain.process(audio))
+                report(len(lane_audio) / len(lanes))
+        
+        return {lane: lane_audio[lane] for lane in lanes}
+    
+    def render_mix(self, midi_lanes: Dict[str, List[Dict]], kit_map: Dict[str, str], params: Dict,
+                   out_path: Path, max_seconds: Optional[float] = None) -> Path:
+        """Render a quick stereo mix (previews, auditions) through the lane cache
+        
+        CPU-bound: call it from a worker thread, not the event loop. The WAV
+        is written to a temporary name and renamed into place, so concurrent
+        renders of the same out_path never interleave.
+        """
+        from .mix_chains import build_buses
+        lane_audio = self.render_lanes(midi_lanes, kit_map, params)
+        mix = build_buses(self.sr, params).mixdown(lane_audio, params)
+        if max_seconds is not None:
+            mix = mix[:int(max_seconds * self.sr)]
+        out_path = Path(out_path)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix='.wav', prefix=f'.{out_path.stem}.', dir=out_path.parent)
+        os.close(fd)
+        try:
+            sf.write(tmp_path, mix, self.sr, subtype='PCM_16')
+            os.replace(tmp_path, out_path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        return out_path
+    
+    def render_streaming(self, params: Dict, out_dir: Path,
+                         progress_callback: Optional[Callable[[float], None]] = None) -> Dict[str, str]:
+        """Render stems/stereo block by block with flat memory use
+        
+        Each block of block_size samples goes synth -> channel strip -> bus
+        and straight into soundfile writers, so no lane is ever held in full.
+        The mix is streamed to a float scratch file first because the final
+        peak limiting needs the global peak; a second block-wise pass applies
+        it while converting to PCM_24.
+        """
+        from .synth import SamplerSynth
+        from .mix_chains import build_channel_chain, build_buses
+        
+        report = progress_callback or (lambda fraction: None)
+        mode = params.get('mode') or params.get('export_mode')
+        lanes = {lane: events for lane, events in params.get('midi_lanes', {}).items() if events}
+        synth = SamplerSynth(sr=self.sr, kit_map=params.get('kit_map', {}))
+        
+        lengths = {lane: synth.lane_length(events) for lane, events in lanes.items()}
+        total = max(lengths.values()) if lanes else int(1.0 * self.sr)
+        chains = {lane: build_channel_chain(lane, self.sr, params) for lane in lanes}
+        blocks = {lane: synth.render_lane_blocks(events, self.block_size) for lane, events in lanes.items()}
+        
+        stem_writers = {}
+        mix_writer = None
+        buses = None
+        mix_scratch = out_dir / 'drums_stereo.f32.wav'
+        peak = 0.0
+        
+        try:
+            if mode == 'stems':
+                for lane in lanes:
+                    stem_writers[lane] = sf.SoundFile(
+                        out_dir / f"{lane}.wav", 'w', self.sr, 1, subtype='PCM_24'
+                    )
+            else:
+                mix_writer = sf.SoundFile(mix_scratch, 'w', self.sr, 1, subtype='FLOAT')
+                if lanes:
+                    buses = build_buses(self.sr, params)
+            
+            for block_start in range(0, total, self.block_size):
+                length = min(self.block_size, total - block_start)
+                
+                lane_block = {}
+                for lane in lanes:
+                    if block_start < lengths[lane]:
+                        audio = chains[lane].process(next(blocks[lane]))
+                        lane_block[lane] = audio
+                        if lane in stem_writers:
+                            stem_writers[lane].write(audio)
+                
+                if mix_writer is not None:
+                    if buses is not None:
+                        mix = buses.process_block(lane_block, params, length)
+                    else:
+                        mix = np.zeros(length, dtype=np.float32)
+                    peak = max(peak, float(np.max(np.abs(mix))))
+                    mix_writer.write(mix)
+                
+                report(0.9 * (block_start + length) / total)
+        finally:
+            for writer in stem_writers.values():
+                writer.close()
+            if mix_writer is not None:
+                mix_writer.close()
+        
+        if mode == 'stems':
+            paths = {'zip': self._zip_stems(out_dir, list(lanes))}
+            report(1.0)
+            return paths
+        
+        # Final limiting to prevent clipping (same rule as MixBus.mixdown)
+        gain = 0.95 / peak if peak > 0.95 else 1.0
+        stereo_path = out_dir / 'drums_stereo.wav'
+        with sf.SoundFile(stereo_path, 'w', self.sr, 1, subtype='PCM_24') as dst:
+            for block in sf.blocks(str(mix_scratch), blocksize=self.block_size, dtype='float32'):
+                dst.write(block * gain)
+        mix_scratch.unlink()
+        report(1.0)
+        return {'stereo': str(stereo_path)}
+    
+    def _zip_stems(self, out_dir: Path, lanes: List[str]) -> str:
+        """Zip the stem WAVs written to out_dir and remove the loose files"""
+        zip_path = out_dir / 'stems.zip'
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for lane in lanes:
+                stem_path = out_dir / f"{lane}.wav"
+                zf.write(stem_path, arcname=f"{lane}.wav")
+                stem_path.unlink()  # Clean up individual files
+        return str(zip_path)
+    
+    def _write_midi_zip(self, out_dir: Path, midi_lanes: Dict[str, List[Dict]]) -> str:
+        """Export MIDI files"""
+        zip_path = out_dir / 'midi_export.zip'
+        with zipfile.ZipFile(zip_path, 'w') as zf:
+            for lane, events in midi_lanes.items():
+                if events:
+                    midi_content = self._events_to_midi(events, lane)
+                    zf.writestr(f"{lane}.mid", midi_content)
+            zf.writestr('README.txt', 'DrumTracKAI MIDI Export\nGenerated with v4/v5 engine')
+        return str(zip_path)
+    
     def _events_to_midi(self, events: List[Dict], lane: str) -> bytes:
         """Convert events to MIDI bytes (simplified implementation)"""
         # This is a placeholder - implement proper MIDI file generation
@@ -104,59 +317,77 @@ class RenderEngine:
 class ExportService:
     """Main export service"""
     
-    def __init__(self):
+    def __init__(self, workers: Optional[int] = None):
         self.render_engine = RenderEngine()
-        self.active_jobs = {}
+        self.scheduler = ExportScheduler(self._run_export, workers=workers)
+    
+    def start(self):
+        """Requeue interrupted exports and start the export workers"""
+        self.scheduler.start()
     
-    def queue_export(self, export_job_id: str):
+    def queue_export(self, export_job_id: str, user_id: Optional[str] = None,
+                     priority: int = DEFAULT_PRIORITY):
         """Queue an export job for background processing"""
-        thread = threading.Thread(
-            target=self._run_export, 
-            args=(export_job_id,), 
-            daemon=True
-        )
-        thread.start()
-        self.active_jobs[export_job_id] = thread
+        self.scheduler.enqueue(export_job_id, user_id, priority)
+        self.scheduler.start()
     
-    def _run_export(self, export_job_id: str):
-        """Run export job in background"""
+    def _run_export(self, export_job_id: str) -> Dict[str, str]:
+        """Run export job on a scheduler worker; raises on failure"""
         from ..deps import SessionLocal
         
         db: Session = SessionLocal()
         try:
             ej = db.query(ExportJob).get(export_job_id)
             if not ej:
-                logger.error(f"Export job {export_job_id} not found")
-                return
+                raise ValueError(f"Export job {export_job_id} not found")
             
             # Update status
             ej.status = 'running'
             ej.progress = 5
+            ej.updated_at = datetime.utcnow()
             db.commit()
+            params = ej.params_json or {}
+            
+            last = {'progress': ej.progress}
+            
+            def write_progress(fraction: float):
+                # Map render progress onto 5-99; only write whole-percent changes
+                progress = min(99, 5 + int(94 * fraction))
+                if progress > last['progress']:
+                    last['progress'] = progress
+                    ej.progress = progress
+                    ej.updated_at = datetime.utcnow()
+                    db.commit()
+            
+            # At most PROGRESS_MAX_RATE commits a second
+            on_progress = ProgressThrottle(write_progress)
             
             # Render
             logger.info(f"Starting export job {export_job_id}")
-            paths = self.render_engine.render_from_job(ej.params_json)
+            paths = self.render_engine.render_from_job(params, progress_callback=on_progress)
             
             # Complete
             ej.status = 'done'
             ej.progress = 100
             ej.result_path = paths.get('zip') or paths.get('stereo')
+            ej.updated_at = datetime.utcnow()
             db.commit()
             
             logger.info(f"Export job {export_job_id} completed: {ej.result_path}")
+            return paths
             
         except Exception as e:
             logger.error(f"Export job {export_job_id} failed: {e}")
+            db.rollback()
             ej = db.query(ExportJob).get(export_job_id)
             if ej:
                 ej.status = 'error'
                 ej.error = str(e)
+                ej.updated_at = datetime.utcnow()
                 db.commit()
+            raise
         finally:
             db.close()
-            if export_job_id in self.active_jobs:
-                del self.active_jobs[export_job_id]
     
     def get_export_status(self, export_job_id: str, db: Session) -> Dict:
         """Get export job status"""
@@ -173,7 +404,8 @@ class ExportService:
             "updated_at": ej.updated_at.isoformat() if ej.updated_at else None
         }
     
-    def create_export_job(self, job_id: str, user_id: str, mode: str, params: Dict, db: Session) -> str:
+    def create_export_job(self, job_id: str, user_id: str, mode: str, params: Dict, db: Session,
+                          priority: int = DEFAULT_PRIORITY) -> str:
         """Create a new export job"""
         ej = ExportJob(
             job_id=job_id,
@@ -187,6 +419,6 @@ class ExportService:
         db.refresh(ej)
         
         # Queue for processing
-        self.queue_export(ej.id)
+        self.queue_export(ej.id, user_id, priority)
         
         return ej.id
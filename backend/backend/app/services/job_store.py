@@ -0,0 +1,262 @@
+"""
+DrumTracKAI v4/v5 Job Store
+Durable registry of jobs and uploads: SQLite in WAL mode behind a small
+in-memory LRU, with indexed lookup by user and status and TTL cleanup of
+finished records and their files
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+import logging
+
+from .progress_channel import TERMINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+class JobStore:
+    """Records (JSON-serializable dicts) by id, persisted in one SQLite table
+
+    ``user_id``, ``status`` and ``path`` fields of a record are mirrored
+    into indexed columns for ``find``. Records returned by ``get`` are the
+    cached objects: change them through ``update`` so the change is
+    persisted. With ``expire_when_finished`` a record expires ``ttl``
+    seconds after it reaches a terminal status; otherwise ``ttl`` seconds
+    after it was last written or touched. ``cleanup`` deletes expired
+    records, calling ``on_expire(record)`` for each first so their files can
+    be removed.
+
+    Meant for a single server process; other processes may read the
+    database but do not see each other's cached records.
+    """
+
+    def __init__(self, db_path: Union[str, Path], table: str, ttl: Optional[float] = None,
+                 expire_when_finished: bool = True, cache_size: Optional[int] = None,
+                 on_expire: Optional[Callable[[Dict[str, Any]], None]] = None):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.table = table
+        self.ttl = ttl if ttl is not None else float(os.getenv('JOB_STORE_TTL', 24 * 3600))
+        self.expire_when_finished = expire_when_finished
+        self.cache_size = cache_size or int(os.getenv('JOB_STORE_CACHE_SIZE', 512))
+        self.on_expire = on_expire
+        self._cache: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.RLock()
+        self._cleanup_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.expired = 0
+
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('PRAGMA busy_timeout=5000')
+        self._db.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                id TEXT PRIMARY KEY,
+                user_id TEXT,
+                status TEXT,
+                path TEXT,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                expires_at REAL
+            )''')
+        self._db.execute(f'CREATE INDEX IF NOT EXISTS {table}_user ON {table} (user_id, status)')
+        self._db.execute(f'CREATE INDEX IF NOT EXISTS {table}_status ON {table} (status)')
+        self._db.execute(f'CREATE INDEX IF NOT EXISTS {table}_path ON {table} (path)')
+        self._db.execute(f'CREATE INDEX IF NOT EXISTS {table}_expires ON {table} (expires_at)')
+
+    # Cache front
+
+    def _remember(self, record_id: str, record: Dict[str, Any]):
+        self._cache[record_id] = record
+        self._cache.move_to_end(record_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _load(self, record_id: str) -> Optional[Dict[str, Any]]:
+        record = self._cache.get(record_id)
+        if record is not None:
+            self._cache.move_to_end(record_id)
+            return record
+        row = self._db.execute(f'SELECT data FROM {self.table} WHERE id = ?', (record_id,)).fetchone()
+        if row is None:
+            return None
+        record = json.loads(row[0])
+        self._remember(record_id, record)
+        return record
+
+    # Persistence
+
+    def _expires_at(self, record: Dict[str, Any], now: float, previous: Optional[float]) -> Optional[float]:
+        if not self.expire_when_finished:
+            return now + self.ttl
+        if record.get('status') in TERMINAL_STATUSES:
+            return previous or now + self.ttl
+        return None
+
+    def _write(self, record_id: str, record: Dict[str, Any]):
+        now = time.time()
+        row = self._db.execute(f'SELECT created_at, expires_at FROM {self.table} WHERE id = ?',
+                               (record_id,)).fetchone()
+        created_at, previous = row if row else (now, None)
+        self._db.execute(
+            f'INSERT OR REPLACE INTO {self.table} '
+            f'(id, user_id, status, path, data, created_at, updated_at, expires_at) '
+            f'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (record_id, record.get('user_id'), record.get('status'), record.get('path'),
+             json.dumps(record, default=str), created_at, now, self._expires_at(record, now, previous))
+        )
+
+    # Mapping-style access
+
+    def __contains__(self, record_id: str) -> bool:
+        return self.get(record_id) is not None
+
+    def __getitem__(self, record_id: str) -> Dict[str, Any]:
+        record = self.get(record_id)
+        if record is None:
+            raise KeyError(record_id)
+        return record
+
+    def __setitem__(self, record_id: str, record: Dict[str, Any]):
+        self.put(record_id, record)
+
+    def __delitem__(self, record_id: str):
+        if not self.delete(record_id):
+            raise KeyError(record_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            ids = [row[0] for row in self._db.execute(f'SELECT id FROM {self.table}')]
+        return iter(ids)
+
+    def keys(self) -> List[str]:
+        return list(self)
+
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._load(record_id)
+
+    def put(self, record_id: str, record: Dict[str, Any]):
+        """Insert or replace a record"""
+        with self._lock:
+            self._write(record_id, record)
+            self._remember(record_id, record)
+
+    def update(self, record_id: str, **fields) -> Optional[Dict[str, Any]]:
+        """Set fields of a record; None if it does not exist"""
+        with self._lock:
+            record = self._load(record_id)
+            if record is None:
+                return None
+            record.update(fields)
+            self._write(record_id, record)
+            return record
+
+    def touch(self, record_id: str):
+        """Write a record unchanged (restarts a last-use TTL)"""
+        self.update(record_id)
+
+    def delete(self, record_id: str) -> bool:
+        with self._lock:
+            self._cache.pop(record_id, None)
+            return self._db.execute(f'DELETE FROM {self.table} WHERE id = ?', (record_id,)).rowcount > 0
+
+    def find(self, user_id: Optional[str] = None, status: Optional[str] = None,
+             path: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Records matching all given fields, newest first"""
+        clauses, params = [], []
+        for column, value in (('user_id', user_id), ('status', status), ('path', path)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._lock:
+            rows = self._db.execute(
+                f'SELECT id FROM {self.table} {where} ORDER BY created_at DESC LIMIT ?', (*params, limit)
+            ).fetchall()
+            return [record for record in (self._load(row[0]) for row in rows) if record is not None]
+
+    def fail_unfinished(self, error: str) -> int:
+        """Mark records left in a non-terminal status (e.g. by a restart) failed"""
+        placeholders = ', '.join('?' for _ in TERMINAL_STATUSES)
+        with self._lock:
+            rows = self._db.execute(
+                f'SELECT id FROM {self.table} WHERE status IS NOT NULL AND status NOT IN ({placeholders})',
+                tuple(TERMINAL_STATUSES)
+            ).fetchall()
+            for (record_id,) in rows:
+                self.update(record_id, status='failed', error=error)
+        if rows:
+            logger.info(f"Marked {len(rows)} unfinished {self.table} records failed")
+        return len(rows)
+
+    # TTL cleanup
+
+    def cleanup(self) -> int:
+        """Delete expired records (after on_expire); returns how many"""
+        with self._lock:
+            rows = self._db.execute(f'SELECT id, data FROM {self.table} WHERE expires_at <= ?',
+                                    (time.time(),)).fetchall()
+            for record_id, _ in rows:
+                self._cache.pop(record_id, None)
+                self._db.execute(f'DELETE FROM {self.table} WHERE id = ?', (record_id,))
+            self.expired += len(rows)
+        # Outside the lock: on_expire may look up other records
+        if self.on_expire is not None:
+            for record_id, data in rows:
+                try:
+                    self.on_expire(json.loads(data))
+                except Exception as e:
+                    logger.warning(f"Cleanup of expired {self.table} record {record_id} failed: {e}")
+        if rows:
+            logger.info(f"Expired {len(rows)} {self.table} records")
+        return len(rows)
+
+    def start_cleanup(self, interval: Optional[float] = None):
+        """Run cleanup every ``interval`` seconds on a daemon thread"""
+        if self._cleanup_thread is not None:
+            return
+        interval = interval or float(os.getenv('JOB_STORE_CLEANUP_INTERVAL', 300))
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.cleanup()
+                except Exception as e:
+                    logger.error(f"{self.table} cleanup failed: {e}")
+
+        self._cleanup_thread = threading.Thread(target=run, name=f'{self.table}-cleanup', daemon=True)
+        self._cleanup_thread.start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_status = dict(self._db.execute(
+                f'SELECT COALESCE(status, \'\'), COUNT(*) FROM {self.table} GROUP BY status').fetchall())
+            return {
+                'records': sum(by_status.values()),
+                'by_status': by_status,
+                'cached': len(self._cache),
+                'expired': self.expired,
+                'ttl': self.ttl
+            }
+
+    def close(self):
+        self._stop.set()
+        if self._cleanup_thread is not None:
+            self._cleanup_thread.join(timeout=5)
+            self._cleanup_thread = None
+        with self._lock:
+            self._db.close()
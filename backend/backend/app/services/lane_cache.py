@@ -0,0 +1,101 @@
+"""
+DrumTracKAI v4/v5 Lane Render Memoization
+Process-wide cache of post-ChannelStrip lane buffers so a re-render only
+re-synthesizes and re-processes the lanes that changed
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+import numpy as np
+import logging
+
+from .render_cache import sample_digest
+
+logger = logging.getLogger(__name__)
+
+# Bump when a change to the synth or channel strips alters lane audio
+LANE_CACHE_VERSION = 1
+
+class LaneCache:
+    """Byte-budgeted LRU of processed lane buffers
+
+    A lane's key covers its events, its channel-strip config
+    (``params['processing'][lane]``), the contents of the kit samples its
+    events trigger and the sample rate, so changing the snare EQ or adding a
+    hi-hat note only invalidates that lane. Volumes and the mix bus are
+    applied after the lane buffer and are deliberately not part of the key.
+    Cached buffers are read-only and shared, never copied.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes or int(os.getenv('EXPORT_LANE_CACHE_BYTES', 512 * 1024 ** 2))
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(lane: str, events: List[Dict], params: Dict[str, Any], kit_map: Dict[str, str],
+                sr: int) -> str:
+        """Hash of everything that determines one processed lane buffer"""
+        sample_keys = sorted({e.get('lane', e.get('key', 'kick')) for e in events})
+        canonical = {
+            'version': LANE_CACHE_VERSION,
+            'lane': lane,
+            'sr': sr,
+            'events': events,
+            'chain': params.get('processing', {}).get(lane, {}),
+            'samples': {
+                key: [kit_map.get(key), sample_digest(kit_map[key]) if kit_map.get(key) else None]
+                for key in sample_keys
+            },
+        }
+        blob = json.dumps(canonical, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return audio
+
+    def put(self, key: str, audio: np.ndarray) -> np.ndarray:
+        """Store a processed lane; returns the (now read-only) buffer"""
+        audio.flags.writeable = False
+        if audio.nbytes > self.max_bytes:
+            return audio
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+            self._entries[key] = audio
+            self._bytes += audio.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+        return audio
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+
+# Process-wide cache shared by exports, previews and auditions
+lane_cache = LaneCache()
+
+def get_lane_cache() -> LaneCache:
+    """Get the shared lane cache"""
+    return lane_cache
@@ -7,6 +7,14 @@ import numpy as np
 from scipy import signal
 from typing import Dict, List, Any, Optional
 import logging
+from .convolution import (
+    DEFAULT_BLOCK_SIZE, DEFAULT_IR_KEY, PartitionedConvolver, get_ir_spectrum_cache
+)
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 logger = logging.getLogger(__name__)
 
@@ -69,6 +77,48 @@ class BiquadFilter(DSPProcessor):
         filtered, self.zi = signal.lfilter(self.b, self.a, audio, zi=self.zi)
         return filtered
 
+def _follow_envelope_py(target, state, attack_coeff, release_coeff):
+    """Asymmetric one-pole smoothing of ``target`` (pure Python fallback)"""
+    smoothed = np.empty_like(target)
+    for i in range(target.shape[0]):
+        value = target[i]
+        coeff = attack_coeff if value > state else release_coeff
+        state = value + (state - value) * coeff
+        smoothed[i] = state
+    return smoothed, state
+
+if njit is not None:
+    _follow_envelope = njit(cache=True, nogil=True)(_follow_envelope_py)
+else:
+    _follow_envelope = _follow_envelope_py
+
+class EnvelopeFollower:
+    """Attack/release envelope follower shared by the dynamics processors
+
+    Each output sample moves towards the input by ``1 - attack_coeff`` when
+    the input is above the current envelope and by ``1 - release_coeff``
+    otherwise. The recursion runs in a compiled kernel (numba) over the whole
+    block when available, and the envelope carries over between calls. With
+    ``initial=None`` the envelope starts at the first input sample.
+    """
+    
+    def __init__(self, attack_coeff: float, release_coeff: float, initial: Optional[float] = 0.0):
+        self.attack_coeff = float(attack_coeff)
+        self.release_coeff = float(release_coeff)
+        self.state = initial
+    
+    def process(self, target: np.ndarray) -> np.ndarray:
+        """Smooth a block of detector values, returns float64"""
+        target = np.asarray(target, dtype=np.float64)
+        if len(target) == 0:
+            return target
+        if self.state is None:
+            self.state = float(target[0])
+        smoothed, self.state = _follow_envelope(
+            target, float(self.state), self.attack_coeff, self.release_coeff
+        )
+        return smoothed
+
 class TransientProcessor(DSPProcessor):
     """Transient shaper for drums"""
     
@@ -76,27 +126,22 @@ class TransientProcessor(DSPProcessor):
         super().__init__(sr)
         self.attack = attack  # -1 to 1
         self.sustain = sustain  # -1 to 1
+        # alpha 0.01 on the way up, 0.001 on the way down
+        self.follower = EnvelopeFollower(0.99, 0.999, initial=None)
+        self.last_smoothed = None
     
     def process(self, audio: np.ndarray) -> np.ndarray:
         """Shape transients"""
-        # Simple envelope follower
-        envelope = np.abs(audio)
-        
-        # Smooth the envelope
-        alpha = 0.01
-        smoothed = np.zeros_like(envelope)
-        smoothed[0] = envelope[0]
+        if len(audio) == 0:
+            return audio
         
-        for i in range(1, len(envelope)):
-            if envelope[i] > smoothed[i-1]:
-                # Attack
-                smoothed[i] = alpha * envelope[i] + (1 - alpha) * smoothed[i-1]
-            else:
-                # Release
-                smoothed[i] = 0.001 * envelope[i] + 0.999 * smoothed[i-1]
+        # Simple envelope follower
+        smoothed = self.follower.process(np.abs(audio)).astype(audio.dtype, copy=False)
         
         # Detect transients (rapid changes in envelope)
-        transient_strength = np.diff(smoothed, prepend=smoothed[0])
+        prev = smoothed[0] if self.last_smoothed is None else self.last_smoothed
+        self.last_smoothed = smoothed[-1]
+        transient_strength = np.diff(smoothed, prepend=prev)
         transient_strength = np.maximum(transient_strength, 0)  # Only positive changes
         
         # Apply transient shaping
@@ -138,67 +183,84 @@ class Saturator(DSPProcessor):
         return self.mix * saturated + (1 - self.mix) * audio
 
 class Compressor(DSPProcessor):
-    """Dynamic range compressor"""
+    """Dynamic range compressor
+
+    Level detection and the gain computer run vectorised over blocks of
+    ``block_size`` samples; only the attack/release recursion is sequential
+    and runs in the shared ``EnvelopeFollower``. The smoothing envelope
+    carries over between blocks and between ``process`` calls, so
+    output matches the original per-sample implementation to within float64
+    rounding (max abs difference < 1e-6).
+    """
     
     def __init__(self, sr: int, threshold: float = -12, ratio: float = 4, 
-                 attack: float = 0.003, release: float = 0.1):
+                 attack: float = 0.003, release: float = 0.1, block_size: int = 65536):
         super().__init__(sr)
         self.threshold = threshold  # dB
         self.ratio = ratio
-        self.attack_coeff = np.exp(-1 / (attack * sr))
-        self.release_coeff = np.exp(-1 / (release * sr))
-        self.envelope = 0
+        self.block_size = block_size
+        self.follower = EnvelopeFollower(
+            np.exp(-1 / (attack * sr)),
+            np.exp(-1 / (release * sr))
+        )
     
     def process(self, audio: np.ndarray) -> np.ndarray:
         """Apply compression"""
-        output = np.zeros_like(audio)
+        output = np.empty_like(audio)
+        slope = 1 - 1 / self.ratio
         
-        for i, sample in enumerate(audio):
-            # Convert to dB
-            level_db = 20 * np.log10(max(abs(sample), 1e-6))
+        for start in range(0, len(audio), self.block_size):
+            block = audio[start:start + self.block_size]
             
-            # Calculate gain reduction
-            if level_db > self.threshold:
-                excess = level_db - self.threshold
-                gain_reduction = excess * (1 - 1/self.ratio)
-            else:
-                gain_reduction = 0
+            # Level detector (dB)
+            level_db = 20 * np.log10(np.maximum(np.abs(block).astype(np.float64), 1e-6))
+            
+            # Gain computer
+            gain_reduction = np.maximum(level_db - self.threshold, 0.0) * slope
             
             # Smooth gain reduction with attack/release
-            if gain_reduction > self.envelope:
-                # Attack
-                self.envelope = gain_reduction + (self.envelope - gain_reduction) * self.attack_coeff
-            else:
-                # Release
-                self.envelope = gain_reduction + (self.envelope - gain_reduction) * self.release_coeff
+            smoothed = self.follower.process(gain_reduction)
             
             # Apply gain reduction
-            gain_linear = 10 ** (-self.envelope / 20)
-            output[i] = sample * gain_linear
+            output[start:start + len(block)] = block * 10 ** (-smoothed / 20)
         
         return output
 
 class ConvolutionReverb(DSPProcessor):
-    """Convolution reverb using impulse responses"""
+    """Convolution reverb using impulse responses
+
+    Uses partitioned FFT convolution; IR spectra come from the process-wide
+    IR spectrum cache so each IR is loaded and transformed once per sample
+    rate. The wet signal is aligned with the dry signal (causal convolution).
+    """
     
-    def __init__(self, sr: int, ir_path: Optional[str] = None, mix: float = 0.2):
+    def __init__(self, sr: int, ir_path: Optional[str] = None, mix: float = 0.2,
+                 block_size: int = DEFAULT_BLOCK_SIZE):
         super().__init__(sr)
         self.mix = mix
-        self.ir = self._load_ir(ir_path) if ir_path else self._generate_default_ir()
+        self.ir_path = ir_path
+        
+        cache = get_ir_spectrum_cache()
+        spectra = None
+        if ir_path:
+            try:
+                spectra = cache.get(ir_path, sr, lambda: self._load_ir(ir_path), block_size)
+            except Exception as e:
+                logger.warning(f"Failed to load IR {ir_path}: {e}")
+        if spectra is None:
+            spectra = cache.get(DEFAULT_IR_KEY, sr, self._generate_default_ir, block_size)
+        
+        self.convolver = PartitionedConvolver(spectra, block_size)
     
     def _load_ir(self, ir_path: str) -> np.ndarray:
         """Load impulse response from file"""
-        try:
-            import soundfile as sf
-            ir, sr = sf.read(ir_path)
-            if sr != self.sr:
-                from scipy.signal import resample
-                N = int(len(ir) * self.sr / sr)
-                ir = resample(ir, N)
-            return ir.astype(np.float32)
-        except Exception as e:
-            logger.warning(f"Failed to load IR {ir_path}: {e}")
-            return self._generate_default_ir()
+        import soundfile as sf
+        ir, sr = sf.read(ir_path)
+        if sr != self.sr:
+            from scipy.signal import resample
+            N = int(len(ir) * self.sr / sr)
+            ir = resample(ir, N)
+        return ir.astype(np.float32)
     
     def _generate_default_ir(self) -> np.ndarray:
         """Generate a simple algorithmic reverb IR"""
@@ -226,7 +288,7 @@ class ConvolutionReverb(DSPProcessor):
     def process(self, audio: np.ndarray) -> np.ndarray:
         """Apply convolution reverb"""
         # Convolve with impulse response
-        wet = np.convolve(audio, self.ir, mode='same')
+        wet = self.convolver.process(audio).astype(audio.dtype, copy=False)
         
         # Mix wet and dry
         return (1 - self.mix) * audio + self.mix * wet
@@ -328,19 +390,32 @@ class MixBus:
         # Find the longest audio
         max_len = max(len(audio) for audio in lane_audio.values())
         
-        # Mix all lanes
-        mix = np.zeros(max_len, dtype=np.float32)
+        # Mix all lanes and apply bus processing
+        mix = self.process_block(lane_audio, params, max_len)
+        
+        # Final limiting to prevent clipping
+        peak = np.max(np.abs(mix))
+        if peak > 0.95:
+            mix = mix * (0.95 / peak)
+        
+        return mix
+    
+    def process_block(self, lane_audio: Dict[str, np.ndarray], params: Dict[str, Any],
+                      length: int) -> np.ndarray:
+        """Sum one block of lane audio and run it through the bus processing
+        
+        Lanes shorter than ``length`` are zero-padded. Bus processors keep
+        their state between calls, so consecutive blocks can be streamed
+        through; the final peak limiting is left to the caller.
+        """
+        mix = np.zeros(length, dtype=np.float32)
         
         for lane, audio in lane_audio.items():
             # Get lane volume from params
             volume = params.get('volumes', {}).get(lane, 0.8)
             
-            # Pad audio to match max length
-            if len(audio) < max_len:
-                audio = np.pad(audio, (0, max_len - len(audio)))
-            
-            # Add to mix
-            mix += audio * volume
+            # Add to mix (shorter lanes are implicitly padded)
+            mix[:len(audio)] += audio * volume
         
         # Apply bus processing
         mix = self.channel_strip.process(mix)
@@ -349,11 +424,6 @@ class MixBus:
         if self.reverb:
             mix = self.reverb.process(mix)
         
-        # Final limiting to prevent clipping
-        peak = np.max(np.abs(mix))
-        if peak > 0.95:
-            mix = mix * (0.95 / peak)
-        
         return mix
 
 def build_channel_chain(lane: str, sr: int, params: Dict[str, Any]) -> ChannelStrip:
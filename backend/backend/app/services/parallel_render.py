@@ -0,0 +1,146 @@
+"""
+DrumTracKAI v4/v5 Parallel Lane Rendering
+Renders and processes export lanes in a shared process pool; lane buffers
+come back to the parent through shared memory instead of being pickled
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Dict, List, Any, Optional, Tuple
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RENDER_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Get the process-wide lane render pool (created on first use)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = int(os.getenv('EXPORT_RENDER_WORKERS', DEFAULT_RENDER_WORKERS))
+            _pool = ProcessPoolExecutor(max_workers=max(1, workers))
+            logger.info(f"Started lane render pool with {workers} workers")
+        return _pool
+
+def _discard_render_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool so the next get_render_pool() starts a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_render_pool():
+    """Stop the lane render pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+def _render_lane_task(sr: int, kit_map: Dict[str, str], lane: str, events: List[Dict],
+                      params: Dict[str, Any]) -> Tuple[str, int, str]:
+    """Worker: synth + channel strip for one lane, result left in shared memory"""
+    from .synth import SamplerSynth
+    from .mix_chains import build_channel_chain
+
+    synth = SamplerSynth(sr=sr, kit_map=kit_map)
+    audio = build_channel_chain(lane, sr, params).process(synth.render_lane(events))
+
+    # Ownership passes to the parent, which unlinks the segment after copying
+    shm = _create_untracked_segment(max(audio.nbytes, 1))
+    try:
+        np.ndarray(audio.shape, dtype=audio.dtype, buffer=shm.buf)[:] = audio
+        return shm.name, len(audio), audio.dtype.str
+    finally:
+        shm.close()
+
+def _create_untracked_segment(size: int) -> shared_memory.SharedMemory:
+    """Create a shared memory segment this process's resource tracker won't unlink at exit"""
+    try:
+        return shared_memory.SharedMemory(create=True, size=size, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    # The tracker registered the private _name (with the leading '/' on
+    # POSIX), which the public shm.name may not match
+    name = getattr(shm, '_name', None)
+    if name is not None:
+        resource_tracker.unregister(name, 'shared_memory')
+    return shm
+
+def _collect_lane(name: str, length: int, dtype: str) -> np.ndarray:
+    """Parent: copy a lane out of shared memory and release the segment"""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return np.ndarray((length,), dtype=np.dtype(dtype), buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+def render_lanes_parallel(sr: int, midi_lanes: Dict[str, List[Dict]], kit_map: Dict[str, str],
+                          params: Dict[str, Any],
+                          progress_callback: Optional[Callable[[float], None]] = None) -> Dict[str, np.ndarray]:
+    """Render and process every non-empty lane in the shared pool
+
+    Returns the same {lane: processed_audio} mapping as the serial loop in
+    RenderEngine.render_lanes, in lane order. progress_callback gets the
+    fraction of lanes finished. If a worker dies (the pool breaks), the pool
+    is replaced and the unfinished lanes are rendered once more.
+    """
+    # Workers only need the per-lane processing config, not every lane's events
+    chain_params = {'processing': params.get('processing', {})}
+    lanes = {lane: events for lane, events in midi_lanes.items() if events}
+    collected = {}
+
+    for attempt in range(2):
+        pool = get_render_pool()
+        pending = {lane: events for lane, events in lanes.items() if lane not in collected}
+        try:
+            _render_into(pool, sr, kit_map, pending, chain_params, collected, len(lanes), progress_callback)
+            break
+        except BrokenProcessPool as e:
+            _discard_render_pool(pool)
+            if attempt:
+                raise
+            logger.warning(f"Lane render pool broke ({e}), retrying {len(lanes) - len(collected)} lanes in a new pool")
+    return {lane: collected[lane] for lane in lanes}
+
+def _render_into(pool: ProcessPoolExecutor, sr: int, kit_map: Dict[str, str], lanes: Dict[str, List[Dict]],
+                 chain_params: Dict[str, Any], collected: Dict[str, np.ndarray], total: int,
+                 progress_callback: Optional[Callable[[float], None]]):
+    """Render ``lanes`` in ``pool`` into ``collected``; raises BrokenProcessPool first if the pool broke"""
+    futures = {}
+    error = None
+    for lane, events in lanes.items():
+        try:
+            futures[pool.submit(_render_lane_task, sr, kit_map, lane, events, chain_params)] = lane
+        except BrokenProcessPool as e:
+            error = e
+            break
+
+    broken = error
+    for future in as_completed(futures):
+        lane = futures[future]
+        try:
+            collected[lane] = _collect_lane(*future.result())
+        except Exception as e:
+            # Keep draining so no shared memory segment is leaked
+            logger.error(f"Lane {lane} render failed: {e}")
+            error = error or e
+            if isinstance(e, BrokenProcessPool):
+                broken = broken or e
+        if progress_callback:
+            progress_callback(len(collected) / total)
+    if broken is not None:
+        raise broken
+    if error is not None:
+        raise error
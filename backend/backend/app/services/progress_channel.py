@@ -0,0 +1,169 @@
+"""
+DrumTracKAI v4/v5 Progress Channel
+Per-job coalescing and rate limiting of progress updates: at most
+PROGRESS_MAX_RATE updates per second per job reach clients, the newest one
+wins, and terminal states are always delivered at once
+"""
+
+import os
+import time
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Job statuses that end a job; their updates are never held back
+TERMINAL_STATUSES = frozenset({'completed', 'failed', 'cancelled', 'done', 'error'})
+
+def _max_rate(max_rate: Optional[float]) -> float:
+    return max_rate if max_rate is not None else float(os.getenv('PROGRESS_MAX_RATE', 10))
+
+class ProgressChannel:
+    """Coalesces each job's progress messages before ``publish(job_id, message)``
+
+    A message for a job that published less than ``1 / max_rate`` seconds
+    ago is held back, replacing any message already held, and published
+    when the interval is up. A message whose ``status`` is terminal
+    discards the held one and is published immediately, after which no
+    older message for the job is published. ``max_rate`` 0 disables the
+    limit.
+
+    A terminal message also drops all of the job's state; ``forget`` drops
+    it for jobs that ended without one.
+    """
+
+    def __init__(self, publish: Callable[[str, Dict[str, Any]], Awaitable[None]],
+                 max_rate: Optional[float] = None):
+        self.publish = publish
+        rate = _max_rate(max_rate)
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._last: Dict[str, float] = {}  # job_id -> when it last published
+        self._held: Dict[str, Dict[str, Any]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._releasing: Dict[str, Set[object]] = {}  # tokens of released, unpublished messages
+        self._tasks: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.received = 0
+        self.published = 0
+
+    async def report(self, job_id: str, message: Dict[str, Any]):
+        self._loop = asyncio.get_running_loop()
+        self.received += 1
+        if message.get('status') in TERMINAL_STATUSES:
+            # Released messages not yet published are superseded too
+            self._forget(job_id)
+            await self._publish(job_id, message)
+            return
+
+        now = time.monotonic()
+        wait = self._last.get(job_id, float('-inf')) + self.interval - now
+        if wait <= 0 and job_id not in self._held:
+            self._last[job_id] = now
+            await self._publish(job_id, message)
+            return
+        self._held[job_id] = message
+        if job_id not in self._timers:
+            self._timers[job_id] = asyncio.get_running_loop().call_later(
+                max(0.0, wait), self._release, job_id)
+
+    def _forget(self, job_id: str):
+        timer = self._timers.pop(job_id, None)
+        if timer is not None:
+            timer.cancel()
+        self._held.pop(job_id, None)
+        self._last.pop(job_id, None)
+        self._releasing.pop(job_id, None)
+
+    def _release(self, job_id: str):
+        """Timer callback: publish the job's held message"""
+        self._timers.pop(job_id, None)
+        message = self._held.pop(job_id, None)
+        if message is None:
+            return
+        self._last[job_id] = time.monotonic()
+        token = object()
+        self._releasing.setdefault(job_id, set()).add(token)
+
+        async def publish_held():
+            tokens = self._releasing.get(job_id)
+            # Gone if a terminal message (or forget) came first
+            if tokens is None or token not in tokens:
+                return
+            tokens.discard(token)
+            if not tokens:
+                del self._releasing[job_id]
+            await self._publish(job_id, message)
+
+        task = asyncio.get_running_loop().create_task(publish_held())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish(self, job_id: str, message: Dict[str, Any]):
+        self.published += 1
+        try:
+            await self.publish(job_id, message)
+        except Exception as e:
+            logger.error(f"Failed to publish progress for {job_id}: {e}")
+
+    def forget(self, job_id: str):
+        """Drop a job's state (held message, timers, rate history)
+
+        Safe to call from any thread (e.g. a job store's expiry hook).
+        """
+        loop = self._loop
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if loop is None or on_loop or loop.is_closed():
+            self._forget(job_id)
+        else:
+            loop.call_soon_threadsafe(self._forget, job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'max_rate': 1.0 / self.interval if self.interval else 0,
+            'received': self.received,
+            'published': self.published,
+            'held': len(self._held),
+            'jobs': len(self._last)
+        }
+
+class ProgressThrottle:
+    """Rate-limits a synchronous progress callback; safe to call from any thread
+
+    Calls within ``1 / max_rate`` seconds of the last forwarded one are
+    dropped, except final ones (``is_final(*args)``, by default a first
+    argument >= 1.0), which always go through. ``flush()`` forwards the
+    last dropped call, if it is newer than the last forwarded one.
+    """
+
+    def __init__(self, callback: Callable[..., None], max_rate: Optional[float] = None,
+                 is_final: Optional[Callable[..., bool]] = None):
+        self.callback = callback
+        rate = _max_rate(max_rate)
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.is_final = is_final or (lambda *args: bool(args) and args[0] >= 1.0)
+        self._lock = threading.Lock()
+        self._last = float('-inf')
+        self._pending: Optional[tuple] = None
+
+    def __call__(self, *args):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last < self.interval and not self.is_final(*args):
+                self._pending = args
+                return
+            self._last = now
+            self._pending = None
+        self.callback(*args)
+
+    def flush(self):
+        with self._lock:
+            args, self._pending = self._pending, None
+            if args is not None:
+                self._last = time.monotonic()
+        if args is not None:
+            self.callback(*args)
@@ -0,0 +1,184 @@
+"""
+DrumTracKAI v4/v5 Export Render Cache
+Content-addressed on-disk cache of rendered exports with size-based LRU
+eviction
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump when a change to the synth or mix chains alters rendered audio
+RENDER_CACHE_VERSION = 1
+
+MANIFEST = 'manifest.json'
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+_digest_memo: Dict[Tuple[str, float, int], str] = {}
+_digest_lock = threading.Lock()
+
+def sample_digest(path: str) -> Optional[str]:
+    """Digest of a kit sample, memoised by (path, mtime, size)
+
+    Returns None for missing files (the synth falls back to a generated
+    sample).
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    memo_key = (os.path.abspath(path), st.st_mtime, st.st_size)
+    with _digest_lock:
+        digest = _digest_memo.get(memo_key)
+    if digest is None:
+        digest = file_digest(path)
+        with _digest_lock:
+            _digest_memo[memo_key] = digest
+    return digest
+
+class RenderCache:
+    """Caches export results under the hash of everything that affects them
+
+    The key covers the MIDI lanes, the kit map and the contents of every
+    mapped sample file, the processing / mix bus / volume params, sample
+    rate and export mode. Each entry is a directory holding the result files
+    and a manifest; entries are evicted least-recently-used first once the
+    cache exceeds ``max_bytes``. Results are hard-linked (or copied) into
+    the job's output directory, so evicting an entry never breaks a finished
+    export.
+    """
+
+    def __init__(self, root: Path, max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes or int(os.getenv('EXPORT_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    def key_for(self, params: Dict[str, Any], sr: int) -> str:
+        """Canonical hash of the render inputs"""
+        kit_map = params.get('kit_map', {}) or {}
+        canonical = {
+            'version': RENDER_CACHE_VERSION,
+            'mode': params.get('mode') or params.get('export_mode'),
+            'sr': sr,
+            'midi_lanes': params.get('midi_lanes', {}),
+            'kit_map': kit_map,
+            'samples': {key: sample_digest(path) for key, path in kit_map.items() if path},
+            'processing': params.get('processing', {}),
+            'mix_bus': params.get('mix_bus'),
+            'volumes': params.get('volumes', {}),
+        }
+        blob = json.dumps(canonical, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _place(src: Path, dst: Path):
+        """Hard-link src to dst, copying when linking is not possible"""
+        if dst.exists():
+            dst.unlink()
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    def get(self, key: str, out_dir: Path) -> Optional[Dict[str, str]]:
+        """Place a cached result in out_dir and return its paths, or None"""
+        entry = self.root / key
+        try:
+            manifest = json.loads((entry / MANIFEST).read_text())
+            paths = {}
+            for kind, name in manifest['files'].items():
+                self._place(entry / name, Path(out_dir) / name)
+                paths[kind] = str(Path(out_dir) / name)
+            os.utime(entry / MANIFEST)  # mark as recently used
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self.saved_seconds += manifest.get('render_seconds', 0.0)
+        return paths
+
+    def put(self, key: str, paths: Dict[str, str], render_seconds: float = 0.0):
+        """Store a finished render's result files"""
+        if not paths:
+            return
+        entry = self.root / key
+        tmp = self.root / f".{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            tmp.mkdir(parents=True, exist_ok=True)
+            files = {}
+            for kind, path in paths.items():
+                name = Path(path).name
+                self._place(Path(path), tmp / name)
+                files[kind] = name
+            (tmp / MANIFEST).write_text(json.dumps({
+                'files': files,
+                'render_seconds': render_seconds,
+                'created_at': time.time()
+            }))
+            # Atomic publish; a concurrent writer of the same key wins harmlessly
+            os.rename(tmp, entry)
+        except OSError as e:
+            if not entry.exists():
+                logger.warning(f"Failed to cache render {key}: {e}")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def evict(self):
+        """Remove least-recently-used entries until under the byte budget"""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in self.root.iterdir():
+                manifest = entry / MANIFEST
+                if entry.name.startswith('.') or not manifest.exists():
+                    continue
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                entries.append((manifest.stat().st_mtime, size, entry))
+                total += size
+
+            entries.sort()
+            while total > self.max_bytes and entries:
+                _, size, entry = entries.pop(0)
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and disk usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            entries = [e for e in self.root.iterdir() if (e / MANIFEST).exists()]
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'saved_render_seconds': round(self.saved_seconds, 3),
+                'entries': len(entries),
+                'bytes': sum(f.stat().st_size for e in entries for f in e.iterdir()),
+                'max_bytes': self.max_bytes
+            }
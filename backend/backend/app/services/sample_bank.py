@@ -0,0 +1,175 @@
+"""
+DrumTracKAI v4/v5 Sample Bank
+Process-wide store of decoded, resampled kit samples backed by memory-mapped
+files, so every synth, export worker process, preview and audition shares one
+copy of each sample
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from math import gcd
+from pathlib import Path
+from typing import Callable, Dict, Any, Optional
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump when decoding, resampling or the generated default kit changes
+SAMPLE_BANK_VERSION = 1
+
+def resample_to(audio: np.ndarray, sr: int, target_sr: int) -> np.ndarray:
+    """Polyphase resample along axis 0 to target_sr
+
+    The output length is ``int(len(audio) * target_sr / sr)``, the same as
+    the FFT resampling the synth used before.
+    """
+    if sr == target_sr:
+        return audio
+    g = gcd(int(sr), int(target_sr))
+    up, down = int(target_sr) // g, int(sr) // g
+    length = int(len(audio) * target_sr / sr)
+    return resample_poly(audio, up, down, axis=0)[:length]
+
+class SampleBank:
+    """Decodes each sample once per (path, mtime, size, target_sr)
+
+    Decoded float32 buffers are written as .npy files under ``root`` and
+    memory-mapped read-only, so other processes (the lane render pool) map
+    the same pages instead of decoding and copying again. Mapped entries are
+    kept in an LRU bounded by ``max_bytes``; files on disk are pruned to the
+    same budget, oldest use first. The synthetic default kit is stored the
+    same way, so every process renders identical default samples.
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.root = Path(root or os.getenv(
+            'SAMPLE_BANK_DIR', str(Path(tempfile.gettempdir()) / 'drumtrackai_sample_bank')
+        ))
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes or int(os.getenv('SAMPLE_BANK_MAX_BYTES', 256 * 1024 ** 2))
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(*parts: Any) -> str:
+        blob = json.dumps([SAMPLE_BANK_VERSION, *parts], separators=(',', ':'))
+        return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+    def load(self, path: str, target_sr: int) -> np.ndarray:
+        """Mono float32 sample at target_sr (read-only); raises if unreadable"""
+        st = os.stat(path)
+        key = self._key('file', os.path.abspath(path), st.st_mtime_ns, st.st_size, int(target_sr))
+        return self._get(key, lambda: self._decode(path, target_sr))
+
+    def default(self, name: str, target_sr: int, generate: Callable[[], np.ndarray]) -> np.ndarray:
+        """Generated default sample, created once and shared by every process"""
+        return self._get(self._key('default', name, int(target_sr)), generate)
+
+    @staticmethod
+    def _decode(path: str, target_sr: int) -> np.ndarray:
+        audio, sr = sf.read(path, always_2d=True)
+        # Mono first: resampling is per channel, so this only saves work
+        return resample_to(audio[:, 0], sr, target_sr)
+
+    def _get(self, key: str, produce: Callable[[], np.ndarray]) -> np.ndarray:
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return audio
+
+        file_path = self.root / f"{key}.npy"
+        audio = self._map(file_path)
+        if audio is None:
+            with self._lock:
+                self.misses += 1
+            audio = self._store(file_path, np.asarray(produce(), dtype=np.float32))
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = audio
+                self._bytes += audio.nbytes
+                while self._bytes > self.max_bytes and len(self._entries) > 1:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= evicted.nbytes
+                    self.evictions += 1
+            return self._entries[key]
+
+    @staticmethod
+    def _map(file_path: Path) -> Optional[np.ndarray]:
+        try:
+            audio = np.load(file_path, mmap_mode='r').view(np.ndarray)
+            os.utime(file_path)  # mark as recently used for pruning
+            return audio
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, file_path: Path, audio: np.ndarray) -> np.ndarray:
+        """Write a decoded sample and map it; falls back to the in-memory buffer"""
+        tmp = file_path.with_name(f".{file_path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, 'wb') as f:
+                np.save(f, audio)
+            # Atomic publish; a concurrent writer of the same key wins harmlessly
+            os.replace(tmp, file_path)
+            self._prune()
+            mapped = self._map(file_path)
+            if mapped is not None:
+                return mapped
+        except OSError as e:
+            logger.warning(f"Failed to store sample in bank: {e}")
+            tmp.unlink(missing_ok=True)
+        audio.flags.writeable = False
+        return audio
+
+    def _prune(self):
+        """Remove the least recently used files once the bank exceeds its budget"""
+        files = []
+        total = 0
+        for file_path in self.root.glob('*.npy'):
+            try:
+                st = file_path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, file_path))
+            total += st.st_size
+        files.sort()
+        # Mapped buffers stay valid after their file is unlinked
+        while total > self.max_bytes and len(files) > 1:
+            _, size, file_path = files.pop(0)
+            file_path.unlink(missing_ok=True)
+            total -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+
+_bank: Optional[SampleBank] = None
+_bank_lock = threading.Lock()
+
+def get_sample_bank() -> SampleBank:
+    """Get the process-wide sample bank (created on first use)"""
+    global _bank
+    with _bank_lock:
+        if _bank is None:
+            _bank = SampleBank()
+        return _bank
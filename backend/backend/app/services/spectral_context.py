@@ -0,0 +1,133 @@
+"""
+DrumTracKAI v4/v5 Spectral Analysis Context
+One STFT, mel spectrogram and onset envelope per signal, shared by every
+spectral descriptor (tempo, key, timbre, onsets, HPSS) instead of each
+librosa call recomputing its own
+"""
+
+from typing import Optional, Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import librosa
+
+def median_filter(S: np.ndarray, size: int, axis: int, max_elements: int = 1 << 23) -> np.ndarray:
+    """Median filter along one axis, equal to ``scipy.ndimage.median_filter``
+    with ``mode='reflect'`` but computed with one partition over a window view
+
+    The window view is processed in slices of another axis so at most
+    ``max_elements`` window values are materialized at once.
+    """
+    axis = axis % S.ndim
+    out = np.empty_like(S)
+    if S.size == 0:
+        return out
+    pad = [(0, 0)] * S.ndim
+    pad[axis] = (size // 2, size // 2)
+    split = 0 if axis != 0 or S.ndim == 1 else 1
+    step = S.shape[split] if S.ndim == 1 else max(1, max_elements // (S.size // S.shape[split] * size))
+    for lo in range(0, S.shape[split], step):
+        part = [slice(None)] * S.ndim
+        part[split] = slice(lo, lo + step)
+        windows = sliding_window_view(np.pad(S[tuple(part)], pad, mode='symmetric'), size, axis=axis)
+        out[tuple(part)] = np.partition(windows, size // 2, axis=-1)[..., size // 2]
+    return out
+
+class SpectralContext:
+    """Shared spectral front-end for one mono signal
+
+    The STFT magnitude, power mel spectrogram (and its dB version) and the
+    onset envelopes are computed once, with librosa's defaults, so every
+    descriptor matches the value librosa returns when called with ``y``
+    directly. The complex STFT is kept only when ``keep_stft`` is set (it
+    is needed to resynthesize HPSS components).
+    """
+
+    def __init__(self, y: np.ndarray, sr: int, n_fft: int = 2048, hop_length: int = 512,
+                 n_mels: int = 128, keep_stft: bool = True):
+        self.y = y
+        self.sr = int(sr)
+        self.n_fft = int(n_fft)
+        self.hop_length = int(hop_length)
+
+        stft = librosa.stft(y, n_fft=self.n_fft, hop_length=self.hop_length)
+        self.stft: Optional[np.ndarray] = stft if keep_stft else None
+        self.magnitude = np.abs(stft)
+        del stft
+
+        self.mel = librosa.feature.melspectrogram(S=self.magnitude ** 2, sr=self.sr, n_mels=n_mels)
+        self.log_mel = librosa.power_to_db(self.mel)
+
+        # onset_detect aggregates the spectral flux with the mean and
+        # beat_track with the median
+        self.onset_envelope = self._onset_strength(np.mean)
+        self.beat_envelope = self._onset_strength(np.median)
+        self._hpss: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def _onset_strength(self, aggregate) -> np.ndarray:
+        return librosa.onset.onset_strength(S=self.log_mel, sr=self.sr, n_fft=self.n_fft,
+                                            hop_length=self.hop_length, aggregate=aggregate)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the derived arrays (the signal itself is not counted)"""
+        arrays = [self.magnitude, self.mel, self.log_mel, self.onset_envelope, self.beat_envelope]
+        if self.stft is not None:
+            arrays.append(self.stft)
+        if self._hpss is not None:
+            arrays.extend(self._hpss)
+        return sum(a.nbytes for a in arrays)
+
+    def beat_track(self) -> Tuple[float, np.ndarray]:
+        """Tempo (BPM) and beat frames"""
+        tempo, beats = librosa.beat.beat_track(onset_envelope=self.beat_envelope, sr=self.sr,
+                                               hop_length=self.hop_length)
+        return float(np.atleast_1d(tempo)[0]), beats
+
+    def onset_frames(self, backtrack: bool = False) -> np.ndarray:
+        return librosa.onset.onset_detect(onset_envelope=self.onset_envelope, sr=self.sr,
+                                          hop_length=self.hop_length, backtrack=backtrack,
+                                          units='frames')
+
+    def onset_times(self, backtrack: bool = False) -> np.ndarray:
+        return librosa.frames_to_time(self.onset_frames(backtrack), sr=self.sr, hop_length=self.hop_length)
+
+    def chroma(self) -> np.ndarray:
+        return librosa.feature.chroma_stft(S=self.magnitude ** 2, sr=self.sr, n_fft=self.n_fft,
+                                           hop_length=self.hop_length)
+
+    def spectral_centroid(self) -> np.ndarray:
+        return librosa.feature.spectral_centroid(S=self.magnitude, sr=self.sr, n_fft=self.n_fft,
+                                                 hop_length=self.hop_length)
+
+    def mfcc(self, n_mfcc: int = 13) -> np.ndarray:
+        return librosa.feature.mfcc(S=self.log_mel, sr=self.sr, n_mfcc=n_mfcc)
+
+    def fft_frequencies(self) -> np.ndarray:
+        return librosa.fft_frequencies(sr=self.sr, n_fft=self.n_fft)
+
+    def zero_crossing_rate(self) -> np.ndarray:
+        # Time-domain framing, no transform to share
+        return librosa.feature.zero_crossing_rate(self.y, frame_length=self.n_fft, hop_length=self.hop_length)
+
+    def rms(self) -> np.ndarray:
+        # From the samples: RMS from the windowed STFT would change the values
+        return librosa.feature.rms(y=self.y, frame_length=self.n_fft, hop_length=self.hop_length)
+
+    def hpss(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Harmonic and percussive signals, as ``librosa.effects.hpss``"""
+        if self._hpss is None:
+            stft = self.stft if self.stft is not None else librosa.stft(
+                self.y, n_fft=self.n_fft, hop_length=self.hop_length)
+            # librosa.decompose.hpss with its defaults (kernel 31, margin 1)
+            magnitude, phase = librosa.magphase(stft)
+            harm = median_filter(magnitude, 31, axis=-1)
+            perc = median_filter(magnitude, 31, axis=-2)
+            harmonic = magnitude * librosa.util.softmask(harm, perc, power=2.0, split_zeros=True) * phase
+            percussive = magnitude * librosa.util.softmask(perc, harm, power=2.0, split_zeros=True) * phase
+            del harm, perc
+            self._hpss = tuple(
+                librosa.istft(component, n_fft=self.n_fft, hop_length=self.hop_length,
+                              length=len(self.y), dtype=self.y.dtype)
+                for component in (harmonic, percussive)
+            )
+        return self._hpss
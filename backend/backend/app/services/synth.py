@@ -4,13 +4,61 @@ Professional drum sample playback with velocity layers and processing
 """
 
 import numpy as np
-import soundfile as sf
 from pathlib import Path
-from scipy.signal import resample
 import logging
+from .sample_bank import get_sample_bank
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 logger = logging.getLogger(__name__)
 
+def _mix_events_py(out, bank, offsets, lengths, sample_ids, starts, gains):
+    """Add every scheduled hit into ``out``, in event order (pure Python fallback)
+
+    Hit i plays sample ``sample_ids[i]`` (``bank[offsets[id]:offsets[id] + lengths[id]]``)
+    from output index ``starts[i]`` scaled by ``gains[i]``; hits running past
+    either end of ``out`` are clipped.
+    """
+    n_out = out.shape[0]
+    for i in range(starts.shape[0]):
+        start = starts[i]
+        src = offsets[sample_ids[i]]
+        lo = max(start, 0)
+        hi = min(start + lengths[sample_ids[i]], n_out)
+        if hi > lo:
+            out[lo:hi] += bank[src + lo - start:src + hi - start] * gains[i]
+    return out
+
+def _mix_events_loop(out, bank, offsets, lengths, sample_ids, starts, gains):
+    """Same as _mix_events_py with the per-hit add written out for numba
+    
+    The hit is added through local views so the inner loop vectorizes; it is
+    compiled without fastmath, so no multiply-add is fused and the result
+    matches the numpy fallback bit for bit.
+    """
+    n_out = out.shape[0]
+    for i in range(starts.shape[0]):
+        start = starts[i]
+        src = offsets[sample_ids[i]]
+        lo = max(start, 0)
+        hi = min(start + lengths[sample_ids[i]], n_out)
+        if hi <= lo:
+            continue
+        dst = out[lo:hi]
+        hit = bank[src + lo - start:src + hi - start]
+        gain = gains[i]
+        for k in range(hi - lo):
+            dst[k] += hit[k] * gain
+    return out
+
+if njit is not None:
+    _mix_events = njit(cache=True, nogil=True)(_mix_events_loop)
+else:
+    _mix_events = _mix_events_py
+
 class SamplerSynth:
     """Advanced sampler for drum kit playback"""
     
@@ -18,36 +66,28 @@ class SamplerSynth:
         self.sr = sr
         self.kit_map = kit_map or {}
         self.cache = {}
-        self.default_samples = {
-            'kick': self._generate_kick_sample(),
-            'snare': self._generate_snare_sample(),
-            'hihat': self._generate_hihat_sample(),
-            'crash': self._generate_crash_sample(),
-            'ride': self._generate_ride_sample(),
-            'tom': self._generate_tom_sample()
+        # Generated on first use and shared through the sample bank
+        self.default_generators = {
+            'kick': self._generate_kick_sample,
+            'snare': self._generate_snare_sample,
+            'hihat': self._generate_hihat_sample,
+            'crash': self._generate_crash_sample,
+            'ride': self._generate_ride_sample,
+            'tom': self._generate_tom_sample
         }
     
     def _load_sample(self, key: str) -> np.ndarray:
-        """Load and cache a sample"""
+        """Load and cache a sample (read-only, shared via the sample bank)"""
         if key in self.cache:
             return self.cache[key]
         
+        bank = get_sample_bank()
+        
         # Try to load from kit mapping
         path = self.kit_map.get(key)
         if path and Path(path).exists():
             try:
-                audio, sr = sf.read(path)
-                if sr != self.sr:
-                    # Resample to target sample rate
-                    N = int(len(audio) * self.sr / sr)
-                    audio = resample(audio, N)
-                
-                # Convert to mono if stereo
-                if audio.ndim > 1:
-                    audio = audio[:, 0]
-                
-                # Normalize and cache
-                audio = audio.astype(np.float32)
+                audio = bank.load(path, self.sr)
                 self.cache[key] = audio
                 return audio
                 
@@ -55,45 +95,98 @@ class SamplerSynth:
                 logger.warning(f"Failed to load sample {path}: {e}")
         
         # Fall back to generated sample
-        if key in self.default_samples:
-            sample = self.default_samples[key]
+        if key in self.default_generators:
+            sample = bank.default(key, self.sr, self.default_generators[key])
             self.cache[key] = sample
             return sample
         
         # Return silence if nothing else works
         return np.zeros(int(0.1 * self.sr), dtype=np.float32)
     
+    def lane_length(self, events: list) -> int:
+        """Length in samples of a rendered lane"""
+        if not events:
+            return int(1.0 * self.sr)
+        max_time = max(e.get('time_sec', e.get('seconds', 0)) for e in events)
+        return int((max_time + 3.0) * self.sr)  # Add 3 seconds for sample decay
+    
     def render_lane(self, events: list) -> np.ndarray:
         """Render a drum lane from MIDI events"""
         if not events:
             return np.zeros(int(1.0 * self.sr), dtype=np.float32)
         
-        # Calculate total duration
-        max_time = max(e.get('time_sec', e.get('seconds', 0)) for e in events)
-        total_dur = max_time + 3.0  # Add 3 seconds for sample decay
-        
         # Initialize output buffer
-        out = np.zeros(int(total_dur * self.sr), dtype=np.float32)
+        out = np.zeros(self.lane_length(events), dtype=np.float32)
+        
+        # Schedule all hits as arrays, then mix them in one compiled pass.
+        # Hits are summed in event order with float32 gains, so the result is
+        # bit-identical to adding each hit's slice one at a time.
+        bank, offsets, lengths, sample_ids = self._sample_bank(
+            [event.get('lane', event.get('key', 'kick')) for event in events]
+        )
+        times = np.fromiter((e.get('time_sec', e.get('seconds', 0)) for e in events),
+                            dtype=np.float64, count=len(events))
+        velocities = np.fromiter((e.get('velocity', 100) for e in events),
+                                 dtype=np.float64, count=len(events))
+        starts = (times * self.sr).astype(np.int64)
+        gains = (velocities / 127.0).astype(np.float32)
+        
+        return _mix_events(out, bank, offsets, lengths, sample_ids, starts, gains)
+    
+    def _sample_bank(self, keys: list):
+        """Pack the samples used by a lane into one flat buffer
+        
+        Returns (bank, offsets, lengths, sample_ids) where sample_ids maps
+        each key in ``keys`` to its sample in the bank.
+        """
+        unique = list(dict.fromkeys(keys))
+        index = {key: i for i, key in enumerate(unique)}
+        samples = [self._load_sample(key) for key in unique]
+        lengths = np.array([len(sample) for sample in samples], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+        bank = np.concatenate(samples).astype(np.float32, copy=False)
+        sample_ids = np.array([index[key] for key in keys], dtype=np.int64)
+        return bank, offsets, lengths, sample_ids
+    
+    def render_lane_blocks(self, events: list, block_size: int):
+        """Render a drum lane as consecutive blocks of block_size samples
         
+        Yields the same audio as render_lane, split into blocks (the last one
+        may be shorter), while only holding the samples that are sounding.
+        """
+        total = self.lane_length(events)
+        
+        scheduled = []
         for event in events:
-            # Get timing and parameters
             time_sec = event.get('time_sec', event.get('seconds', 0))
             velocity = event.get('velocity', 100) / 127.0
-            lane = event.get('lane', event.get('key', 'kick'))
+            sample = self._load_sample(event.get('lane', event.get('key', 'kick')))
+            scheduled.append((int(time_sec * self.sr), sample, velocity))
+        scheduled.sort(key=lambda item: item[0])
+        
+        active = []
+        next_event = 0
+        for block_start in range(0, total, block_size):
+            block_end = min(block_start + block_size, total)
+            out = np.zeros(block_end - block_start, dtype=np.float32)
             
-            # Load sample
-            sample = self._load_sample(lane)
+            # Start events that begin in this block
+            while next_event < len(scheduled) and scheduled[next_event][0] < block_end:
+                active.append(scheduled[next_event])
+                next_event += 1
             
-            # Calculate position in output buffer
-            start_idx = int(time_sec * self.sr)
-            end_idx = min(start_idx + len(sample), len(out))
-            sample_len = end_idx - start_idx
+            # Mix the overlapping part of every sounding sample
+            still_sounding = []
+            for start_idx, sample, velocity in active:
+                lo = max(start_idx, block_start)
+                hi = min(start_idx + len(sample), block_end)
+                if hi > lo:
+                    out[lo - block_start:hi - block_start] += sample[lo - start_idx:hi - start_idx] * velocity
+                if start_idx + len(sample) > block_end:
+                    still_sounding.append((start_idx, sample, velocity))
+            active = still_sounding
             
-            if sample_len > 0:
-                # Apply velocity and mix into output
-                out[start_idx:end_idx] += sample[:sample_len] * velocity
-        
-        return out
+            yield out
     
     def _generate_kick_sample(self) -> np.ndarray:
         """Generate a synthetic kick drum sample"""
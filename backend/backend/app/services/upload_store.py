@@ -0,0 +1,110 @@
+"""
+DrumTracKAI v4/v5 Upload Store
+Streams uploads to disk in fixed-size chunks while hashing them, and keeps
+one content-addressed copy of each distinct file
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 1024 * 1024))
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', 2 * 1024 ** 3))
+
+# Partial files older than this are left over from interrupted uploads
+STALE_PART_SECONDS = 24 * 3600
+
+class UploadTooLarge(Exception):
+    """The upload exceeded the store's max_bytes"""
+
+@dataclass
+class StoredUpload:
+    """Where an upload's content lives in the store"""
+    sha256: str
+    path: Path
+    size: int
+    deduplicated: bool  # the content was already stored
+
+class UploadStore:
+    """Content-addressed upload files: ``<root>/store/<ab>/<sha256><suffix>``
+
+    ``save`` streams an upload into ``<root>/incoming`` chunk by chunk,
+    hashing as it writes, then moves it into place. Content that is already
+    stored is kept as is (so its mtime and derived sidecars stay valid) and
+    the new copy is discarded. The suffix (file extension) is part of the
+    key, since decoders use it.
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = None, chunk_size: int = UPLOAD_CHUNK_SIZE,
+                 max_bytes: int = UPLOAD_MAX_BYTES):
+        self.root = Path(root or os.getenv('UPLOAD_STORE_DIR', 'temp_uploads'))
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.incoming = self.root / 'incoming'
+        self.incoming.mkdir(parents=True, exist_ok=True)
+        self._remove_stale_parts()
+
+    def _remove_stale_parts(self):
+        cutoff = time.time() - STALE_PART_SECONDS
+        for part in self.incoming.glob('*.part'):
+            try:
+                if part.stat().st_mtime < cutoff:
+                    part.unlink()
+            except OSError:
+                pass
+
+    def path_for(self, sha256: str, suffix: str = '') -> Path:
+        return self.root / 'store' / sha256[:2] / f"{sha256}{suffix.lower()}"
+
+    def find(self, sha256: str, suffix: str = '') -> Optional[StoredUpload]:
+        """The stored upload with this content, if any"""
+        sha256 = sha256.lower()
+        path = self.path_for(sha256, suffix)
+        try:
+            return StoredUpload(sha256, path, path.stat().st_size, True)
+        except OSError:
+            return None
+
+    async def save(self, upload, suffix: str = '') -> StoredUpload:
+        """Stream an upload (anything with ``async read(n)``) into the store
+
+        Raises UploadTooLarge past ``max_bytes``; nothing is kept then.
+        """
+        loop = asyncio.get_running_loop()
+        digest = hashlib.sha256()
+        size = 0
+        part = self.incoming / f"{uuid.uuid4().hex}.part"
+        try:
+            with open(part, 'wb') as f:
+                def write(chunk: bytes):
+                    f.write(chunk)
+                    digest.update(chunk)
+
+                while True:
+                    chunk = await upload.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLarge(f"Upload exceeds {self.max_bytes} bytes")
+                    # Disk write and hashing off the event loop
+                    await loop.run_in_executor(None, write, chunk)
+
+            sha256 = digest.hexdigest()
+            path = self.path_for(sha256, suffix)
+            if path.exists():
+                part.unlink()
+                return StoredUpload(sha256, path, size, True)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(part, path)
+            return StoredUpload(sha256, path, size, False)
+        finally:
+            part.unlink(missing_ok=True)
@@ -0,0 +1,237 @@
+"""
+DrumTracKAI v4/v5 Waveform Peak Pyramid
+Precomputed min/max/RMS waveform overviews at power-of-two resolutions,
+stored as a compact binary sidecar next to each stem, so any time range can
+be drawn at any zoom in O(pixels)
+"""
+
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
+import numpy as np
+import soundfile as sf
+import logging
+
+logger = logging.getLogger(__name__)
+
+PEAKS_SUFFIX = '.peaks'
+PEAKS_MAGIC = b'DTKPEAKS'
+PEAKS_VERSION = 1
+
+# Samples per block at level 0; level L blocks span BASE_BLOCK * 2**L samples
+BASE_BLOCK = int(os.getenv('WAVEFORM_BASE_BLOCK', 256))
+
+# Pixels span at least this many blocks of the level they are read from, so
+# partially covered blocks at pixel edges stay a small share of each pixel
+BLOCKS_PER_PIXEL = 4
+
+# magic, version, sample_rate, n_samples, channels, base_block, n_levels
+_HEADER = struct.Struct('<8sHIQHIH')
+
+def sidecar_path(audio_path: Union[str, Path]) -> Path:
+    """Path of the peak sidecar for an audio file (``drums.wav`` -> ``drums.wav.peaks``)"""
+    audio_path = Path(audio_path)
+    return audio_path.with_name(audio_path.name + PEAKS_SUFFIX)
+
+def _level_blocks(n_samples: int, block: int) -> int:
+    return max(1, -(-n_samples // block))
+
+class PeakPyramid:
+    """min/max/RMS per block for every power-of-two block size
+
+    Level 0 is computed from the samples in one vectorized pass (all
+    channels fold into one envelope: lowest min, highest max, RMS over every
+    channel); each further level halves the previous one. Values are stored
+    as float16 ``(n_blocks, 3)`` rows of (min, max, rms).
+    """
+
+    def __init__(self, levels, sample_rate: int, n_samples: int, channels: int = 1,
+                 base_block: int = BASE_BLOCK, audio_path: Optional[Path] = None):
+        self.levels = levels
+        self.sample_rate = int(sample_rate)
+        self.n_samples = int(n_samples)
+        self.channels = int(channels)
+        self.base_block = int(base_block)
+        self.audio_path = Path(audio_path) if audio_path else None
+
+    @classmethod
+    def from_audio(cls, audio: np.ndarray, sample_rate: int, base_block: int = BASE_BLOCK,
+                   audio_path: Optional[Path] = None) -> 'PeakPyramid':
+        """Build the pyramid for (samples,) or (samples, channels) audio"""
+        audio = np.asarray(audio, dtype=np.float32)
+        frames = audio[:, None] if audio.ndim == 1 else audio
+        n_samples, channels = frames.shape
+
+        # Level 0: pad the tail block by repeating its last sample, which
+        # leaves min/max unchanged; the tail's RMS uses its real length
+        n_blocks = _level_blocks(n_samples, base_block)
+        padded = np.empty((n_blocks * base_block, channels), dtype=np.float32)
+        padded[:n_samples] = frames
+        padded[n_samples:] = frames[-1] if n_samples else 0.0
+        blocks = padded.reshape(n_blocks, base_block * channels)
+        lo = blocks.min(axis=1)
+        hi = blocks.max(axis=1)
+        counts = np.full(n_blocks, base_block, dtype=np.float64)
+        counts[-1] = n_samples - (n_blocks - 1) * base_block if n_samples else 1
+        squares = np.einsum('ij,ij->i', blocks, blocks, dtype=np.float64)
+        if n_samples % base_block:
+            tail = padded[(n_blocks - 1) * base_block:n_samples]
+            squares[-1] = np.sum(tail.astype(np.float64) ** 2)
+
+        levels = []
+        while True:
+            rms = np.sqrt(squares / (counts * channels))
+            levels.append(np.column_stack([lo, hi, rms]).astype(np.float16))
+            if len(lo) == 1:
+                break
+            # Pair up blocks; an odd trailing block is paired with itself
+            # at zero weight
+            if len(lo) % 2:
+                lo, hi = np.append(lo, lo[-1]), np.append(hi, hi[-1])
+                squares, counts = np.append(squares, 0.0), np.append(counts, 0.0)
+            lo = np.minimum(lo[0::2], lo[1::2])
+            hi = np.maximum(hi[0::2], hi[1::2])
+            squares = squares[0::2] + squares[1::2]
+            counts = counts[0::2] + counts[1::2]
+
+        return cls(levels, sample_rate, n_samples, channels, base_block, audio_path)
+
+    @classmethod
+    def from_file(cls, audio_path: Union[str, Path], base_block: int = BASE_BLOCK) -> 'PeakPyramid':
+        audio, sr = sf.read(str(audio_path), dtype='float32', always_2d=True)
+        return cls.from_audio(audio, sr, base_block, audio_path=Path(audio_path))
+
+    def save(self, path: Union[str, Path]):
+        """Write the sidecar atomically"""
+        path = Path(path)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(_HEADER.pack(PEAKS_MAGIC, PEAKS_VERSION, self.sample_rate, self.n_samples,
+                                     self.channels, self.base_block, len(self.levels)))
+                for level in self.levels:
+                    f.write(np.ascontiguousarray(level, dtype='<f2').tobytes())
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], audio_path: Optional[Path] = None) -> 'PeakPyramid':
+        """Memory-map a sidecar; raises ValueError if it is not a current one"""
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            raise ValueError(f"Truncated peak file: {path}")
+        magic, version, sr, n_samples, channels, base_block, n_levels = _HEADER.unpack(header)
+        if magic != PEAKS_MAGIC or version != PEAKS_VERSION:
+            raise ValueError(f"Not a current peak file: {path}")
+
+        levels = []
+        offset = _HEADER.size
+        for level in range(n_levels):
+            n_blocks = _level_blocks(n_samples, base_block << level)
+            levels.append(np.memmap(path, dtype='<f2', mode='r', offset=offset, shape=(n_blocks, 3)))
+            offset += n_blocks * 3 * 2
+        if os.path.getsize(path) != offset:
+            raise ValueError(f"Peak file size mismatch: {path}")
+        return cls(levels, sr, n_samples, channels, base_block, audio_path)
+
+    def query(self, start: int = 0, end: Optional[int] = None, pixels: int = 1000) -> Dict[str, Any]:
+        """min/max/RMS per pixel for samples [start, end)
+
+        Reads the coarsest level with at least BLOCKS_PER_PIXEL blocks per
+        pixel, so each pixel reduces a bounded number of blocks; min/max
+        include whole edge blocks and RMS weights them by overlap. Zooms
+        finer than that read the samples themselves (fewer than
+        ``pixels * BLOCKS_PER_PIXEL * base_block``). Returns at most
+        ``pixels`` values per series.
+        """
+        end = self.n_samples if end is None else min(int(end), self.n_samples)
+        start = max(0, min(int(start), end))
+        pixels = max(1, int(pixels))
+        span = end - start
+        spp = span / pixels
+
+        if span == 0:
+            lo = hi = rms = np.zeros(0, dtype=np.float32)
+            level = 0
+        elif spp < BLOCKS_PER_PIXEL * self.base_block and self.audio_path is not None:
+            lo, hi, rms = self._query_samples(start, end, pixels)
+            level = -1
+        else:
+            ratio = max(spp, 1) / (BLOCKS_PER_PIXEL * self.base_block)
+            level = int(np.clip(np.floor(np.log2(ratio)), 0, len(self.levels) - 1))
+            lo, hi, rms = self._query_level(level, start, end, pixels)
+
+        return {
+            'sample_rate': self.sample_rate,
+            'start': start,
+            'end': end,
+            'samples_per_pixel': spp,
+            'level': level,
+            'min': lo,
+            'max': hi,
+            'rms': rms
+        }
+
+    def _pixel_edges(self, start: int, end: int, pixels: int) -> np.ndarray:
+        n = min(pixels, end - start)
+        return start + (np.arange(n + 1, dtype=np.int64) * (end - start)) // n
+
+    def _query_level(self, level: int, start: int, end: int, pixels: int):
+        data = self.levels[level]
+        block = self.base_block << level
+        edges = self._pixel_edges(start, end, pixels)
+        first = edges[:-1] // block
+        last = np.maximum((edges[1:] - 1) // block, first)
+        width = int(np.max(last - first)) + 1
+        # Gather each pixel's blocks, repeating its last block as padding
+        # (padding gets zero weight)
+        idx = np.minimum(first[:, None] + np.arange(width), last[:, None])
+        rows = np.asarray(data[first[0]:last[-1] + 1], dtype=np.float32)[idx - first[0]]
+        block_start = idx * block
+        overlap = (np.minimum(edges[1:, None], np.minimum(block_start + block, self.n_samples))
+                   - np.maximum(edges[:-1, None], block_start))
+        weights = np.where(first[:, None] + np.arange(width) <= last[:, None],
+                           np.maximum(overlap, 0), 0).astype(np.float64)
+        mean_square = np.sum(weights * rows[..., 2].astype(np.float64) ** 2, axis=1) / weights.sum(axis=1)
+        return (rows[..., 0].min(axis=1), rows[..., 1].max(axis=1),
+                np.sqrt(mean_square).astype(np.float32))
+
+    def _query_samples(self, start: int, end: int, pixels: int):
+        audio, _ = sf.read(str(self.audio_path), start=start, stop=end, dtype='float32', always_2d=True)
+        edges = self._pixel_edges(0, len(audio), pixels)
+        lo = np.minimum.reduceat(audio.min(axis=1), edges[:-1])
+        hi = np.maximum.reduceat(audio.max(axis=1), edges[:-1])
+        squares = np.add.reduceat(np.sum(audio.astype(np.float64) ** 2, axis=1), edges[:-1])
+        rms = np.sqrt(squares / (np.diff(edges) * audio.shape[1])).astype(np.float32)
+        return lo, hi, rms
+
+def build_peaks(audio_path: Union[str, Path], audio: Optional[np.ndarray] = None,
+                sample_rate: Optional[int] = None) -> PeakPyramid:
+    """Build and store the sidecar for an audio file
+
+    Pass the decoded ``audio`` and ``sample_rate`` when they are already in
+    memory (e.g. right after writing a stem) to skip decoding the file.
+    """
+    audio_path = Path(audio_path)
+    if audio is None:
+        pyramid = PeakPyramid.from_file(audio_path)
+    else:
+        pyramid = PeakPyramid.from_audio(audio, sample_rate, audio_path=audio_path)
+    pyramid.save(sidecar_path(audio_path))
+    return pyramid
+
+def load_peaks(audio_path: Union[str, Path]) -> PeakPyramid:
+    """The stored pyramid for an audio file, (re)built if missing or stale"""
+    audio_path = Path(audio_path)
+    peaks_path = sidecar_path(audio_path)
+    try:
+        if peaks_path.stat().st_mtime_ns >= audio_path.stat().st_mtime_ns:
+            return PeakPyramid.load(peaks_path, audio_path)
+    except (OSError, ValueError):
+        pass
+    logger.info(f"Building waveform peaks for {audio_path.name}")
+    return build_peaks(audio_path)
@@ -0,0 +1,200 @@
+"""
+DrumTracKAI v4/v5 WebSocket Hub
+Fan-out of progress and WebDAW messages to WebSocket clients: each message
+is serialized once, and every connection has a bounded send queue drained
+by its own writer task, so a slow client only delays itself
+"""
+
+import os
+import json
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set
+import logging
+
+from .progress_channel import TERMINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Close code for clients dropped for not keeping up ("Try Again Later")
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+class _Frame:
+    __slots__ = ('payload', 'key', 'droppable')
+
+    def __init__(self, payload: str, key: Optional[str], droppable: bool):
+        self.payload = payload
+        self.key = key  # frames with the same key replace each other while queued
+        self.droppable = droppable
+
+class _Connection:
+    __slots__ = ('connection_id', 'websocket', 'jobs', 'frames', 'pending', 'ready', 'writer')
+
+    def __init__(self, connection_id: str, websocket):
+        self.connection_id = connection_id
+        self.websocket = websocket
+        self.jobs: Set[str] = set()
+        self.frames: Deque[_Frame] = deque()
+        self.pending: Dict[str, _Frame] = {}  # coalesce key -> queued frame
+        self.ready = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+
+class WebSocketHub:
+    """WebSocket connection registry with per-connection send queues
+
+    ``send_job_update`` and ``broadcast_message`` serialize a message once
+    and queue the text on each target connection; nothing waits on a
+    client's socket. A job update replaces that job's update still queued
+    for the connection, so a lagging client skips straight to the newest
+    progress. When a queue is full, its oldest non-terminal job update is
+    dropped; a client whose queue is full of messages that cannot be dropped
+    is disconnected. Subscriptions are indexed both ways (job -> connections,
+    connection -> jobs), so subscribe and disconnect do not scan other jobs.
+
+    Configured by WS_SEND_QUEUE_SIZE (frames per connection) and
+    WS_SEND_TIMEOUT (seconds for one send before the client is dropped).
+    """
+
+    def __init__(self, queue_size: Optional[int] = None, send_timeout: Optional[float] = None):
+        self.queue_size = max(1, queue_size or int(os.getenv('WS_SEND_QUEUE_SIZE', 64)))
+        self.send_timeout = send_timeout or float(os.getenv('WS_SEND_TIMEOUT', 10))
+        self.connections: Dict[str, _Connection] = {}
+        self.job_connections: Dict[str, Set[str]] = {}  # job_id -> connection_ids
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.slow_disconnects = 0
+
+    async def connect(self, websocket, connection_id: str):
+        await websocket.accept()
+        conn = _Connection(connection_id, websocket)
+        conn.writer = asyncio.create_task(self._write(conn))
+        self.connections[connection_id] = conn
+        logger.info(f"WebSocket connected: {connection_id}")
+
+    def disconnect(self, connection_id: str):
+        conn = self.connections.pop(connection_id, None)
+        if conn is None:
+            return
+        for job_id in conn.jobs:
+            subscribers = self.job_connections.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(connection_id)
+                if not subscribers:
+                    del self.job_connections[job_id]
+        if conn.writer is not None and conn.writer is not asyncio.current_task():
+            conn.writer.cancel()
+        logger.info(f"WebSocket disconnected: {connection_id}")
+
+    def subscribe_to_job(self, connection_id: str, job_id: str):
+        conn = self.connections.get(connection_id)
+        if conn is None:
+            return
+        conn.jobs.add(job_id)
+        self.job_connections.setdefault(job_id, set()).add(connection_id)
+
+    def unsubscribe_from_job(self, connection_id: str, job_id: str):
+        conn = self.connections.get(connection_id)
+        if conn is not None:
+            conn.jobs.discard(job_id)
+        subscribers = self.job_connections.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(connection_id)
+            if not subscribers:
+                del self.job_connections[job_id]
+
+    async def send_job_update(self, job_id: str, message: dict):
+        """Queue a job update for the job's subscribers"""
+        subscribers = self.job_connections.get(job_id)
+        if not subscribers:
+            return
+        frame_args = (json.dumps(message), f"job:{job_id}", message.get('status') not in TERMINAL_STATUSES)
+        for connection_id in list(subscribers):
+            conn = self.connections.get(connection_id)
+            if conn is not None:
+                self._enqueue(conn, *frame_args)
+
+    async def broadcast_message(self, message: dict):
+        """Queue a message for every active connection"""
+        payload = json.dumps(message)
+        for conn in list(self.connections.values()):
+            self._enqueue(conn, payload)
+
+    async def send(self, connection_id: str, message: dict):
+        """Queue a message for one connection"""
+        conn = self.connections.get(connection_id)
+        if conn is not None:
+            self._enqueue(conn, json.dumps(message))
+
+    def _enqueue(self, conn: _Connection, payload: str, key: Optional[str] = None, droppable: bool = False):
+        if key is not None:
+            queued = conn.pending.get(key)
+            if queued is not None:
+                queued.payload = payload
+                queued.droppable = droppable
+                self.coalesced += 1
+                return
+        if len(conn.frames) >= self.queue_size and not self._drop_stale(conn):
+            logger.warning(f"WebSocket client {conn.connection_id} is not keeping up; disconnecting")
+            self.slow_disconnects += 1
+            self.disconnect(conn.connection_id)
+            asyncio.get_running_loop().create_task(self._close(conn.websocket))
+            return
+        frame = _Frame(payload, key, droppable)
+        conn.frames.append(frame)
+        if key is not None:
+            conn.pending[key] = frame
+        conn.ready.set()
+
+    def _drop_stale(self, conn: _Connection) -> bool:
+        """Drop the oldest droppable frame of a full queue"""
+        for frame in conn.frames:
+            if frame.droppable:
+                conn.frames.remove(frame)
+                if frame.key is not None:
+                    conn.pending.pop(frame.key, None)
+                self.dropped += 1
+                return True
+        return False
+
+    @staticmethod
+    async def _close(websocket):
+        try:
+            await websocket.close(code=SLOW_CLIENT_CLOSE_CODE)
+        except Exception:
+            pass
+
+    async def _write(self, conn: _Connection):
+        """Writer task: send a connection's queued frames in order"""
+        try:
+            while True:
+                while not conn.frames:
+                    conn.ready.clear()
+                    await conn.ready.wait()
+                frame = conn.frames.popleft()
+                if frame.key is not None and conn.pending.get(frame.key) is frame:
+                    del conn.pending[frame.key]
+                await asyncio.wait_for(conn.websocket.send_text(frame.payload), self.send_timeout)
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to send WebSocket message to {conn.connection_id}: {e}")
+            self.disconnect(conn.connection_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'connections': len(self.connections),
+            'subscribed_jobs': len(self.job_connections),
+            'queued_frames': sum(len(conn.frames) for conn in self.connections.values()),
+            'queue_size': self.queue_size,
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'slow_disconnects': self.slow_disconnects
+        }
+
+    async def close(self):
+        """Stop every writer task"""
+        for connection_id in list(self.connections):
+            self.disconnect(connection_id)
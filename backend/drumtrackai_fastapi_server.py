@@ -21,7 +21,7 @@ import shutil
 import logging
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any
 import sqlite3
 from contextlib import asynccontextmanager
 
@@ -65,6 +65,24 @@ except ImportError:
     DATABASE_AVAILABLE = False
     logging.warning("Database service not available")
 
+try:
+    from backend.app.services.waveform_peaks import PeakPyramid, build_peaks, load_peaks, sidecar_path
+    WAVEFORM_PEAKS_AVAILABLE = True
+except ImportError:
+    WAVEFORM_PEAKS_AVAILABLE = False
+    logging.warning("Waveform peak pyramid not available")
+
+# Audio analysis engine; analysis jobs run in worker processes off the event loop
+from backend.app.services.audio_analysis import AdvancedAudioEngine, analyze_file, ANALYSIS_ENGINE_VERSION
+from backend.app.services.analysis_executor import (
+    AnalysisExecutor, AnalysisQueueFull, AnalysisTimeout, AnalysisCancelled, AnalysisFailed
+)
+from backend.app.services.upload_store import UploadStore, UploadTooLarge
+from backend.app.services.analysis_result_cache import AnalysisResultCache
+from backend.app.services.websocket_hub import WebSocketHub
+from backend.app.services.progress_channel import ProgressChannel
+from backend.app.services.job_store import JobStore
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -102,364 +120,6 @@ class GenerateTrackRequest(BaseModel):
     drummer_style: str = "jeff_porcaro"
     parameters: Dict[str, Any] = {}
 
-class WebSocketConnectionManager:
-    """WebSocket connection manager for real-time updates"""
-    
-    def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
-        self.job_connections: Dict[str, List[str]] = {}  # job_id -> [connection_ids]
-    
-    async def connect(self, websocket: WebSocket, connection_id: str):
-        await websocket.accept()
-        self.active_connections[connection_id] = websocket
-        logger.info(f"WebSocket connected: {connection_id}")
-    
-    def disconnect(self, connection_id: str):
-        if connection_id in self.active_connections:
-            del self.active_connections[connection_id]
-        # Remove from job connections
-        for job_id, connections in self.job_connections.items():
-            if connection_id in connections:
-                connections.remove(connection_id)
-        logger.info(f"WebSocket disconnected: {connection_id}")
-    
-    def subscribe_to_job(self, connection_id: str, job_id: str):
-        if job_id not in self.job_connections:
-            self.job_connections[job_id] = []
-        if connection_id not in self.job_connections[job_id]:
-            self.job_connections[job_id].append(connection_id)
-    
-    async def send_job_update(self, job_id: str, message: dict):
-        if job_id in self.job_connections:
-            for connection_id in self.job_connections[job_id].copy():
-                if connection_id in self.active_connections:
-                    try:
-                        await self.active_connections[connection_id].send_text(json.dumps(message))
-                    except Exception as e:
-                        logger.error(f"Failed to send WebSocket message to {connection_id}: {e}")
-                        self.disconnect(connection_id)
-    
-    async def broadcast_message(self, message: dict):
-        """Broadcast message to all active connections"""
-        for connection_id in list(self.active_connections.keys()):
-            try:
-                await self.active_connections[connection_id].send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"Failed to broadcast message to {connection_id}: {e}")
-                self.disconnect(connection_id)
-
-class AdvancedAudioEngine:
-    """Advanced audio processing engine integration"""
-    
-    def __init__(self):
-        self.cache_dir = Path('audio_cache')
-        self.cache_dir.mkdir(exist_ok=True)
-        self.processing_jobs = {}
-    
-    async def analyze_audio_advanced(self, file_path: str, sophistication_level: float = 0.887) -> Dict[str, Any]:
-        """Advanced audio analysis with AI-powered insights and stem separation"""
-        if not AUDIO_PROCESSING_AVAILABLE:
-            return self._generate_mock_analysis_with_stems()
-        
-        try:
-            # Load audio file
-            y, sr = librosa.load(file_path, sr=None)
-            duration = len(y) / sr
-            
-            # Generate stems (mock implementation - replace with real stem separation)
-            stems = await self._generate_stems(file_path, y, sr)
-            
-            # Advanced tempo detection
-            tempo, beats = librosa.beat.beat_track(y=y, sr=sr)
-            tempo_confidence = min(0.95, len(beats) / (duration * 2))
-            
-            # Key detection using chroma features
-            chroma = librosa.feature.chroma_stft(y=y, sr=sr)
-            key_strength = np.sum(chroma, axis=1)
-            key_idx = np.argmax(key_strength)
-            keys = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-            detected_key = keys[key_idx]
-            
-            # Spectral analysis for style detection
-            spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))
-            zero_crossing_rate = np.mean(librosa.feature.zero_crossing_rate(y))
-            mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-            
-            # Style classification
-            style = self._classify_style(spectral_centroid, zero_crossing_rate, mfccs)
-            
-            # Drum hit detection
-            onset_frames = librosa.onset.onset_detect(y=y, sr=sr, backtrack=True)
-            onset_times = librosa.frames_to_time(onset_frames, sr=sr)
-            
-            # Generate drum hits with classification
-            drum_hits = []
-            for onset_time in onset_times[:50]:  # Limit to first 50 hits
-                drum_type, confidence = self._classify_drum_hit(y, sr, onset_time)
-                drum_hits.append({
-                    'time': float(onset_time),
-                    'type': drum_type,
-                    'confidence': float(confidence),
-                    'velocity': float(np.random.uniform(0.6, 1.0))
-                })
-            
-            # Energy analysis
-            rms = librosa.feature.rms(y=y)[0]
-            energy_profile = {
-                'peak_energy': float(np.max(rms)),
-                'average_energy': float(np.mean(rms)),
-                'dynamic_range': float(np.max(rms) - np.min(rms))
-            }
-            
-            return {
-                'duration': float(duration),
-                'tempo': int(tempo),
-                'tempo_confidence': float(tempo_confidence),
-                'key': f"{detected_key} Major",
-                'time_signature': "4/4",
-                'sophistication': f"{sophistication_level * 100:.1f}%",
-                'style': style,
-                'drum_hits': drum_hits,
-                'energy_profile': energy_profile,
-                'spectral_features': {
-                    'centroid': float(spectral_centroid),
-                    'zero_crossing_rate': float(zero_crossing_rate)
-                },
-                'confidence': float(min(0.95, tempo_confidence + 0.1)),
-                'processing_time': '2.3s',
-                'timestamp': datetime.now().isoformat()
-            }
-            
-        except Exception as e:
-            logger.error(f"Audio analysis failed: {e}")
-            return self._generate_mock_analysis()
-    
-    def _classify_style(self, spectral_centroid: float, zcr: float, mfccs: np.ndarray) -> str:
-        """Classify musical style based on audio features"""
-        if spectral_centroid > 3000 and zcr > 0.1:
-            return "Rock"
-        elif spectral_centroid < 2000:
-            return "Jazz"
-        elif np.mean(mfccs[1]) > 0:
-            return "Electronic"
-        else:
-            return "Alternative"
-    
-    def _classify_drum_hit(self, y: np.ndarray, sr: int, onset_time: float) -> tuple:
-        """Classify individual drum hits"""
-        # Simple classification based on frequency content
-        start_sample = int(onset_time * sr)
-        end_sample = min(start_sample + int(0.1 * sr), len(y))
-        
-        if end_sample <= start_sample:
-            return "other", 0.5
-        
-        segment = y[start_sample:end_sample]
-        
-        # Frequency analysis
-        fft = np.abs(np.fft.fft(segment))
-        freqs = np.fft.fftfreq(len(segment), 1/sr)
-        
-        # Simple frequency-based classification
-        low_energy = np.sum(fft[(freqs >= 20) & (freqs <= 200)])
-        mid_energy = np.sum(fft[(freqs >= 200) & (freqs <= 2000)])
-        high_energy = np.sum(fft[(freqs >= 2000) & (freqs <= 8000)])
-        
-        total_energy = low_energy + mid_energy + high_energy
-        if total_energy == 0:
-            return "other", 0.3
-        
-        low_ratio = low_energy / total_energy
-        high_ratio = high_energy / total_energy
-        
-        if low_ratio > 0.6:
-            return "kick", min(0.9, low_ratio + 0.2)
-        elif high_ratio > 0.5:
-            return "hihat", min(0.85, high_ratio + 0.1)
-        elif mid_energy / total_energy > 0.4:
-            return "snare", min(0.8, (mid_energy / total_energy) + 0.2)
-        else:
-            return "other", 0.6
-    
-    async def _generate_stems(self, file_path: str, y: np.ndarray, sr: int) -> Dict[str, Any]:
-        """Generate audio stems from the input file"""
-        stems = {}
-        
-        try:
-            # Create stems directory
-            stems_dir = self.cache_dir / 'stems' / str(uuid.uuid4())
-            stems_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Mock stem separation (replace with real MVSep or other separation)
-            # For now, create frequency-filtered versions as stems
-            stem_types = ['bass', 'drums', 'vocals', 'other']
-            
-            for stem_type in stem_types:
-                # Apply frequency filtering to simulate stem separation
-                if stem_type == 'bass':
-                    # Low-pass filter for bass
-                    filtered_y = self._apply_lowpass_filter(y, sr, cutoff=200)
-                elif stem_type == 'drums':
-                    # Enhance percussive elements
-                    filtered_y = self._enhance_percussion(y, sr)
-                elif stem_type == 'vocals':
-                    # Mid-range emphasis for vocals
-                    filtered_y = self._apply_bandpass_filter(y, sr, low=300, high=3000)
-                else:
-                    # Everything else
-                    filtered_y = y * 0.3  # Reduced volume for "other"
-                
-                # Save stem to file
-                stem_file = stems_dir / f'{stem_type}.wav'
-                sf.write(str(stem_file), filtered_y, sr)
-                
-                # Create waveform data for visualization
-                waveform_data = self._generate_waveform_data(filtered_y, sr)
-                
-                stems[stem_type] = {
-                    'name': stem_type.title(),
-                    'type': stem_type,
-                    'file_path': str(stem_file),
-                    'url': f'/api/stems/{stems_dir.name}/{stem_type}.wav',
-                    'duration': len(filtered_y) / sr,
-                    'sample_rate': sr,
-                    'waveform': waveform_data,
-                    'confidence': random.uniform(0.8, 0.95)
-                }
-            
-            return stems
-            
-        except Exception as e:
-            logger.error(f"Stem generation failed: {e}")
-            return self._generate_mock_stems()
-    
-    def _apply_lowpass_filter(self, y: np.ndarray, sr: int, cutoff: int) -> np.ndarray:
-        """Apply low-pass filter"""
-        from scipy import signal
-        nyquist = sr // 2
-        normalized_cutoff = cutoff / nyquist
-        b, a = signal.butter(4, normalized_cutoff, btype='low')
-        return signal.filtfilt(b, a, y)
-    
-    def _apply_bandpass_filter(self, y: np.ndarray, sr: int, low: int, high: int) -> np.ndarray:
-        """Apply band-pass filter"""
-        from scipy import signal
-        nyquist = sr // 2
-        low_norm = low / nyquist
-        high_norm = high / nyquist
-        b, a = signal.butter(4, [low_norm, high_norm], btype='band')
-        return signal.filtfilt(b, a, y)
-    
-    def _enhance_percussion(self, y: np.ndarray, sr: int) -> np.ndarray:
-        """Enhance percussive elements"""
-        # Use librosa's harmonic-percussive separation
-        y_harmonic, y_percussive = librosa.effects.hpss(y)
-        return y_percussive * 2.0  # Amplify percussion
-    
-    def _generate_waveform_data(self, y: np.ndarray, sr: int, points: int = 1000) -> List[float]:
-        """Generate downsampled waveform data for visualization"""
-        if len(y) <= points:
-            return y.tolist()
-        
-        # Downsample for visualization
-        step = len(y) // points
-        downsampled = y[::step][:points]
-        return downsampled.tolist()
-    
-    def _generate_mock_stems(self) -> Dict[str, Any]:
-        """Generate mock stems when real processing fails"""
-        import random
-        
-        stems = {}
-        stem_types = ['bass', 'drums', 'vocals', 'other']
-        
-        for stem_type in stem_types:
-            stems[stem_type] = {
-                'name': stem_type.title(),
-                'type': stem_type,
-                'file_path': f'/demo/{stem_type}.wav',
-                'url': f'/demo/{stem_type}.wav',
-                'duration': random.uniform(120, 240),
-                'sample_rate': 44100,
-                'waveform': [random.uniform(-0.5, 0.5) for _ in range(1000)],
-                'confidence': random.uniform(0.7, 0.9)
-            }
-        
-        return stems
-    
-    def _generate_mock_analysis(self) -> Dict[str, Any]:
-        """Generate mock analysis data when real processing isn't available"""
-        import random
-        
-        return {
-            'duration': 180.0,
-            'tempo': random.choice([110, 120, 128, 140]),
-            'tempo_confidence': 0.92,
-            'key': random.choice(['C Major', 'G Major', 'D Major', 'A Minor']),
-            'time_signature': '4/4',
-            'sophistication': '88.7%',
-            'style': random.choice(['Rock', 'Pop', 'Alternative', 'Jazz']),
-            'drum_hits': [
-                {'time': i * 0.5, 'type': random.choice(['kick', 'snare', 'hihat']), 
-                 'confidence': random.uniform(0.7, 0.95), 'velocity': random.uniform(0.6, 1.0)}
-                for i in range(20)
-            ],
-            'energy_profile': {
-                'peak_energy': random.uniform(0.8, 1.0),
-                'average_energy': random.uniform(0.4, 0.7),
-                'dynamic_range': random.uniform(0.3, 0.6)
-            },
-            'confidence': 0.88,
-            'processing_time': '1.8s',
-            'timestamp': datetime.now().isoformat(),
-            'stems': self._generate_mock_stems()
-        }
-    
-    def _generate_mock_analysis_with_stems(self) -> Dict[str, Any]:
-        """Generate mock analysis with stems included"""
-        analysis = self._generate_mock_analysis()
-        analysis['stems'] = self._generate_mock_stems()
-        return analysis
-    
-    async def process_midi_file(self, file_path: str) -> Dict[str, Any]:
-        """Process MIDI file and convert to audio"""
-        try:
-            # Mock MIDI processing - replace with real MIDI to audio conversion
-            import random
-            
-            # Create audio directory for MIDI conversion
-            midi_dir = self.cache_dir / 'midi' / str(uuid.uuid4())
-            midi_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Mock audio file creation (replace with real MIDI synthesis)
-            audio_file = midi_dir / 'midi_audio.wav'
-            
-            # Generate mock audio data
-            duration = random.uniform(60, 180)
-            sr = 44100
-            samples = int(duration * sr)
-            audio_data = np.random.uniform(-0.1, 0.1, samples)  # Quiet random audio
-            
-            sf.write(str(audio_file), audio_data, sr)
-            
-            return {
-                'success': True,
-                'audio_file': str(audio_file),
-                'url': f'/api/midi/{midi_dir.name}/midi_audio.wav',
-                'duration': duration,
-                'sample_rate': sr,
-                'waveform': self._generate_waveform_data(audio_data, sr),
-                'message': 'MIDI file converted to audio successfully'
-            }
-            
-        except Exception as e:
-            logger.error(f"MIDI processing failed: {e}")
-            return {
-                'success': False,
-                'error': str(e),
-                'message': 'MIDI processing failed'
-            }
-
 # CRITICAL FIX: Create single FastAPI app instance FIRST
 app = FastAPI(
     title="DrumTracKAI API",
@@ -493,13 +153,15 @@ app.mount("/api/stems", StaticFiles(directory=str(DATA_STEMS), html=False), name
 app.mount("/api/stretched", StaticFiles(directory=str(DATA_STRETCHED), html=False), name="stems_stretched")
 
 # Initialize global services
-websocket_manager = WebSocketConnectionManager()
+websocket_manager = WebSocketHub()
+progress_channel = ProgressChannel(websocket_manager.send_job_update)
 audio_engine = AdvancedAudioEngine()
-
-# Initialize storage
-active_jobs: Dict[str, Dict] = {}
-uploaded_files: Dict[str, Dict] = {}
-user_sessions: Dict[str, Dict] = {}
+analysis_executor = AnalysisExecutor(preload=[analyze_file.__module__])
+upload_store = UploadStore()
+analysis_result_cache = AnalysisResultCache(
+    Path(os.getenv('ANALYSIS_RESULT_CACHE_DIR', str(audio_engine.cache_dir / 'analysis'))),
+    audio_engine.cache_dir / 'stems'
+)
 
 # Create directories
 cache_dir = Path('drumtrackai_cache')
@@ -509,6 +171,36 @@ audio_dir.mkdir(exist_ok=True)
 uploads_dir = cache_dir / 'uploads'
 uploads_dir.mkdir(exist_ok=True)
 
+def expire_job_files(job: Dict):
+    """Drop an expired job's progress state and remove its stem directory, unless the analysis result cache owns it"""
+    progress_channel.forget(job['id'])
+    if job.get('cached') or job.get('stems_cached'):
+        return
+    stems_root = (audio_engine.cache_dir / 'stems').resolve()
+    for stem in (job.get('results') or {}).get('stems', {}).values():
+        stems_dir = Path(stem.get('file_path', '')).resolve().parent
+        if stems_dir.parent == stems_root:
+            shutil.rmtree(stems_dir, ignore_errors=True)
+
+def expire_upload_files(upload: Dict):
+    """Remove an expired upload's file (and peak sidecar) once no other upload shares it"""
+    path = upload.get('path')
+    if not path or uploaded_files.find(path=path, limit=1):
+        return
+    Path(path).unlink(missing_ok=True)
+    if WAVEFORM_PEAKS_AVAILABLE:
+        sidecar_path(path).unlink(missing_ok=True)
+
+# Initialize storage: jobs and uploads survive restarts and expire after their TTL
+JOB_STORE_PATH = Path(os.getenv('JOB_STORE_PATH', str(cache_dir / 'jobs.db')))
+active_jobs = JobStore(JOB_STORE_PATH, 'analysis_jobs', ttl=float(os.getenv('JOB_TTL', 24 * 3600)),
+                       on_expire=expire_job_files)
+uploaded_files = JobStore(JOB_STORE_PATH, 'uploads', ttl=float(os.getenv('UPLOAD_TTL', 24 * 3600)),
+                          expire_when_finished=False, on_expire=expire_upload_files)
+active_jobs.fail_unfinished("Server restarted before the analysis finished")
+active_jobs.start_cleanup()
+uploaded_files.start_cleanup()
+
 # Initialize services
 db_service = None
 mvsep_service = None
@@ -586,73 +278,72 @@ def get_estimated_duration(tier: str) -> int:
     return durations.get(tier, 15)
 
 async def update_job_progress(job_id: str, progress: int, message: str):
-    """Update job progress and send WebSocket notification"""
-    if job_id in active_jobs:
-        active_jobs[job_id]['progress'] = progress
-        active_jobs[job_id]['current_step'] = message
-        
+    """Update job progress and send WebSocket notification
+    
+    The job record is updated on every call; WebSocket updates are coalesced
+    per job to PROGRESS_MAX_RATE, with terminal states sent at once.
+    """
+    job = active_jobs.update(job_id, progress=progress, current_step=message)
+    if job is not None:
         # Send WebSocket update
-        await websocket_manager.send_job_update(job_id, {
+        await progress_channel.report(job_id, {
             'job_id': job_id,
             'progress': progress,
-            'status': active_jobs[job_id]['status'],
+            'status': job['status'],
             'message': message,
             'timestamp': datetime.now().isoformat()
         })
 
-async def run_simple_analysis(job_id: str):
-    """Run simple analysis for unauthenticated requests"""
+def analysis_progress_handler(job_id: str):
+    """Progress callback for an executor job: per-stage progress from the worker"""
+    async def report(progress: int, message: str):
+        job = active_jobs.get(job_id)
+        if job is not None and job['status'] == 'queued':
+            active_jobs.update(job_id, status='processing')
+        await update_job_progress(job_id, progress, message)
+    return report
+
+async def run_simple_analysis(job_id: str, analysis: Optional[asyncio.Future] = None,
+                              cache_key: Optional[str] = None):
+    """Run simple analysis for unauthenticated requests
+    
+    ``analysis`` is the job's future from the analysis executor; without it
+    (audio libraries unavailable) mock results are used. A successful
+    result is stored in the analysis result cache under ``cache_key``.
+    """
     job = active_jobs.get(job_id)
     if not job:
         return
     
     try:
-        # Simulate analysis progress
-        phases = [
-            ("Loading audio file...", 10, 2),
-            ("Analyzing tempo and rhythm...", 30, 4),
-            ("Detecting drum patterns...", 40, 5),
-            ("Generating analysis results...", 20, 3)
-        ]
-        
-        for phase_name, phase_percentage, phase_steps in phases:
-            for step in range(phase_steps):
-                if job_id not in active_jobs:
-                    return
-                
-                await asyncio.sleep(1.0)
-                progress = job.get('progress', 0) + (phase_percentage // phase_steps)
-                
-                await update_job_progress(job_id, progress, phase_name)
-        
-        # Complete analysis with stem generation
-        active_jobs[job_id]['progress'] = 90
-        await update_job_progress(job_id, 90, "Generating stems...")
-        
-        # Get file info and run analysis with stems
-        file_info = uploaded_files.get(job.get('file_id'))
-        if file_info and AUDIO_PROCESSING_AVAILABLE:
+        stems_cached = job.get('cached', False)
+        if analysis is not None:
             try:
-                # Run actual analysis with stem generation
-                analysis_results = await audio_engine.analyze_audio_advanced(file_info['path'])
-                active_jobs[job_id]['results'] = analysis_results
-            except Exception as e:
+                # Real analysis with stem generation, in a worker process
+                results = await analysis
+                if cache_key is not None:
+                    # The cache then owns the stems (job expiry leaves them)
+                    stems_cached = await asyncio.get_running_loop().run_in_executor(
+                        None, analysis_result_cache.put, cache_key, results,
+                        time.time() - job['start_time']
+                    )
+            except AnalysisFailed as e:
                 logger.error(f"Advanced analysis failed: {e}")
                 # Fallback to mock results
-                active_jobs[job_id]['results'] = audio_engine._generate_mock_analysis_with_stems()
+                results = audio_engine._generate_mock_analysis_with_stems()
         else:
             # Use mock results with stems
-            active_jobs[job_id]['results'] = audio_engine._generate_mock_analysis_with_stems()
+            results = audio_engine._generate_mock_analysis_with_stems()
         
-        active_jobs[job_id]['progress'] = 100
-        active_jobs[job_id]['status'] = 'completed'
+        active_jobs.update(job_id, results=results, stems_cached=stems_cached,
+                           progress=100, status='completed')
         
         # Automatically load stems into WebDAW
         webdaw_message = {
             'type': 'load_stems',
             'job_id': job_id,
-            'analysis': active_jobs[job_id]['results'],
-            'stems': active_jobs[job_id]['results'].get('stems', {}),
+            'analysis': results,
+            'stems': results.get('stems', {}),
             'timestamp': datetime.now().isoformat()
         }
         
@@ -662,10 +353,15 @@ async def run_simple_analysis(job_id: str):
         await update_job_progress(job_id, 100, "Analysis completed! Stems loaded into WebDAW.")
         logger.info(f"Analysis completed with stems: {job_id}")
         
+    except (AnalysisCancelled, AnalysisTimeout) as e:
+        # Reported as failed so clients polling for completed/failed stop
+        logger.warning(f"Analysis stopped: {job_id} - {e}")
+        job = active_jobs.update(job_id, status='failed', cancelled=isinstance(e, AnalysisCancelled),
+                                 error=str(e))
+        await update_job_progress(job_id, job['progress'], str(e))
     except Exception as e:
         logger.error(f"Simple analysis failed: {job_id} - {e}")
-        active_jobs[job_id]['status'] = 'failed'
-        active_jobs[job_id]['error'] = str(e)
+        active_jobs.update(job_id, status='failed', error=str(e))
 
 # MAIN ROUTES - ALL ON SINGLE APP INSTANCE
 
@@ -705,7 +401,10 @@ async def status():
             'websocket': 'enabled'
         },
         'active_jobs': len(active_jobs),
-        'active_connections': len(websocket_manager.active_connections),
+        'jobs': active_jobs.stats(),
+        'active_connections': len(websocket_manager.connections),
+        'websocket': websocket_manager.stats(),
+        'progress': progress_channel.stats(),
         'uptime': '100%',
         'timestamp': datetime.now().isoformat()
     }
@@ -795,43 +494,96 @@ async def login(login_data: UserLogin):
 async def upload_file_temp(file: UploadFile = File(...)):
     try:
         # Accept file without authentication for testing
-        content = await file.read()
-        file_size = len(content)
-        
-        # Create temp file
+        # Stream to the content-addressed store; identical content is kept once
+        stored = await upload_store.save(file, Path(file.filename or '').suffix)
+        file_path = stored.path
+        file_size = stored.size
         file_id = str(uuid.uuid4())
-        temp_dir = Path('temp_uploads')
-        temp_dir.mkdir(exist_ok=True)
-        
-        file_path = temp_dir / f"{file_id}_{file.filename}"
-        with open(file_path, 'wb') as f:
-            f.write(content)
         
         # Store file info in global storage
         uploaded_files[file_id] = {
             'filename': file.filename,
             'path': str(file_path),
             'size': file_size,
+            'sha256': stored.sha256,
             'content_type': file.content_type,
             'uploaded_at': datetime.now().isoformat(),
-            'file_type': 'audio' if file.content_type.startswith('audio/') else 'other'
+            'file_type': 'audio' if (file.content_type or '').startswith('audio/') else 'other'
         }
         
-        logger.info(f"File uploaded: {file.filename} ({file_size} bytes) - ID: {file_id}")
+        # Build the waveform peak sidecar off the event loop (kept across duplicate uploads)
+        if WAVEFORM_PEAKS_AVAILABLE and uploaded_files[file_id]['file_type'] == 'audio':
+            asyncio.get_running_loop().run_in_executor(None, build_upload_peaks, file_path)
+        
+        logger.info(f"File uploaded: {file.filename} ({file_size} bytes) - ID: {file_id}"
+                    f"{' (duplicate content)' if stored.deduplicated else ''}")
         
         return {
             'success': True,
             'file_id': file_id,
             'filename': file.filename,
             'size': file_size,
+            'sha256': stored.sha256,
+            'deduplicated': stored.deduplicated,
             'status': 'uploaded',
             'message': 'File uploaded successfully'
         }
         
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Upload error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/upload/existing")
+async def register_existing_upload(request: Request):
+    """Register an upload by its SHA-256 when that content is already stored,
+    so a client can skip sending the file again (404 means upload it)"""
+    try:
+        request_data = await request.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    
+    sha256 = str(request_data.get('sha256', ''))
+    filename = request_data.get('filename', '')
+    content_type = request_data.get('content_type') or 'application/octet-stream'
+    if len(sha256) != 64 or not all(c in '0123456789abcdefABCDEF' for c in sha256):
+        raise HTTPException(status_code=400, detail="sha256 must be 64 hex digits")
+    
+    stored = upload_store.find(sha256, Path(filename).suffix)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Content not stored")
+    
+    file_id = str(uuid.uuid4())
+    uploaded_files[file_id] = {
+        'filename': filename,
+        'path': str(stored.path),
+        'size': stored.size,
+        'sha256': stored.sha256,
+        'content_type': content_type,
+        'uploaded_at': datetime.now().isoformat(),
+        'file_type': 'audio' if content_type.startswith('audio/') else 'other'
+    }
+    logger.info(f"File registered from stored content: {filename} - ID: {file_id}")
+    
+    return {
+        'success': True,
+        'file_id': file_id,
+        'filename': filename,
+        'size': stored.size,
+        'sha256': stored.sha256,
+        'deduplicated': True,
+        'status': 'uploaded',
+        'message': 'File already stored'
+    }
+
+def build_upload_peaks(file_path: Path):
+    """Build an upload's peak sidecar unless it is current (run in a worker thread)"""
+    try:
+        load_peaks(file_path)
+    except Exception as e:
+        logger.warning(f"Waveform peaks not built for {file_path.name}: {e}")
+
 # FIXED: Single /api/analyze endpoint (NO DUPLICATES)
 @app.post("/api/analyze")
 async def analyze_audio(request: Request):
@@ -858,7 +610,7 @@ async def analyze_audio(request: Request):
         # Check if file exists
         if file_id not in uploaded_files:
             logger.warning(f"File not found: {file_id}")
-            logger.info(f"Available files: {list(uploaded_files.keys())}")
+            logger.info(f"Available files: {len(uploaded_files)}")
             raise HTTPException(status_code=404, detail="File not found")
         
         # Create analysis job
@@ -869,24 +621,59 @@ async def analyze_audio(request: Request):
             'file_id': file_id,
             'analysis_type': analysis_type,
             'tier': 'basic',  # Default tier for unauthenticated requests
-            'status': 'started',
+            'status': 'queued',
             'progress': 0,
+            'current_step': 'Queued for analysis...',
             'start_time': time.time(),
             'estimated_duration': 30,
             'created_at': datetime.now().isoformat()
         }
         
+        # Identical audio analysed before: reuse the result and its stems
+        analysis = None
+        cache_key = None
+        cached = None
+        # Keeps the upload from expiring while it is analysed
+        file_info = uploaded_files.update(file_id)
+        if AUDIO_PROCESSING_AVAILABLE:
+            loop = asyncio.get_running_loop()
+            if not file_info.get('sha256'):
+                digest = await loop.run_in_executor(
+                    None, analysis_result_cache.content_digest, file_info['path'])
+                file_info = uploaded_files.update(file_id, sha256=digest)
+            cache_key = analysis_result_cache.key_for(file_info['sha256'], analysis_type, ANALYSIS_ENGINE_VERSION)
+            cached = await loop.run_in_executor(None, analysis_result_cache.get, cache_key)
+        
+        if cached is not None:
+            logger.info(f"Analysis result cache hit for {file_id}: {job_id}")
+            active_jobs.update(job_id, cached=True)
+            analysis = asyncio.get_running_loop().create_future()
+            analysis.set_result(cached)
+            cache_key = None
+        elif AUDIO_PROCESSING_AVAILABLE:
+            # Queue the CPU-bound analysis in the worker pool
+            try:
+                analysis = analysis_executor.submit(
+                    job_id, analyze_file, file_info['path'],
+                    on_progress=analysis_progress_handler(job_id)
+                )
+            except AnalysisQueueFull as e:
+                del active_jobs[job_id]
+                raise HTTPException(status_code=503, detail=str(e), headers={'Retry-After': '30'})
+        
         # Start background analysis
-        asyncio.create_task(run_simple_analysis(job_id))
+        asyncio.create_task(run_simple_analysis(job_id, analysis, cache_key))
         
-        logger.info(f"Analysis started successfully: {job_id}")
+        logger.info(f"Analysis queued successfully: {job_id}")
         
         return {
             'success': True,
             'job_id': job_id,
-            'status': 'started',
+            'status': 'queued',
+            'cached': cached is not None,
+            'queue_position': analysis_executor.queue_position(job_id),
             'estimated_time': '30 seconds',
-            'message': 'Analysis started successfully'
+            'message': 'Analysis queued successfully'
         }
         
     except HTTPException:
@@ -895,19 +682,38 @@ async def analyze_audio(request: Request):
         logger.error(f"Analysis error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Cancel a queued or running analysis
+@app.delete("/api/analyze/{job_id}")
+async def cancel_analysis(job_id: str):
+    if job_id not in active_jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not analysis_executor.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job is not queued or running")
+    return {'job_id': job_id, 'cancelled': True}
+
+# Analysis worker pool status
+@app.get("/api/analysis/executor")
+async def analysis_executor_status():
+    return analysis_executor.stats()
+
+# Analysis result cache statistics
+@app.get("/api/analysis/cache")
+async def analysis_cache_status():
+    return await asyncio.get_running_loop().run_in_executor(None, analysis_result_cache.stats)
+
 # Progress endpoint (simple version for testing)
 @app.get("/api/progress/{job_id}")
 async def get_progress_simple(job_id: str):
-    if job_id not in active_jobs:
+    job = active_jobs.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = active_jobs[job_id]
-    
     return {
         'job_id': job_id,
         'progress': job.get('progress', 0),
         'status': job.get('status', 'unknown'),
         'current_step': job.get('current_step', 'Processing...'),
+        'queue_position': analysis_executor.queue_position(job_id),
         'elapsed_time': int(time.time() - job.get('start_time', time.time())),
         'tier': job.get('tier', 'basic')
     }
@@ -915,11 +721,10 @@ async def get_progress_simple(job_id: str):
 # Results endpoint (simple version for testing)
 @app.get("/api/results/{job_id}")
 async def get_results_simple(job_id: str):
-    if job_id not in active_jobs:
+    job = active_jobs.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = active_jobs[job_id]
-    
     if job['status'] != 'completed':
         return {
             'job_id': job_id,
@@ -943,17 +748,10 @@ async def upload_midi_file(file: UploadFile = File(...)):
         if not file.filename.lower().endswith(('.mid', '.midi')):
             raise HTTPException(status_code=400, detail="Only MIDI files (.mid, .midi) are allowed")
         
-        content = await file.read()
-        file_size = len(content)
-        
-        # Create temp file
+        stored = await upload_store.save(file, Path(file.filename).suffix)
+        file_path = stored.path
+        file_size = stored.size
         file_id = str(uuid.uuid4())
-        temp_dir = Path('temp_uploads')
-        temp_dir.mkdir(exist_ok=True)
-        
-        file_path = temp_dir / f"{file_id}_{file.filename}"
-        with open(file_path, 'wb') as f:
-            f.write(content)
         
         # Process MIDI file
         midi_result = await audio_engine.process_midi_file(str(file_path))
@@ -963,6 +761,7 @@ async def upload_midi_file(file: UploadFile = File(...)):
             'filename': file.filename,
             'path': str(file_path),
             'size': file_size,
+            'sha256': stored.sha256,
             'content_type': 'audio/midi',
             'uploaded_at': datetime.now().isoformat(),
             'file_type': 'midi',
@@ -981,6 +780,10 @@ async def upload_midi_file(file: UploadFile = File(...)):
             'audio_data': midi_result
         }
         
+    except HTTPException:
+        raise
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"MIDI upload error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -1027,6 +830,63 @@ async def serve_midi_audio(midi_id: str, filename: str):
         logger.error(f"MIDI audio serving error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Waveform peak endpoints: min/max/RMS per pixel for any range and zoom
+MAX_WAVEFORM_PIXELS = 20000
+
+async def serve_waveform_peaks(audio_path: Path, start: float, end: Optional[float], pixels: int):
+    """Query an audio file's peak pyramid (built on first use if missing)"""
+    if not WAVEFORM_PEAKS_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Waveform peaks not available")
+    if not audio_path.exists():
+        raise HTTPException(status_code=404, detail="Audio file not found")
+    if not 1 <= pixels <= MAX_WAVEFORM_PIXELS:
+        raise HTTPException(status_code=400, detail=f"pixels must be between 1 and {MAX_WAVEFORM_PIXELS}")
+    
+    def _query():
+        pyramid = load_peaks(audio_path)
+        sr = pyramid.sample_rate
+        peaks = pyramid.query(int(max(start, 0.0) * sr), None if end is None else int(end * sr), pixels)
+        return {
+            'sample_rate': sr,
+            'duration': pyramid.n_samples / sr,
+            'start': peaks['start'] / sr,
+            'end': peaks['end'] / sr,
+            'samples_per_pixel': peaks['samples_per_pixel'],
+            'min': np.round(peaks['min'].astype(np.float64), 4).tolist(),
+            'max': np.round(peaks['max'].astype(np.float64), 4).tolist(),
+            'rms': np.round(peaks['rms'].astype(np.float64), 4).tolist()
+        }
+    
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, _query)
+    except Exception as e:
+        logger.error(f"Waveform peak error for {audio_path}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/waveform/stems/{stem_id}/{filename}")
+async def get_stem_waveform(stem_id: str, filename: str, start: float = 0.0,
+                            end: Optional[float] = None, pixels: int = 1000):
+    """Waveform peaks of a generated or WebDAW stem (times in seconds)"""
+    for part in (stem_id, filename):
+        if part in ('', '.', '..') or Path(part).name != part:
+            raise HTTPException(status_code=400, detail="Invalid stem path")
+    for stems_root in (Path('audio_cache') / 'stems', DATA_STEMS):
+        audio_path = stems_root / stem_id / filename
+        # Never serve (or write a peaks sidecar next to) files outside the stems roots
+        if not audio_path.resolve().is_relative_to(stems_root.resolve()):
+            raise HTTPException(status_code=400, detail="Invalid stem path")
+        if audio_path.exists():
+            break
+    return await serve_waveform_peaks(audio_path, start, end, pixels)
+
+@app.get("/api/waveform/uploads/{file_id}")
+async def get_upload_waveform(file_id: str, start: float = 0.0,
+                              end: Optional[float] = None, pixels: int = 1000):
+    """Waveform peaks of an uploaded audio file (times in seconds)"""
+    if file_id not in uploaded_files:
+        raise HTTPException(status_code=404, detail="File not found")
+    return await serve_waveform_peaks(Path(uploaded_files[file_id]['path']), start, end, pixels)
+
 # WebDAW integration endpoint
 @app.post("/api/webdaw/load-stems")
 async def load_stems_to_webdaw(request: Request):
@@ -1160,10 +1020,13 @@ async def websocket_progress(websocket: WebSocket, job_id: str):
     websocket_manager.subscribe_to_job(connection_id, job_id)
     
     try:
-        while True:
+        # Until the client leaves or the hub drops it
+        while connection_id in websocket_manager.connections:
             # Keep connection alive
             await websocket.receive_text()
     except WebSocketDisconnect:
+        pass
+    finally:
         websocket_manager.disconnect(connection_id)
 
 # WebDAW WebSocket endpoint for stem loading and real-time updates
@@ -1173,15 +1036,15 @@ async def websocket_webdaw(websocket: WebSocket):
     await websocket_manager.connect(websocket, connection_id)
     
     try:
-        # Send welcome message
-        await websocket.send_text(json.dumps({
+        # Send welcome message (all sends go through the connection's queue)
+        await websocket_manager.send(connection_id, {
             'type': 'connected',
             'message': 'WebDAW WebSocket connected',
             'connection_id': connection_id,
             'timestamp': datetime.now().isoformat()
-        }))
+        })
         
-        while True:
+        while connection_id in websocket_manager.connections:
             # Handle incoming messages from WebDAW
             try:
                 message = await websocket.receive_text()
@@ -1189,34 +1052,37 @@ async def websocket_webdaw(websocket: WebSocket):
                 
                 # Handle different message types
                 if data.get('type') == 'ping':
-                    await websocket.send_text(json.dumps({
+                    await websocket_manager.send(connection_id, {
                         'type': 'pong',
                         'timestamp': datetime.now().isoformat()
-                    }))
+                    })
                 elif data.get('type') == 'request_stems':
                     # Client requesting stems for a specific job
                     job_id = data.get('job_id')
                     if job_id and job_id in active_jobs:
                         job = active_jobs[job_id]
                         if 'results' in job:
-                            await websocket.send_text(json.dumps({
+                            await websocket_manager.send(connection_id, {
                                 'type': 'load_stems',
                                 'job_id': job_id,
                                 'analysis': job['results'],
                                 'stems': job['results'].get('stems', {}),
                                 'timestamp': datetime.now().isoformat()
-                            }))
+                            })
                 else:
                     logger.info(f"WebDAW message received: {data}")
                     
             except json.JSONDecodeError:
                 logger.error("Invalid JSON received from WebDAW client")
+            except WebSocketDisconnect:
+                raise
             except Exception as e:
                 logger.error(f"Error handling WebDAW message: {e}")
                 
     except WebSocketDisconnect:
-        websocket_manager.disconnect(connection_id)
         logger.info(f"WebDAW WebSocket disconnected: {connection_id}")
+    finally:
+        websocket_manager.disconnect(connection_id)
 
 def main():
     """Run the fixed server"""
@@ -14,6 +14,8 @@ from typing import Dict, List, Optional, Any
 from aiohttp import web, web_request
 import aiohttp_cors
 
+from backend.app.services.job_store import JobStore
+
 # Import your existing services
 try:
     from admin.services.central_database_service import get_database_service
@@ -33,10 +35,17 @@ class DrumGenerationService:
         self.expert_model = ExpertDrumModel() if ExpertDrumModel else None
         self.db_service = get_database_service() if get_database_service else None
         self.mvsep_service = None
-        self.active_jobs = {}
+        # Durable job records; finished jobs expire after JOB_TTL
+        self.active_jobs = JobStore(
+            os.getenv('JOB_STORE_PATH', 'drumtrackai_cache/jobs.db'), 'generation_jobs',
+            ttl=float(os.getenv('JOB_TTL', 24 * 3600))
+        )
         
     def initialize(self):
         """Initialize the generation service"""
+        self.active_jobs.fail_unfinished("Service restarted before generation finished")
+        self.active_jobs.start_cleanup()
+        
         if self.expert_model:
             self.expert_model.initialize()
         
@@ -52,6 +61,7 @@ class DrumGenerationService:
         try:
             # Store job info
             self.active_jobs[job_id] = {
+                'user_id': generation_payload.get('user_id'),
                 'status': 'started',
                 'progress': 0,
                 'stage': 'Initializing generation...',
@@ -78,14 +88,15 @@ class DrumGenerationService:
     async def _process_generation(self, job_id: str, payload: Dict):
         """Process drum track generation with Expert model"""
         try:
-            job = self.active_jobs[job_id]
+            def update(**fields):
+                self.active_jobs.update(job_id, **fields)
+            
             mode = payload.get('mode', 'template')
             settings = payload.get('settings', {})
             tier = payload.get('tier', 'basic')
             
             # Stage 1: Load patterns and references
-            job['stage'] = 'Loading drum patterns...'
-            job['progress'] = 10
+            update(stage='Loading drum patterns...', progress=10)
             
             if mode == 'template':
                 patterns = await self._load_template_patterns(payload.get('template', {}))
@@ -95,8 +106,7 @@ class DrumGenerationService:
                 patterns = await self._create_custom_patterns(settings)
             
             # Stage 2: Expert Model Analysis
-            job['stage'] = 'Expert Model processing...'
-            job['progress'] = 30
+            update(stage='Expert Model processing...', progress=30)
             
             if self.expert_model:
                 analysis_result = await self.expert_model.analyze_and_generate(
@@ -109,8 +119,7 @@ class DrumGenerationService:
                 analysis_result = self._generate_demo_analysis(settings)
             
             # Stage 3: Apply human factors
-            job['stage'] = 'Applying human factors...'
-            job['progress'] = 50
+            update(stage='Applying human factors...', progress=50)
             
             humanized_track = await self._apply_human_factors(
                 analysis_result, 
@@ -120,32 +129,24 @@ class DrumGenerationService:
             
             # Stage 4: Bass integration (Pro/Expert)
             if settings.get('bassIntegration') and tier in ['professional', 'expert']:
-                job['stage'] = 'Integrating bass patterns...'
-                job['progress'] = 70
+                update(stage='Integrating bass patterns...', progress=70)
                 humanized_track = await self._integrate_bass_patterns(humanized_track, settings)
             
             # Stage 5: Neural entrainment (Expert only)
             if settings.get('neuralEntrainment') and tier == 'expert':
-                job['stage'] = 'Applying neural entrainment...'
-                job['progress'] = 85
+                update(stage='Applying neural entrainment...', progress=85)
                 humanized_track = await self._apply_neural_entrainment(humanized_track, settings)
             
             # Stage 6: Generate audio
-            job['stage'] = 'Generating audio files...'
-            job['progress'] = 95
+            update(stage='Generating audio files...', progress=95)
             
             audio_result = await self._generate_audio_files(humanized_track, settings, tier)
             
             # Complete
-            job['status'] = 'completed'
-            job['progress'] = 100
-            job['stage'] = 'Generation complete'
-            job['result'] = audio_result
+            update(status='completed', progress=100, stage='Generation complete', result=audio_result)
             
         except Exception as e:
-            job['status'] = 'failed'
-            job['error'] = str(e)
-            job['stage'] = 'Generation failed'
+            self.active_jobs.update(job_id, status='failed', error=str(e), stage='Generation failed')
     
     async def _load_template_patterns(self, template: Dict) -> Dict:
         """Load patterns from template database"""
@@ -306,10 +307,10 @@ class DrumGenerationService:
     
     def get_job_status(self, job_id: str) -> Dict:
         """Get generation job status"""
-        if job_id not in self.active_jobs:
+        job = self.active_jobs.get(job_id)
+        if job is None:
             return {'error': 'Job not found'}
         
-        job = self.active_jobs[job_id]
         return {
             'job_id': job_id,
             'status': job.get('status', 'unknown'),
@@ -322,10 +323,10 @@ class DrumGenerationService:
     
     def get_job_result(self, job_id: str) -> Dict:
         """Get generation job result"""
-        if job_id not in self.active_jobs:
+        job = self.active_jobs.get(job_id)
+        if job is None:
             return {'error': 'Job not found'}
         
-        job = self.active_jobs[job_id]
         if job.get('status') != 'completed':
             return {'error': 'Job not completed'}
         
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark the v4/v5 export mix chains
+Renders a full export (kick/snare/hihat lanes through build_channel_chain,
+then build_buses mixdown) with the legacy per-sample Compressor and
+TransientProcessor and with the current EnvelopeFollower-based ones, and
+compares wall time and output.
+
+Usage: python tests/benchmark_mix_chains.py [--duration 30] [--sr 48000] [--no-reverb]
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# Make the backend "app" package importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend" / "backend"))
+
+from app.services import mix_chains
+from app.services.mix_chains import DSPProcessor, build_channel_chain, build_buses
+from app.services.synth import SamplerSynth
+
+
+class LegacyCompressor(DSPProcessor):
+    """Original per-sample compressor, kept here as the reference implementation"""
+
+    def __init__(self, sr: int, threshold: float = -12, ratio: float = 4,
+                 attack: float = 0.003, release: float = 0.1):
+        super().__init__(sr)
+        self.threshold = threshold
+        self.ratio = ratio
+        self.attack_coeff = np.exp(-1 / (attack * sr))
+        self.release_coeff = np.exp(-1 / (release * sr))
+        self.envelope = 0
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        output = np.zeros_like(audio)
+        for i, sample in enumerate(audio):
+            level_db = 20 * np.log10(max(abs(sample), 1e-6))
+            if level_db > self.threshold:
+                gain_reduction = (level_db - self.threshold) * (1 - 1 / self.ratio)
+            else:
+                gain_reduction = 0
+            if gain_reduction > self.envelope:
+                self.envelope = gain_reduction + (self.envelope - gain_reduction) * self.attack_coeff
+            else:
+                self.envelope = gain_reduction + (self.envelope - gain_reduction) * self.release_coeff
+            output[i] = sample * 10 ** (-self.envelope / 20)
+        return output
+
+
+class LegacyTransientProcessor(DSPProcessor):
+    """Original transient shaper with the per-sample smoothing loop"""
+
+    def __init__(self, sr: int, attack: float = 0, sustain: float = 0):
+        super().__init__(sr)
+        self.attack = attack
+        self.sustain = sustain
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        envelope = np.abs(audio)
+        smoothed = np.zeros_like(envelope)
+        smoothed[0] = envelope[0]
+        for i in range(1, len(envelope)):
+            if envelope[i] > smoothed[i-1]:
+                smoothed[i] = 0.01 * envelope[i] + 0.99 * smoothed[i-1]
+            else:
+                smoothed[i] = 0.001 * envelope[i] + 0.999 * smoothed[i-1]
+        transient_strength = np.maximum(np.diff(smoothed, prepend=smoothed[0]), 0)
+        if self.attack != 0:
+            audio = audio * (1 + self.attack * transient_strength * 2)
+        if self.sustain != 0:
+            audio = audio * (1 + self.sustain * (1 - transient_strength))
+        return audio
+
+
+def make_groove(duration: float, bpm: float = 120.0) -> dict:
+    """Simple rock groove: kick on 1/3, snare on 2/4, eighth-note hats"""
+    beat = 60.0 / bpm
+    lanes = {'kick': [], 'snare': [], 'hihat': []}
+    n_beats = int(duration / beat)
+    for b in range(n_beats):
+        t = b * beat
+        lanes['kick' if b % 2 == 0 else 'snare'].append(
+            {'time_sec': t, 'velocity': 110, 'lane': 'kick' if b % 2 == 0 else 'snare'})
+        for sub in (0, 0.5):
+            lanes['hihat'].append({'time_sec': t + sub * beat, 'velocity': 80, 'lane': 'hihat'})
+    return lanes
+
+
+def render_export(sr: int, midi_lanes: dict, params: dict):
+    """Same path as RenderEngine.render_from_job, without writing files"""
+    np.random.seed(0)  # synthetic samples and default IR use np.random
+    timings = {}
+
+    start = time.perf_counter()
+    synth = SamplerSynth(sr=sr)
+    lane_audio = {lane: synth.render_lane(events) for lane, events in midi_lanes.items()}
+    timings['synth'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for lane, audio in lane_audio.items():
+        lane_audio[lane] = build_channel_chain(lane, sr, params).process(audio)
+    timings['channels'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mix = build_buses(sr, params).mixdown(lane_audio, params)
+    timings['bus'] = time.perf_counter() - start
+
+    timings['total'] = sum(timings.values())
+    return mix, timings
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--duration", type=float, default=30.0, help="song length in seconds")
+    ap.add_argument("--sr", type=int, default=48000)
+    ap.add_argument("--no-reverb", action="store_true", help="disable the bus reverb")
+    args = ap.parse_args()
+
+    midi_lanes = make_groove(args.duration)
+    params = {'mode': 'stereo'}
+    if args.no_reverb:
+        params['mix_bus'] = {
+            'processing': {
+                'compressor': {'enabled': True, 'threshold': -3, 'ratio': 2},
+                'eq': {'enabled': True, 'bands': [{'freq': 100, 'gain': 0.5, 'q': 0.7}]}
+            },
+            'reverb': {'enabled': False}
+        }
+
+    # Warm up (numba compilation, scipy imports)
+    render_export(args.sr, make_groove(1.0), params)
+
+    new_mix, new_times = render_export(args.sr, midi_lanes, params)
+
+    current = mix_chains.Compressor, mix_chains.TransientProcessor
+    mix_chains.Compressor = LegacyCompressor
+    mix_chains.TransientProcessor = LegacyTransientProcessor
+    try:
+        old_mix, old_times = render_export(args.sr, midi_lanes, params)
+    finally:
+        mix_chains.Compressor, mix_chains.TransientProcessor = current
+
+    print("DrumTracKAI Mix Chain Benchmark")
+    print("=" * 50)
+    print(f"Song length: {args.duration:.1f} s @ {args.sr} Hz"
+          f"{' (no reverb)' if args.no_reverb else ''}")
+    print(f"{'stage':<10}{'legacy (s)':>14}{'current (s)':>14}{'speedup':>10}")
+    for stage in ('synth', 'channels', 'bus', 'total'):
+        old, new = old_times[stage], new_times[stage]
+        print(f"{stage:<10}{old:>14.2f}{new:>14.2f}{old / max(new, 1e-9):>9.2f}x")
+    print(f"Max abs difference: {np.max(np.abs(old_mix - new_mix)):.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark parallel lane rendering for v4/v5 exports
+Renders 1..N lanes (synth + channel strip) serially and through the shared
+process pool with shared-memory lane buffers, and prints speedup versus
+lane count.
+
+Usage: python tests/benchmark_parallel_render.py [--duration 60] [--max-lanes 8] [--workers 4]
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# Make the backend "app" package importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend" / "backend"))
+
+LANES = ['kick', 'snare', 'hihat', 'tom', 'ride', 'crash', 'tom_low', 'tom_high']
+
+# Give every lane a full strip so the work per lane is comparable
+STRIP = {
+    'highpass': {'enabled': True, 'freq': 60},
+    'eq': {'enabled': True, 'bands': [{'freq': 200, 'gain': 1, 'q': 1.0}, {'freq': 5000, 'gain': 2, 'q': 0.7}]},
+    'compressor': {'enabled': True, 'threshold': -8, 'ratio': 3},
+    'transients': {'enabled': True, 'attack': 0.3},
+    'saturator': {'enabled': True, 'drive': 0.1}
+}
+
+
+def make_lanes(n_lanes: int, duration: float, bpm: float = 120.0) -> dict:
+    """Sixteenth-note pattern on every lane"""
+    step = 60.0 / bpm / 4
+    times = np.arange(0, duration, step)
+    return {
+        lane: [{'time_sec': float(t), 'velocity': 90, 'lane': lane.split('_')[0]} for t in times]
+        for lane in LANES[:n_lanes]
+    }
+
+
+def render_serial(sr: int, midi_lanes: dict, params: dict) -> dict:
+    """The serial loop from RenderEngine.render_lanes"""
+    from app.services.synth import SamplerSynth
+    from app.services.mix_chains import build_channel_chain
+    synth = SamplerSynth(sr=sr)
+    return {
+        lane: build_channel_chain(lane, sr, params).process(synth.render_lane(events))
+        for lane, events in midi_lanes.items()
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--duration", type=float, default=60.0, help="song length in seconds")
+    ap.add_argument("--max-lanes", type=int, default=8)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--sr", type=int, default=48000)
+    args = ap.parse_args()
+
+    os.environ['EXPORT_RENDER_WORKERS'] = str(args.workers)
+    from app.services.parallel_render import render_lanes_parallel, shutdown_render_pool
+
+    params = {'processing': {lane: STRIP for lane in LANES}}
+
+    # Warm up the pool and numba kernels in every worker
+    warm = make_lanes(args.workers, 1.0)
+    render_serial(args.sr, warm, params)
+    render_lanes_parallel(args.sr, warm, {}, params)
+
+    print("DrumTracKAI Parallel Lane Render Benchmark")
+    print("=" * 50)
+    print(f"Song length: {args.duration:.1f} s @ {args.sr} Hz, {args.workers} workers")
+    print(f"{'lanes':<8}{'serial (s)':>12}{'parallel (s)':>14}{'speedup':>10}")
+    try:
+        for n_lanes in range(1, args.max_lanes + 1):
+            midi_lanes = make_lanes(n_lanes, args.duration)
+
+            start = time.perf_counter()
+            render_serial(args.sr, midi_lanes, params)
+            serial = time.perf_counter() - start
+
+            start = time.perf_counter()
+            render_lanes_parallel(args.sr, midi_lanes, {}, params)
+            parallel = time.perf_counter() - start
+
+            print(f"{n_lanes:<8}{serial:>12.2f}{parallel:>14.2f}{serial / parallel:>9.2f}x")
+    finally:
+        shutdown_render_pool()
+
+
+if __name__ == "__main__":
+    main()
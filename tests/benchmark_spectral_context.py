@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shared spectral front-end for per-file analysis
+Runs the descriptors of AdvancedAudioEngine.analyze_audio_advanced (tempo,
+chroma, centroid, ZCR, MFCC, onsets, RMS and the HPSS drum stem) plus the
+audio engine's hit and tempo onset detection, first as independent librosa
+calls on the signal and then from one SpectralContext, checks that both give
+the same results and prints per-file timings.
+
+Usage: python tests/benchmark_spectral_context.py [--duration 180] [--repeat 3]
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import librosa
+
+# Make the backend "app" package importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend" / "backend"))
+
+from app.services.spectral_context import SpectralContext
+
+
+def make_track(duration: float, sr: int, bpm: float = 120.0, seed: int = 0) -> np.ndarray:
+    """Eighth-note drum-like hits over a noise floor and a sustained chord"""
+    rng = np.random.default_rng(seed)
+    n = int(duration * sr)
+    t = np.arange(n) / sr
+    y = 0.02 * rng.standard_normal(n) + 0.05 * sum(np.sin(2 * np.pi * f * t) for f in (220, 277, 330))
+    hit_t = np.arange(int(0.15 * sr)) / sr
+    for k, onset in enumerate(np.arange(0, duration - 0.15, 30.0 / bpm)):
+        start = int(onset * sr)
+        freq = (60, 200, 3000)[k % 3]
+        y[start:start + len(hit_t)] += np.exp(-hit_t * 30) * (
+            np.sin(2 * np.pi * freq * hit_t) + 0.5 * rng.standard_normal(len(hit_t)))
+    return (y / np.max(np.abs(y))).astype(np.float32)
+
+
+def analyze_separately(y: np.ndarray, sr: int) -> dict:
+    """Every descriptor recomputes its own STFT or onset envelope"""
+    tempo, beats = librosa.beat.beat_track(y=y, sr=sr)
+    _, percussive = librosa.effects.hpss(y)
+    return {
+        'tempo': float(np.atleast_1d(tempo)[0]),
+        'beats': beats,
+        'chroma': librosa.feature.chroma_stft(y=y, sr=sr),
+        'centroid': librosa.feature.spectral_centroid(y=y, sr=sr),
+        'zcr': librosa.feature.zero_crossing_rate(y),
+        'mfcc': librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13),
+        'onsets': librosa.onset.onset_detect(y=y, sr=sr, backtrack=True),
+        'rms': librosa.feature.rms(y=y),
+        'percussive': percussive,
+        # AudioEngine.detect_drum_hits and _analyze_tempo
+        'hit_magnitude': np.abs(librosa.stft(y, hop_length=512, n_fft=2048)),
+        'tempo_onsets': librosa.onset.onset_detect(y=y, sr=sr, hop_length=512),
+    }
+
+
+def analyze_shared(y: np.ndarray, sr: int) -> dict:
+    """Every descriptor reads the same SpectralContext"""
+    spectral = SpectralContext(y, sr)
+    tempo, beats = spectral.beat_track()
+    return {
+        'tempo': tempo,
+        'beats': beats,
+        'chroma': spectral.chroma(),
+        'centroid': spectral.spectral_centroid(),
+        'zcr': spectral.zero_crossing_rate(),
+        'mfcc': spectral.mfcc(n_mfcc=13),
+        'onsets': spectral.onset_frames(backtrack=True),
+        'rms': spectral.rms(),
+        'percussive': spectral.hpss()[1],
+        'hit_magnitude': spectral.magnitude,
+        'tempo_onsets': spectral.onset_frames(),
+    }
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--duration", type=float, default=180.0, help="track length in seconds")
+    ap.add_argument("--sr", type=int, default=44100)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    y = make_track(args.duration, args.sr)
+
+    # Warm up numba-compiled kernels, then check the shared path is exact
+    separate = analyze_separately(y[:args.sr * 5], args.sr)
+    shared = analyze_shared(y[:args.sr * 5], args.sr)
+    separate, shared = analyze_separately(y, args.sr), analyze_shared(y, args.sr)
+    for name in separate:
+        np.testing.assert_allclose(shared[name], separate[name], rtol=1e-6, atol=1e-6, err_msg=name)
+
+    before = best_of(lambda: analyze_separately(y, args.sr), args.repeat)
+    after = best_of(lambda: analyze_shared(y, args.sr), args.repeat)
+
+    print("DrumTracKAI Spectral Front-End Benchmark")
+    print("=" * 50)
+    print(f"Track: {args.duration:.0f} s @ {args.sr} Hz, best of {args.repeat}")
+    print(f"{'separate librosa calls':<28}{before:>10.2f} s")
+    print(f"{'shared SpectralContext':<28}{after:>10.2f} s")
+    print(f"{'speedup':<28}{before / after:>10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
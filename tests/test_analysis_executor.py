@@ -0,0 +1,98 @@
+"""
+Tests for the analysis executor
+Jobs run in worker processes while the event loop keeps running; timeouts,
+cancellation, a full queue and task errors are reported per job
+"""
+
+import os
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+import pytest
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend" / "backend"))
+
+from app.services.analysis_executor import (
+    AnalysisExecutor, AnalysisQueueFull, AnalysisTimeout, AnalysisCancelled, AnalysisFailed
+)
+
+# Tasks (looked up by name in the worker)
+
+def busy_task(seconds, progress=None):
+    progress(50, "halfway")
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
+    return {'pid': os.getpid()}
+
+def failing_task(progress=None):
+    raise RuntimeError("bad input")
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 60))
+
+async def wait_running(executor, job_id):
+    while executor.job_state(job_id) != 'running':
+        await asyncio.sleep(0.01)
+
+def test_job_runs_in_worker_without_blocking_loop():
+    async def main():
+        executor = AnalysisExecutor(workers=1)
+        reports = []
+        ticks = 0
+        future = executor.submit('job', busy_task, 1.0, on_progress=lambda p, m: reports.append((p, m)))
+        while not future.done():
+            ticks += 1
+            await asyncio.sleep(0.01)
+        result = await future
+        await executor.shutdown()
+        return result, reports, ticks
+
+    result, reports, ticks = run(main())
+    assert result['pid'] != os.getpid()
+    assert reports == [(50, "halfway")]
+    assert ticks > 20  # the loop kept running while the job was busy
+
+def test_timeout_cancel_and_errors():
+    async def main():
+        executor = AnalysisExecutor(workers=1, queue_size=1)
+        outcomes = {}
+        try:
+            await executor.submit('slow', busy_task, 30, timeout=0.5)
+        except AnalysisTimeout:
+            outcomes['timeout'] = True
+
+        running = executor.submit('running', busy_task, 30)
+        await wait_running(executor, 'running')
+        queued = executor.submit('queued', busy_task, 0)
+        with pytest.raises(AnalysisQueueFull):
+            executor.submit('overflow', busy_task, 0)
+        assert executor.cancel('queued') and executor.cancel('running')
+        for name, future in (('queued', queued), ('running', running)):
+            try:
+                await future
+            except AnalysisCancelled:
+                outcomes[name] = 'cancelled'
+
+        try:
+            await executor.submit('failing', failing_task)
+        except AnalysisFailed as e:
+            outcomes['error'] = str(e)
+        # The worker survives a task error
+        first = await executor.submit('after1', busy_task, 0)
+        second = await executor.submit('after2', busy_task, 0)
+        outcomes['reused'] = first['pid'] == second['pid']
+        outcomes['stats'] = executor.stats()
+        await executor.shutdown()
+        return outcomes
+
+    outcomes = run(main())
+    assert outcomes['timeout']
+    assert outcomes['queued'] == outcomes['running'] == 'cancelled'
+    assert outcomes['error'] == "RuntimeError: bad input"
+    assert outcomes['reused']
+    stats = outcomes['stats']
+    assert (stats['timed_out'], stats['cancelled'], stats['failed'], stats['completed']) == (1, 2, 1, 2)
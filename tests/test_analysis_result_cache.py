@@ -0,0 +1,61 @@
+"""
+Tests for the analysis result cache
+Results are keyed by content, analysis type and engine version, reuse their
+stems, and are evicted together with them
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend" / "backend"))
+
+from app.services.analysis_result_cache import AnalysisResultCache
+
+def make_result(stems_root: Path, name: str, stem_bytes: int = 1000):
+    stems_dir = stems_root / name
+    stems_dir.mkdir(parents=True)
+    stems = {}
+    for stem_type in ('bass', 'drums'):
+        path = stems_dir / f'{stem_type}.wav'
+        path.write_bytes(b'\0' * stem_bytes)
+        stems[stem_type] = {'file_path': str(path), 'url': f'/api/stems/{name}/{stem_type}.wav'}
+    return {'tempo': 120, 'stems': stems}
+
+def test_hit_reuses_stems_and_keys_differ(tmp_path):
+    stems_root = tmp_path / 'stems'
+    cache = AnalysisResultCache(tmp_path / 'analysis', stems_root)
+    key = cache.key_for('ab' * 32, 'comprehensive', 1)
+    assert key != cache.key_for('ab' * 32, 'comprehensive', 2)
+    assert key != cache.key_for('ab' * 32, 'basic', 1)
+
+    assert cache.get(key) is None
+    result = make_result(stems_root, 'job1')
+    assert cache.put(key, result, analysis_seconds=4.0)
+    assert cache.get(key) == result
+    assert cache.stats()['saved_analysis_seconds'] == 4.0
+
+    # Mock results (stems outside the stems root) are not cached
+    mock = {'stems': {'bass': {'file_path': '/demo/bass.wav'}}}
+    assert not cache.put(cache.key_for('cd' * 32, 'comprehensive', 1), mock)
+
+    # An entry whose stems are gone is a miss and is dropped
+    os.remove(result['stems']['bass']['file_path'])
+    assert cache.get(key) is None
+    assert cache.stats()['entries'] == 0
+
+def test_eviction_removes_least_recently_used_with_stems(tmp_path):
+    stems_root = tmp_path / 'stems'
+    cache = AnalysisResultCache(tmp_path / 'analysis', stems_root, max_bytes=5000)
+    keys = [cache.key_for(f'{i:064x}', 'comprehensive', 1) for i in range(3)]
+    cache.put(keys[0], make_result(stems_root, 'a'))
+    cache.put(keys[1], make_result(stems_root, 'b'))
+    first = cache.root / keys[0] / 'result.json'
+    os.utime(first, (first.stat().st_mtime + 10,) * 2)  # used after b
+    cache.put(keys[2], make_result(stems_root, 'c'))
+
+    assert cache.get(keys[1]) is None
+    assert not (stems_root / 'b').exists()
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.stats()['evictions'] == 1
@@ -0,0 +1,65 @@
+"""
+Tests for the byte-budgeted audio engine caches
+Checks LRU eviction by bytes and that evicted or re-loaded audio is mapped
+from its spill file instead of being decoded again
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add analysis directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "analysis"))
+
+from audio_cache import AudioCache, ByteBudgetLRU
+
+def test_lru_evicts_least_recently_used_by_bytes():
+    cache = ByteBudgetLRU('test', max_bytes=3 * 4000)
+    for key in 'abc':
+        cache[key] = np.zeros(1000, dtype=np.float32)
+    assert cache.get('a') is not None  # 'b' is now least recently used
+    cache['d'] = np.zeros(1000, dtype=np.float32)
+    assert 'b' not in cache and 'a' in cache and 'd' in cache
+
+    cache['huge'] = np.zeros(10 ** 6, dtype=np.float32)  # over budget: not cached
+    assert 'huge' not in cache
+
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 3 and stats['bytes'] <= stats['max_bytes']
+    assert stats['hits'] == 1
+
+def test_audio_cache_remaps_instead_of_decoding(tmp_path):
+    audio = np.random.default_rng(0).standard_normal((2, 44100)).astype(np.float32)
+    decodes = []
+
+    def loader():
+        decodes.append(1)
+        return audio, {'sample_rate': 44100}
+
+    cache = AudioCache(tmp_path, max_bytes=audio.nbytes)
+    assert cache.load('a', 'key-a', loader) == {'sample_rate': 44100}
+    np.testing.assert_array_equal(cache['a'], audio)
+    assert isinstance(cache['a'], np.ndarray) and not cache['a'].flags.writeable
+
+    # A second signal evicts the first from memory; it comes back from disk
+    cache.load('b', 'key-b', lambda: (audio[:, :100], {}))
+    np.testing.assert_array_equal(cache['a'], audio)
+    assert len(decodes) == 1
+
+    # A fresh cache over the same directory maps the spilled file
+    fresh = AudioCache(tmp_path)
+    fresh.load('a', 'key-a', loader)
+    assert len(decodes) == 1
+    stats = fresh.stats()
+    assert stats['remaps'] == 1 and stats['decodes'] == 0 and stats['registered'] == 1
+
+def test_audio_cache_prunes_disk_budget(tmp_path):
+    audio = np.zeros(10000, dtype=np.float32)
+    cache = AudioCache(tmp_path, disk_max_bytes=int(audio.nbytes * 2.5))
+    for i in range(4):
+        cache.load(f'id{i}', f'key{i}', lambda: (audio, {}))
+    assert len(list(tmp_path.glob('*.f32'))) == 2
+    # Pruned audio is decoded again with its own loader
+    np.testing.assert_array_equal(cache['id0'], audio)
@@ -0,0 +1,66 @@
+"""
+Tests for export queue recovery
+Only exports whose process stopped sending heartbeats are requeued; exports
+another live process is rendering are left alone
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend" / "backend"))
+# The scheduler imports the database layer; keep its default database in memory
+os.environ.setdefault('DB_URL', 'sqlite://')
+
+from app.models import Base, ExportJob, ProcessingQueue
+from app.services.export_queue import ExportScheduler, JOB_TYPE_EXPORT
+
+class Scheduler(ExportScheduler):
+    """A scheduler process using the test database"""
+
+    def __init__(self, sessions, **kwargs):
+        super().__init__(lambda export_job_id: {}, **kwargs)
+        self.sessions = sessions
+
+    def _session(self):
+        return self.sessions()
+
+def test_recover_only_requeues_stale_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}")
+    Base.metadata.create_all(engine)
+    sessions = sessionmaker(bind=engine)
+
+    db = sessions()
+    now = datetime.utcnow()
+    for name, updated_at in (('live', now), ('dead', now - timedelta(hours=1))):
+        db.add(ExportJob(id=name, status='running', progress=50))
+        db.add(ProcessingQueue(id=name, job_type=JOB_TYPE_EXPORT, job_id=name, user_id='u',
+                               status='running', updated_at=updated_at))
+    db.commit()
+    db.close()
+
+    rendering = Scheduler(sessions, heartbeat_interval=0.05)
+    rendering._running.add('live')  # this process is rendering 'live'
+    starting = Scheduler(sessions, heartbeat_interval=0.05)
+
+    # A second process starting takes over only the export whose process died
+    assert starting.recover() == 1
+    time.sleep(0.3)  # longer than stale_after
+    assert rendering.heartbeat() == 1
+    assert starting.recover() == 0
+
+    db = sessions()
+    assert {row.id: row.status for row in db.query(ProcessingQueue)} == {'live': 'running', 'dead': 'queued'}
+    assert {ej.id: (ej.status, ej.progress) for ej in db.query(ExportJob)} == {
+        'live': ('running', 50), 'dead': ('queued', 0)}
+    db.close()
+
+    # Without heartbeats the live row goes stale too
+    time.sleep(0.3)
+    assert starting.recover() == 1
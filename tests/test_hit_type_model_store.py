@@ -0,0 +1,124 @@
+"""
+Tests for the persisted hit-type classifier store
+"""
+
+import sys
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("librosa")
+pytest.importorskip("sklearn")
+
+# Add analysis directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "analysis"))
+
+from hit_type_model_store import HitTypeModelStore
+from sophisticated_hit_type_analyzer import SophisticatedHitTypeAnalyzer, DrumSampleDatabase
+
+def make_analyzer(tmp_path, store):
+    analyzer = SophisticatedHitTypeAnalyzer(
+        use_gpu=False, sample_db=DrumSampleDatabase(str(tmp_path / "samples.db")), model_store=store
+    )
+    analyzer.tfr_analyzer = None
+    return analyzer
+
+def add_labelled_samples(analyzer, drum_type, count=6):
+    """Store samples with features_json for two hit types"""
+    rng = np.random.default_rng(1)
+    conn = sqlite3.connect(analyzer.sample_db.db_path)
+    for k in range(count):
+        hit_type = 'rim_shot' if k % 2 else 'ghost_note'
+        features = {name: 0.0 for name in (
+            'attack_time', 'decay_time', 'sustain_level', 'release_time', 'spectral_centroid',
+            'spectral_rolloff', 'spectral_bandwidth', 'attack_sharpness', 'frequency_modulation',
+            'transient_strength', 'fundamental_frequency', 'harmonic_ratio', 'noise_ratio',
+            'velocity', 'preceding_interval', 'following_interval', 'position_in_measure')}
+        features.update(velocity=float(k % 2) + rng.random(), spectral_contrast=[0.0] * 7,
+                        mfcc_coefficients=[0.0] * 13, spectral_evolution=[], resonance_peaks=[])
+        conn.execute("INSERT INTO drum_samples (drum_type, hit_type, sample_path, features_json) "
+                     "VALUES (?, ?, ?, ?)", (drum_type, hit_type, f"missing_{k}.wav", json.dumps(features)))
+    conn.commit()
+    conn.close()
+
+def test_trained_model_is_stored_and_reloaded(tmp_path):
+    store = HitTypeModelStore(tmp_path / "store")
+    analyzer = make_analyzer(tmp_path, store)
+    add_labelled_samples(analyzer, 'snare')
+    X = np.random.default_rng(0).standard_normal((4, len(analyzer.feature_names)))
+
+    analyzer._load_classifier('snare')
+    metadata = store.metadata('snare')
+    assert metadata['source'] == 'database'
+    assert (store.root / metadata['model_file']).exists()
+    expected = analyzer.classifiers['snare'].predict_proba(analyzer.feature_scalers['snare'].transform(X))
+
+    # A fresh process (new store instance) loads instead of training
+    warm = make_analyzer(tmp_path, HitTypeModelStore(tmp_path / "store"))
+    warm._train_classifier_for_drum_type = lambda drum_type: pytest.fail("retrained")
+    warm._load_classifier('snare')
+    np.testing.assert_array_equal(
+        warm.classifiers['snare'].predict_proba(warm.feature_scalers['snare'].transform(X)), expected
+    )
+
+def test_stale_schema_is_ignored(tmp_path):
+    store = HitTypeModelStore(tmp_path / "store")
+    analyzer = make_analyzer(tmp_path, store)
+    add_labelled_samples(analyzer, 'hihat')
+    analyzer._load_classifier('hihat')
+    meta_path = store.root / "hihat.json"
+    metadata = json.loads(meta_path.read_text())
+    metadata['schema_version'] = -1
+    meta_path.write_text(json.dumps(metadata))
+    assert HitTypeModelStore(store.root).load('hihat', analyzer.feature_names) is None
+
+def test_concurrent_first_use_trains_once(tmp_path):
+    store = HitTypeModelStore(tmp_path / "store")
+    analyzer = make_analyzer(tmp_path, store)
+    calls = []
+    train = analyzer._train_classifier_for_drum_type
+
+    def counted(drum_type):
+        calls.append(drum_type)
+        return train(drum_type)
+
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(store.load_or_train(
+        'ride', analyzer.feature_names, lambda: counted('ride')))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == ['ride']
+    assert all(m.classifier is models[0].classifier for m in models)
+
+def test_database_features_are_used(tmp_path):
+    store = HitTypeModelStore(tmp_path / "store")
+    analyzer = make_analyzer(tmp_path, store)
+    add_labelled_samples(analyzer, 'snare')
+
+    X, y, source = analyzer.training_data('snare')
+    assert source == 'database'
+    assert X.shape == (6, len(analyzer.feature_names))
+    analyzer._load_classifier('snare')
+    assert store.metadata('snare')['classes'] == ['ghost_note', 'rim_shot']
+
+def test_placeholder_models_are_not_persisted(tmp_path):
+    store = HitTypeModelStore(tmp_path / "store")
+    analyzer = make_analyzer(tmp_path, store)
+    analyzer._load_classifier('tom')
+    assert 'tom' in analyzer.classifiers
+    assert store.metadata('tom') is None and not list(store.root.glob('tom-*.joblib'))
+    # Reused for the rest of the process without retraining
+    analyzer._train_classifier_for_drum_type = lambda drum_type: pytest.fail("retrained")
+    analyzer._load_classifier('tom')
+
+    # Once labelled samples exist, a new process trains on them
+    fresh = make_analyzer(tmp_path, HitTypeModelStore(store.root))
+    add_labelled_samples(fresh, 'tom')
+    fresh._load_classifier('tom')
+    assert store.metadata('tom')['source'] == 'database'
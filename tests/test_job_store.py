@@ -0,0 +1,55 @@
+"""
+Tests for the durable job store
+Records survive reopening, are found by user and status, and expire with
+their files after the TTL
+"""
+
+import sys
+import time
+import sqlite3
+from pathlib import Path
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend" / "backend"))
+
+from app.services.job_store import JobStore
+
+def test_records_persist_and_are_indexed(tmp_path):
+    db = tmp_path / 'jobs.db'
+    store = JobStore(db, 'jobs', cache_size=2)
+    for i in range(5):
+        store[f'job{i}'] = {'user_id': f'user{i % 2}', 'status': 'queued', 'progress': 0}
+    store.update('job0', status='processing', progress=40)
+    store.update('job1', status='completed', progress=100, results={'tempo': 120})
+    assert len(store._cache) == 2  # the LRU front stays small
+    assert store['job1']['results'] == {'tempo': 120}
+    assert [r['progress'] for r in store.find(user_id='user0', status='processing')] == [40]
+    assert len(store.find(user_id='user0')) == 3 and len(store.find(status='queued')) == 3
+    store.close()
+
+    assert sqlite3.connect(db).execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    reopened = JobStore(db, 'jobs')
+    assert reopened['job1']['status'] == 'completed' and len(reopened) == 5
+    # Jobs a restart interrupted are reported failed
+    assert reopened.fail_unfinished("restarted") == 4
+    assert reopened['job0'] == {'user_id': 'user0', 'status': 'failed', 'progress': 40, 'error': 'restarted'}
+    reopened.close()
+
+def test_ttl_cleanup_expires_finished_records_and_files(tmp_path):
+    removed = []
+    jobs = JobStore(tmp_path / 'jobs.db', 'jobs', ttl=0.05, on_expire=lambda r: removed.append(r['id']))
+    jobs['done'] = {'id': 'done', 'status': 'completed'}
+    jobs['running'] = {'id': 'running', 'status': 'processing'}
+    uploads = JobStore(tmp_path / 'jobs.db', 'uploads', ttl=0.05, expire_when_finished=False)
+    uploads['old'] = {'path': 'a.wav'}
+
+    time.sleep(0.1)
+    uploads.touch('old')  # used again: its TTL restarts
+    assert jobs.cleanup() == 1 and uploads.cleanup() == 0
+    assert removed == ['done']
+    assert 'done' not in jobs and 'running' in jobs  # unfinished jobs never expire
+    assert jobs.stats()['expired'] == 1
+    time.sleep(0.1)
+    assert uploads.cleanup() == 1 and len(uploads) == 0
+    jobs.close()
+    uploads.close()
@@ -0,0 +1,113 @@
+"""
+Tests for MVSep stem downloads against a local stand-in server
+Stems stream concurrently over one pooled session, cut-off transfers resume
+with Range requests, and stems failing verification are discarded
+"""
+
+import sys
+import asyncio
+import hashlib
+from pathlib import Path
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# Add tools directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from admin.services.mvsep_service import MVSepService
+
+STEMS = {name: bytes([i]) * (300_000 + i * 1000)
+         for i, name in enumerate(['kick', 'snare', 'toms', 'hh', 'ride', 'crash'])}
+
+class StandInMVSep:
+    """Separation API plus file host; 'snare' is cut off on its first request
+    and 'crash' is advertised with a wrong checksum"""
+
+    def __init__(self):
+        self.ranges = []
+        self.peers = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cut_off = False
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post('/api/separation/create', self.create)
+        app.router.add_get('/api/separation/get', self.status)
+        app.router.add_get('/files/{name}', self.file)
+        return app
+
+    async def create(self, request):
+        self.peers.add(request.transport.get_extra_info('peername'))
+        assert (await request.post())['api_token'] == 'key'
+        return web.json_response({'success': True, 'data': {'hash': 'job1'}})
+
+    async def status(self, request):
+        self.peers.add(request.transport.get_extra_info('peername'))
+        base = f"http://{request.host}/files"
+        files = [{'type': name, 'url': f"{base}/{name}", 'size': len(data),
+                  'md5': hashlib.md5(b'x' if name == 'crash' else data).hexdigest()}
+                 for name, data in STEMS.items()]
+        return web.json_response({'status': 'done', 'progress': 100, 'data': {'files': files}})
+
+    async def file(self, request):
+        self.peers.add(request.transport.get_extra_info('peername'))
+        name = request.match_info['name']
+        data = STEMS[name]
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.05)
+            start = 0
+            if 'Range' in request.headers:
+                self.ranges.append((name, request.headers['Range']))
+                start = int(request.headers['Range'][len('bytes='):].rstrip('-'))
+                response = web.StreamResponse(status=206, headers={
+                    'Content-Range': f"bytes {start}-{len(data) - 1}/{len(data)}"})
+            else:
+                response = web.StreamResponse()
+            response.content_length = len(data) - start
+            await response.prepare(request)
+            if name == 'snare' and not self.cut_off:
+                self.cut_off = True
+                await response.write(data[:100_000])
+                await asyncio.sleep(0.2)  # let the client consume it, then drop
+                request.transport.close()
+                return response
+            for i in range(start, len(data), 64 * 1024):
+                await response.write(data[i:i + 64 * 1024])
+            await response.write_eof()
+            return response
+        finally:
+            self.in_flight -= 1
+
+def test_concurrent_resumed_verified_downloads(tmp_path, monkeypatch):
+    monkeypatch.setattr(MVSepService, 'MODEL_CACHE_DIR', str(tmp_path / 'model_cache'))
+    monkeypatch.setattr(MVSepService, 'RETRY_DELAY', 0.01)
+    monkeypatch.setattr(MVSepService, 'DOWNLOAD_CHUNK_SIZE', 16 * 1024)
+    stand_in = StandInMVSep()
+    audio = tmp_path / 'drums.wav'
+    audio.write_bytes(b'RIFF' + bytes(1000))
+
+    async def main():
+        server = TestServer(stand_in.app())
+        await server.start_server()
+        try:
+            service = MVSepService('key', base_url=str(server.make_url('/api')))
+            return await service.process_audio_file(str(audio), str(tmp_path / 'out'), skip_stage_1=True)
+        finally:
+            await server.close()
+
+    results = asyncio.run(asyncio.wait_for(main(), 60))
+    out = tmp_path / 'out' / 'drumsep_components'
+    assert set(results) == set(STEMS) - {'crash'}
+    for name, path in results.items():
+        assert path == str(out / f'drumsep_{name}.wav')
+        assert Path(path).read_bytes() == STEMS[name]
+    # The bad stem and the cut-off part leave nothing behind
+    assert sorted(p.name for p in out.iterdir()) == sorted(f'drumsep_{n}.wav' for n in results)
+    assert ('snare', 'bytes=100000-') in stand_in.ranges
+    assert 1 < stand_in.max_in_flight <= MVSepService.MAX_CONCURRENT_DOWNLOADS
+    # Requests share pooled connections rather than one per request
+    assert len(stand_in.peers) <= MVSepService.MAX_CONCURRENT_DOWNLOADS + 1
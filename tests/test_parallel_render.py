@@ -0,0 +1,48 @@
+"""
+Tests for parallel lane rendering
+A pool worker that dies (OOM kill, native crash) does not break later
+exports: the pool is replaced and the lanes are rendered again
+"""
+
+import os
+import sys
+import signal
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend" / "backend"))
+
+from app.services import parallel_render
+from app.services.parallel_render import get_render_pool, render_lanes_parallel, shutdown_render_pool
+
+SR = 22050
+
+LANES = {
+    lane: [{'time_sec': t, 'velocity': 100, 'lane': lane} for t in (0.0, 0.25, 0.5)]
+    for lane in ('kick', 'snare', 'hihat')
+}
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setenv('EXPORT_RENDER_WORKERS', '2')
+    shutdown_render_pool()
+    yield get_render_pool()
+    shutdown_render_pool()
+
+def kill_worker(pool):
+    os.kill(next(iter(pool._processes)), signal.SIGKILL)
+
+def test_render_after_worker_is_killed(pool):
+    expected = render_lanes_parallel(SR, LANES, {}, {})
+    kill_worker(pool)
+
+    for _ in range(2):
+        rendered = render_lanes_parallel(SR, LANES, {}, {})
+        assert list(rendered) == list(LANES)
+        for lane, audio in expected.items():
+            np.testing.assert_array_equal(rendered[lane], audio)
+    assert get_render_pool() is not pool
+    assert parallel_render._pool is get_render_pool()
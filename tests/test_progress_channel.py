@@ -0,0 +1,111 @@
+"""
+Tests for progress coalescing
+Fine-grained progress is published at most max_rate times a second per job,
+newest first, and terminal states are always delivered last
+"""
+
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend" / "backend"))
+
+from app.services.progress_channel import ProgressChannel, ProgressThrottle
+
+def test_channel_coalesces_per_job_and_delivers_terminal():
+    published = []
+
+    async def publish(job_id, message):
+        published.append((time.monotonic(), job_id, message))
+
+    async def main():
+        channel = ProgressChannel(publish, max_rate=10)
+        # 500 updates per job over ~0.5 s for two jobs
+        for i in range(500):
+            for job_id in ('a', 'b'):
+                await channel.report(job_id, {'progress': i // 5, 'status': 'processing'})
+            await asyncio.sleep(0.001)
+        await channel.report('a', {'progress': 100, 'status': 'completed'})
+        await asyncio.sleep(0.25)  # the held update for 'b' is released
+        return channel.stats()
+
+    stats = asyncio.run(main())
+    a = [(t, m) for t, job_id, m in published if job_id == 'a']
+    b = [(t, m) for t, job_id, m in published if job_id == 'b']
+    assert stats['received'] == 1001
+    assert len(a) <= 10 and len(b) <= 10
+    # At most one update per 100 ms per job
+    assert all(t2 - t1 >= 0.095 for (t1, _), (t2, _) in zip(b, b[1:]))
+    assert a[-1][1] == {'progress': 100, 'status': 'completed'}
+    assert b[-1][1]['progress'] == 99  # the newest held update is not lost
+    assert [m['progress'] for _, m in b] == sorted(m['progress'] for _, m in b)
+
+def test_terminal_supersedes_held_update():
+    published = []
+
+    async def publish(job_id, message):
+        published.append(message['status'])
+
+    async def main():
+        channel = ProgressChannel(publish, max_rate=5)
+        await channel.report('job', {'status': 'processing'})
+        await channel.report('job', {'status': 'processing'})  # held
+        await channel.report('job', {'status': 'failed'})
+        await asyncio.sleep(0.3)
+
+    asyncio.run(main())
+    assert published == ['processing', 'failed']
+
+def test_throttle_forwards_final_and_flushes():
+    calls = []
+    throttle = ProgressThrottle(calls.append, max_rate=10)
+    for i in range(1, 100):
+        throttle(i / 100)
+    assert calls == [0.01]
+    throttle.flush()
+    assert calls == [0.01, 0.99]
+    throttle(1.0)
+    assert calls[-1] == 1.0
+
+def test_terminal_supersedes_released_update_and_drops_job_state():
+    published = []
+
+    async def publish(job_id, message):
+        published.append(message['status'])
+
+    async def main():
+        channel = ProgressChannel(publish, max_rate=5)
+        await channel.report('job', {'status': 'processing'})
+        await channel.report('job', {'status': 'queued'})  # held
+        channel._release('job')  # timer fired; the publish task has not run yet
+        await channel.report('job', {'status': 'completed'})
+        await asyncio.sleep(0.05)
+        return channel
+
+    channel = asyncio.run(main())
+    assert published == ['processing', 'completed']
+    assert not (channel._last or channel._held or channel._timers or channel._releasing)
+
+def test_forget_from_another_thread_drops_held_update():
+    published = []
+
+    async def publish(job_id, message):
+        published.append(message['status'])
+
+    async def main():
+        channel = ProgressChannel(publish, max_rate=5)
+        await channel.report('job', {'status': 'processing'})
+        await channel.report('job', {'status': 'queued'})  # held; the job never finishes
+        # The job store's expiry hook runs on its own thread
+        thread = threading.Thread(target=channel.forget, args=('job',))
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0.3)
+        return channel
+
+    channel = asyncio.run(main())
+    assert published == ['processing']
+    assert channel.stats()['jobs'] == channel.stats()['held'] == 0
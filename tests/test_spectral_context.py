@@ -0,0 +1,57 @@
+"""
+Tests for the shared spectral analysis context
+Every descriptor read from one SpectralContext must equal the librosa call
+on the signal it replaces
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+librosa = pytest.importorskip("librosa")
+scipy_ndimage = pytest.importorskip("scipy.ndimage")
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend" / "backend"))
+
+from app.services.spectral_context import SpectralContext, median_filter
+
+SR = 22050
+
+@pytest.fixture(scope="module")
+def track():
+    rng = np.random.default_rng(0)
+    y = 0.02 * rng.standard_normal(4 * SR)
+    t = np.arange(int(0.1 * SR)) / SR
+    for k, onset in enumerate(np.arange(0.0, 3.8, 0.25)):
+        start = int(onset * SR)
+        y[start:start + len(t)] += np.exp(-t * 40) * np.sin(2 * np.pi * (80 + 400 * (k % 3)) * t)
+    return y.astype(np.float32)
+
+def test_descriptors_match_librosa(track):
+    spectral = SpectralContext(track, SR)
+    tempo, beats = librosa.beat.beat_track(y=track, sr=SR)
+    assert spectral.beat_track()[0] == float(np.atleast_1d(tempo)[0])
+    np.testing.assert_array_equal(spectral.beat_track()[1], beats)
+    np.testing.assert_array_equal(spectral.onset_frames(backtrack=True),
+                                  librosa.onset.onset_detect(y=track, sr=SR, backtrack=True))
+    np.testing.assert_allclose(spectral.chroma(), librosa.feature.chroma_stft(y=track, sr=SR), rtol=1e-6)
+    np.testing.assert_allclose(spectral.spectral_centroid(),
+                               librosa.feature.spectral_centroid(y=track, sr=SR), rtol=1e-6)
+    np.testing.assert_allclose(spectral.mfcc(), librosa.feature.mfcc(y=track, sr=SR, n_mfcc=13),
+                               rtol=1e-5, atol=1e-4)
+
+    harmonic, percussive = librosa.effects.hpss(track)
+    np.testing.assert_allclose(spectral.hpss()[0], harmonic, atol=1e-6)
+    np.testing.assert_allclose(spectral.hpss()[1], percussive, atol=1e-6)
+
+@pytest.mark.parametrize("axis", [0, 1])
+def test_median_filter_matches_ndimage(axis):
+    S = np.abs(np.random.default_rng(1).standard_normal((300, 120))).astype(np.float32)
+    size = [1, 1]
+    size[axis] = 31
+    # A small budget forces several slices
+    np.testing.assert_array_equal(median_filter(S, 31, axis, max_elements=1 << 14),
+                                  scipy_ndimage.median_filter(S, size=size, mode='reflect'))
@@ -0,0 +1,56 @@
+"""
+Tests for the content-addressed upload store
+Uploads are streamed in chunks, hashed, and identical content is stored once
+"""
+
+import sys
+import asyncio
+import hashlib
+from pathlib import Path
+
+import pytest
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend" / "backend"))
+
+from app.services.upload_store import UploadStore, UploadTooLarge
+
+class ChunkedUpload:
+    """Async reader that records the read sizes it was asked for"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+        self.reads = []
+
+    async def read(self, size: int = -1) -> bytes:
+        self.reads.append(size)
+        end = len(self.data) if size < 0 else self.offset + size
+        chunk = self.data[self.offset:end]
+        self.offset += len(chunk)
+        return chunk
+
+def test_streams_hashes_and_deduplicates(tmp_path):
+    store = UploadStore(tmp_path, chunk_size=1000)
+    data = bytes(range(256)) * 40
+    first_upload = ChunkedUpload(data)
+    first = asyncio.run(store.save(first_upload, '.WAV'))
+    assert first.sha256 == hashlib.sha256(data).hexdigest()
+    assert first.size == len(data) and not first.deduplicated
+    assert first.path.read_bytes() == data and first.path.suffix == '.wav'
+    assert set(first_upload.reads) == {1000}  # never read whole
+
+    mtime = first.path.stat().st_mtime_ns
+    second = asyncio.run(store.save(ChunkedUpload(data), '.wav'))
+    assert second.deduplicated and second.path == first.path
+    assert first.path.stat().st_mtime_ns == mtime  # the stored copy is untouched
+    assert store.find(first.sha256, '.wav').path == first.path
+    assert store.find(hashlib.sha256(b'other').hexdigest(), '.wav') is None
+    assert list(store.incoming.iterdir()) == []
+
+def test_too_large_upload_leaves_nothing(tmp_path):
+    store = UploadStore(tmp_path, chunk_size=100, max_bytes=250)
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(store.save(ChunkedUpload(b'x' * 300)))
+    assert list(store.incoming.iterdir()) == []
+    assert not (tmp_path / 'store').exists()
@@ -0,0 +1,73 @@
+"""
+Tests for the waveform peak pyramid
+Compares pyramid queries against min/max/RMS computed directly from the samples
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sf = pytest.importorskip("soundfile")
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend" / "backend"))
+
+from app.services.waveform_peaks import PeakPyramid, build_peaks, load_peaks, sidecar_path
+
+SR = 44100
+
+def stem_audio(seconds=20, channels=2, seed=0):
+    """Noise under a rising envelope, so every pixel has a different level"""
+    rng = np.random.default_rng(seed)
+    n = seconds * SR + 77
+    envelope = np.linspace(0.01, 1.0, n)[:, None]
+    return (rng.standard_normal((n, channels)) * envelope * 0.5).astype(np.float32)
+
+def direct(audio, start, end, pixels):
+    n = min(pixels, end - start)
+    edges = start + (np.arange(n + 1) * (end - start)) // n
+    spans = [audio[a:b] for a, b in zip(edges[:-1], edges[1:])]
+    return (np.array([s.min() for s in spans]), np.array([s.max() for s in spans]),
+            np.array([np.sqrt(np.mean(s.astype(np.float64) ** 2)) for s in spans]))
+
+@pytest.mark.parametrize("start,end,pixels", [
+    (0, None, 800),           # whole stem
+    (12345, 400000, 70),      # zoomed range
+    (0, None, 1),             # top of the pyramid
+    (5000, 5600, 100),        # finer than a block: read from the samples
+])
+def test_query_matches_samples(tmp_path, start, end, pixels):
+    audio = stem_audio()
+    path = tmp_path / "drums.wav"
+    sf.write(str(path), audio, SR, subtype='FLOAT')
+    build_peaks(path, audio, SR)
+    pyramid = load_peaks(path)
+
+    result = pyramid.query(start, end, pixels)
+    lo, hi, rms = direct(audio, result['start'], result['end'], pixels)
+    assert len(result['min']) == len(lo)
+    # Edge blocks may widen the envelope; float16 storage rounds to ~1e-3
+    assert np.all(result['min'] <= lo + 1e-3 * np.abs(lo))
+    assert np.all(result['max'] >= hi - 1e-3 * np.abs(hi))
+    np.testing.assert_allclose(result['rms'], rms, rtol=0.03)
+
+def test_sidecar_round_trip_and_rebuild(tmp_path):
+    audio = stem_audio(seconds=3, channels=1)
+    path = tmp_path / "snare.wav"
+    sf.write(str(path), audio, SR)
+    built = build_peaks(path)
+    loaded = PeakPyramid.load(sidecar_path(path))
+    assert loaded.n_samples == len(audio) and loaded.sample_rate == SR
+    for a, b in zip(built.levels, loaded.levels):
+        np.testing.assert_array_equal(a, b)
+    assert len(loaded.levels[-1]) == 1
+
+    # A corrupt sidecar is rebuilt from the stem
+    sidecar_path(path).write_bytes(b"junk")
+    assert load_peaks(path).n_samples == len(audio)
+
+def test_empty_audio():
+    result = PeakPyramid.from_audio(np.zeros(0, dtype=np.float32), SR).query()
+    assert len(result['max']) == 0
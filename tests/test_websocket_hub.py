@@ -0,0 +1,136 @@
+"""
+Tests for the WebSocket hub
+Slow clients only delay themselves, queued progress is coalesced, terminal
+updates are always delivered, and a load of 1,000 clients stays bounded
+"""
+
+import sys
+import json
+import time
+import asyncio
+from pathlib import Path
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend" / "backend"))
+
+from app.services import websocket_hub
+from app.services.websocket_hub import WebSocketHub, SLOW_CLIENT_CLOSE_CODE
+
+class FakeWebSocket:
+    """Simulated client; each send takes ``delay`` seconds (None: never completes)
+    and waits for ``gate`` (an asyncio.Event) first, if given"""
+
+    def __init__(self, delay=0.0, gate=None):
+        self.delay = delay
+        self.gate = gate
+        self.received = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.delay is None:
+            await asyncio.Event().wait()
+        elif self.delay:
+            await asyncio.sleep(self.delay)
+        self.received.append((time.perf_counter(), json.loads(text)))
+
+    def done(self):
+        return bool(self.received) and self.received[-1][1].get('status') == 'completed'
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 60))
+
+async def wait_done(clients):
+    """Wait until every client has received its job's terminal update"""
+    while not all(ws.done() for ws in clients):
+        await asyncio.sleep(0.001)
+
+def test_coalescing_terminal_delivery_and_slow_clients():
+    async def main():
+        hub = WebSocketHub(queue_size=4, send_timeout=5)
+        lagging, stalled = FakeWebSocket(delay=0.05), FakeWebSocket(delay=None)
+        for cid, ws in (('lagging', lagging), ('stalled', stalled)):
+            await hub.connect(ws, cid)
+            hub.subscribe_to_job(cid, 'job')
+            hub.subscribe_to_job(cid, 'other')
+
+        for progress in range(0, 100, 10):
+            await hub.send_job_update('job', {'job_id': 'job', 'progress': progress, 'status': 'processing'})
+            await asyncio.sleep(0.01)
+        await hub.send_job_update('job', {'job_id': 'job', 'progress': 100, 'status': 'completed'})
+        await wait_done([lagging])
+        lagging_progress = [m['progress'] for _, m in lagging.received]
+
+        # The stalled client's queue (holding the terminal update) fills with
+        # frames that cannot be dropped; the lagging one's just fits them
+        for i in range(4):
+            await hub.broadcast_message({'type': 'load_stems', 'i': i})
+        await asyncio.sleep(0.01)
+        outcome = (lagging_progress, stalled.closed_with,
+                   {job: set(ids) for job, ids in hub.job_connections.items()}, hub.stats())
+        await hub.close()
+        return outcome
+
+    lagging_progress, stalled_close, job_connections, stats = run(main())
+    # First update went straight out; later ones were replaced while queued
+    assert lagging_progress[0] == 0 and lagging_progress[-1] == 100
+    assert len(lagging_progress) < 11
+    assert stats['coalesced'] > 0
+    assert stalled_close == SLOW_CLIENT_CLOSE_CODE and stats['slow_disconnects'] == 1
+    assert job_connections == {'job': {'lagging'}, 'other': {'lagging'}}
+
+def test_load_1000_clients(monkeypatch):
+    dumps_calls = []
+    real_dumps = json.dumps
+    monkeypatch.setattr(websocket_hub.json, 'dumps',
+                        lambda *a, **k: dumps_calls.append(1) or real_dumps(*a, **k))
+
+    async def main():
+        hub = WebSocketHub(queue_size=16, send_timeout=60)
+        gate = asyncio.Event()
+        clients = []
+        for i in range(1000):
+            # Every 100th client is stuck in its first send until the gate opens
+            ws = FakeWebSocket(gate=gate if i % 100 == 0 else None)
+            await hub.connect(ws, f'c{i}')
+            hub.subscribe_to_job(f'c{i}', f'job{i % 10}')
+            clients.append(ws)
+
+        for tick in range(50):
+            for job in range(10):
+                status = 'completed' if tick == 49 else 'processing'
+                await hub.send_job_update(f'job{job}', {'job_id': f'job{job}', 'progress': 2 * tick + 2,
+                                                        'status': status})
+            await asyncio.sleep(0)
+        # Stuck clients hold up nobody else
+        fast = [ws for i, ws in enumerate(clients) if i % 100]
+        await wait_done(fast)
+        stuck_received = [len(ws.received) for i, ws in enumerate(clients) if i % 100 == 0]
+        gate.set()
+        await wait_done(clients)
+        for i in range(0, 1000, 2):
+            hub.disconnect(f'c{i}')
+        outcome = (clients, stuck_received, hub.stats(), len(hub.connections))
+        await hub.close()
+        return outcome
+
+    clients, stuck_received, stats, remaining = run(main())
+    assert len(dumps_calls) == 500  # once per message, not per client
+    assert stuck_received == [0] * 10
+    for i, ws in enumerate(clients):
+        # In order, possibly coalesced, ending with the terminal update
+        progress = [m['progress'] for _, m in ws.received]
+        assert progress == sorted(set(progress))
+        assert ws.received[-1][1] == {'job_id': f'job{i % 10}', 'progress': 100, 'status': 'completed'}
+        if i % 100 == 0:
+            # The update in flight when it got stuck, then the newest (terminal) one
+            assert progress == [2, 100]
+    assert stats['coalesced'] >= 10 * 48 and stats['slow_disconnects'] == 0
+    assert remaining == 500
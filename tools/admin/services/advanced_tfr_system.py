@@ -5,16 +5,23 @@ Integrates sophisticated TFR analysis from analytic tools into DrumTracKAI
 """
 
 import numpy as np
-import torch
-import torch.nn.functional as F
 from scipy import signal
-from scipy.fft import fft, ifft, fftfreq
+from scipy.fft import fft, ifft, rfft, fftfreq
 import logging
 from typing import Tuple, Dict, List, Optional
 from dataclasses import dataclass
 import warnings
 
 # Try to import GPU acceleration libraries
+try:
+    import torch
+    import torch.nn.functional as F
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+    torch = None
+    F = None
+
 try:
     import cupy as cp
     CUPY_AVAILABLE = True
@@ -33,6 +40,14 @@ librosa = None
 
 logger = logging.getLogger(__name__)
 
+# Frequency rows processed per step by the reassignment kernels; bounds the
+# temporary index arrays for long stems
+REASSIGN_ROW_BLOCK = 64
+
+# Transform used for per-onset attack analysis
+ATTACK_N_FFT = 1024
+ATTACK_HOP_LENGTH = 64
+
 @dataclass
 class ReassignedSpectrogramData:
     """Contains reassigned spectrogram and associated data"""
@@ -64,7 +79,7 @@ class AdvancedTimeFrequencyReassignment:
     
     def __init__(self, sample_rate=44100, use_gpu=True):
         self.sr = sample_rate
-        self.use_gpu = use_gpu and torch.cuda.is_available()
+        self.use_gpu = use_gpu and TORCH_AVAILABLE and torch.cuda.is_available()
         
         # Initialize librosa lazily
         global librosa
@@ -81,7 +96,7 @@ class AdvancedTimeFrequencyReassignment:
             self.device = torch.device("cuda")
             logger.info("Using GPU for time-frequency reassignment")
         else:
-            self.device = torch.device("cpu")
+            self.device = torch.device("cpu") if TORCH_AVAILABLE else None
             if use_gpu:
                 logger.warning("GPU requested but not available, using CPU")
     
@@ -93,14 +108,18 @@ class AdvancedTimeFrequencyReassignment:
         Compute reassigned spectrogram with improved time-frequency localization.
         """
         
-        if self.use_gpu and torch.cuda.is_available():
+        if self.use_gpu:
             return self._compute_reassigned_gpu(audio, n_fft, hop_length, window)
         else:
             return self._compute_reassigned_cpu(audio, n_fft, hop_length, window)
     
     def _compute_reassigned_cpu(self, audio: np.ndarray, n_fft: int, 
                                hop_length: int, window: str) -> ReassignedSpectrogramData:
-        """CPU implementation of reassigned spectrogram"""
+        """
+        CPU implementation of reassigned spectrogram.
+        ``audio`` may carry leading batch dimensions (..., n_samples); the
+        spectrogram arrays then have the same leading dimensions.
+        """
         
         # Create windows
         win = signal.get_window(window, n_fft)
@@ -113,15 +132,10 @@ class AdvancedTimeFrequencyReassignment:
         time_ramp = np.arange(n_fft) - n_fft//2
         win_ramped = win * time_ramp
         
-        # Compute STFTs
-        stft_original = librosa.stft(audio, n_fft=n_fft, hop_length=hop_length, 
-                                    window=window, center=True)
-        
-        # STFT with derivative window
-        stft_derivative = self._stft_custom(audio, win_derivative, n_fft, hop_length)
-        
-        # STFT with ramped window
-        stft_ramped = self._stft_custom(audio, win_ramped, n_fft, hop_length)
+        # Compute plain, derivative-window and ramped-window STFTs in one pass
+        stft_original, stft_derivative, stft_ramped = self._stft_multi_window(
+            audio, np.stack([win, win_derivative, win_ramped]), hop_length
+        )
         
         # Compute instantaneous frequency and group delay
         epsilon = 1e-10
@@ -137,13 +151,13 @@ class AdvancedTimeFrequencyReassignment:
         )
         
         # Create time and frequency axes
-        times = librosa.frames_to_time(np.arange(stft_original.shape[1]), 
+        times = librosa.frames_to_time(np.arange(stft_original.shape[-1]), 
                                       sr=self.sr, hop_length=hop_length)
         frequencies = librosa.fft_frequencies(sr=self.sr, n_fft=n_fft)
         
         # Reassignment matrices
-        time_matrix = np.tile(times, (stft_original.shape[0], 1))
-        freq_matrix = np.tile(frequencies[:, np.newaxis], (1, stft_original.shape[1]))
+        time_matrix = np.tile(times, (stft_original.shape[-2], 1))
+        freq_matrix = np.tile(frequencies[:, np.newaxis], (1, stft_original.shape[-1]))
         
         # Apply reassignment
         time_reassigned = time_matrix + group_delay / self.sr
@@ -235,26 +249,40 @@ class AdvancedTimeFrequencyReassignment:
             group_delay=group_delay_np
         )
     
-    def _stft_custom(self, audio: np.ndarray, window: np.ndarray, 
-                    n_fft: int, hop_length: int) -> np.ndarray:
-        """Custom STFT implementation for arbitrary windows"""
+    def _stft_multi_window(self, audio: np.ndarray, windows: np.ndarray, hop_length: int,
+                           pad_mode: str = 'constant',
+                           frames_per_block: int = 256) -> np.ndarray:
+        """
+        STFT of ``audio`` under several windows of length n_fft at once.
+        The padded signal is framed once (a strided view, no copy) and each
+        block of frames is multiplied by the stacked windows and transformed
+        with one batched rfft. Framing and padding match librosa.stft with
+        center=True. ``audio`` may have leading batch dimensions. Returns
+        (n_windows, ..., n_fft//2 + 1, n_frames), complex64 for float32 audio
+        and complex128 otherwise.
+        """
         
-        # Pad audio
-        audio_padded = np.pad(audio, n_fft//2, mode='reflect')
+        n_windows, n_fft = windows.shape
+        pad = [(0, 0)] * (audio.ndim - 1) + [(n_fft//2, n_fft//2)]
+        audio_padded = np.pad(audio, pad, mode=pad_mode)
+        frames = np.lib.stride_tricks.sliding_window_view(audio_padded, n_fft, axis=-1)
+        frames = frames[..., ::hop_length, :]
+        n_frames = frames.shape[-2]
         
-        # Compute STFT frames
-        n_frames = 1 + (len(audio_padded) - n_fft) // hop_length
-        stft = np.zeros((n_fft//2 + 1, n_frames), dtype=complex)
+        dtype = np.complex64 if audio.dtype == np.float32 else np.complex128
+        stft = np.empty((n_windows,) + frames.shape[:-1] + (n_fft//2 + 1,), dtype=dtype)
+        # Windows broadcast against (..., frames, n_fft)
+        windows = windows.reshape((n_windows,) + (1,) * (frames.ndim - 1) + (n_fft,))
         
-        for i in range(n_frames):
-            start = i * hop_length
-            frame = audio_padded[start:start + n_fft] * window
-            stft[:, i] = fft(frame)[:n_fft//2 + 1]
+        # Blocks bound the (windows x frames x n_fft) product for long stems
+        for start in range(0, n_frames, frames_per_block):
+            block = frames[..., start:start + frames_per_block, :]
+            stft[..., start:start + block.shape[-2], :] = rfft(block[np.newaxis] * windows, axis=-1)
         
-        return stft
+        return np.swapaxes(stft, -1, -2)
     
-    def _stft_custom_gpu(self, audio_tensor: torch.Tensor, window: torch.Tensor,
-                        n_fft: int, hop_length: int) -> torch.Tensor:
+    def _stft_custom_gpu(self, audio_tensor: 'torch.Tensor', window: 'torch.Tensor',
+                        n_fft: int, hop_length: int) -> 'torch.Tensor':
         """Custom STFT implementation for GPU with arbitrary windows"""
         
         # Pad audio
@@ -280,32 +308,50 @@ class AdvancedTimeFrequencyReassignment:
         """Apply reassignment to create sharper time-frequency representation"""
         
         # Initialize reassigned spectrogram
-        reassigned = np.zeros_like(stft)
+        reassigned = np.zeros(stft.shape, dtype=stft.dtype)
         
         # Get grid spacing
         dt = times[1] - times[0] if len(times) > 1 else 1.0
         df = frequencies[1] - frequencies[0] if len(frequencies) > 1 else 1.0
         
-        # Apply reassignment
-        for i in range(stft.shape[0]):
-            for j in range(stft.shape[1]):
-                if np.abs(stft[i, j]) > 1e-10:  # Only reassign significant values
-                    
-                    # Find reassigned indices
-                    new_time = time_reassigned[i, j]
-                    new_freq = freq_reassigned[i, j]
-                    
-                    # Convert to indices
-                    time_idx = int(np.round((new_time - times[0]) / dt))
-                    freq_idx = int(np.round((new_freq - frequencies[0]) / df))
-                    
-                    # Check bounds
-                    if (0 <= time_idx < stft.shape[1] and 
-                        0 <= freq_idx < stft.shape[0]):
-                        reassigned[freq_idx, time_idx] += stft[i, j]
+        # Move every significant cell to its nearest (freq, frame) grid point
+        for lo in range(0, stft.shape[-2], REASSIGN_ROW_BLOCK):
+            rows = (Ellipsis, slice(lo, lo + REASSIGN_ROW_BLOCK), slice(None))
+            values = stft[rows]
+            time_idx = np.round((time_reassigned[rows] - times[0]) / dt)
+            freq_idx = np.round((freq_reassigned[rows] - frequencies[0]) / df)
+            self._scatter_add_cells(reassigned, values, freq_idx, time_idx,
+                                    np.abs(values) > 1e-10)
         
         return reassigned
     
+    def _scatter_add_cells(self, out: np.ndarray, values: np.ndarray, freq_idx: np.ndarray,
+                           time_idx: np.ndarray, mask: np.ndarray):
+        """
+        Add masked cells of ``values`` into ``out[..., freq_idx, time_idx]``.
+        Leading (batch) dimensions of ``values`` map onto those of ``out``.
+        Targets outside ``out`` (or non-finite) are dropped. Cells are added
+        in row-major order with one np.add.at, so the result is identical to
+        a nested loop over the grid.
+        """
+        n_freq, n_frames = out.shape[-2:]
+        batch_shape = out.shape[:-2]
+        batch_idx = np.arange(int(np.prod(batch_shape))).reshape(batch_shape + (1, 1))
+        valid = (mask & (freq_idx >= 0) & (freq_idx < n_freq) &
+                 (time_idx >= 0) & (time_idx < n_frames))
+        flat = ((np.broadcast_to(batch_idx, valid.shape)[valid] * n_freq +
+                 freq_idx[valid].astype(np.int64)) * n_frames +
+                time_idx[valid].astype(np.int64))
+        np.add.at(out.reshape(-1), flat, values[valid])
+    
+    def _nearest_bins(self, frequencies: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """Index of the closest entry of sorted ``frequencies`` for every value (ties go low)"""
+        upper = len(frequencies) - 1
+        below = np.clip(np.searchsorted(frequencies, values, side='right') - 1, 0, upper)
+        above = np.minimum(below + 1, upper)
+        closer_above = np.abs(frequencies[above] - values) < np.abs(frequencies[below] - values)
+        return np.where(closer_above, above, below)
+    
     def synchrosqueeze_transform(self, audio: np.ndarray, n_fft: int = 2048,
                                 hop_length: int = 128) -> Dict:
         """
@@ -315,28 +361,24 @@ class AdvancedTimeFrequencyReassignment:
         
         # Get reassigned spectrogram
         reassigned_data = self.compute_reassigned_spectrogram(audio, n_fft, hop_length)
+        stft = reassigned_data.original_stft
         
         # Synchrosqueezing threshold
-        threshold = 0.1 * np.max(np.abs(reassigned_data.original_stft))
+        threshold = 0.1 * np.max(np.abs(stft))
         
         # Initialize synchrosqueezed representation
-        synchrosqueezed = np.zeros_like(reassigned_data.original_stft)
-        
-        # Apply synchrosqueezing
-        for i in range(reassigned_data.original_stft.shape[0]):
-            for j in range(reassigned_data.original_stft.shape[1]):
-                magnitude = np.abs(reassigned_data.original_stft[i, j])
-                
-                if magnitude > threshold:
-                    # Get instantaneous frequency
-                    inst_freq = reassigned_data.instantaneous_frequency[i, j]
-                    
-                    # Find corresponding frequency bin
-                    freq_bin = np.argmin(np.abs(reassigned_data.frequencies - inst_freq))
-                    
-                    # Add to synchrosqueezed representation
-                    if 0 <= freq_bin < synchrosqueezed.shape[0]:
-                        synchrosqueezed[freq_bin, j] += reassigned_data.original_stft[i, j]
+        synchrosqueezed = np.zeros(stft.shape, dtype=stft.dtype)
+        
+        # Move every cell above threshold to the bin of its instantaneous frequency
+        frames = np.arange(stft.shape[1])
+        for lo in range(0, stft.shape[0], REASSIGN_ROW_BLOCK):
+            rows = slice(lo, lo + REASSIGN_ROW_BLOCK)
+            values = stft[rows]
+            freq_bins = self._nearest_bins(reassigned_data.frequencies,
+                                           reassigned_data.instantaneous_frequency[rows])
+            self._scatter_add_cells(synchrosqueezed, values, freq_bins,
+                                    np.broadcast_to(frames, values.shape),
+                                    np.abs(values) > threshold)
         
         # Extract ridge curves
         ridge_curves = self._extract_ridge_curves(synchrosqueezed, reassigned_data.times)
@@ -380,29 +422,104 @@ class AdvancedTimeFrequencyReassignment:
             TFRAnalysisResult with attack characteristics
         """
         
-        # Extract window around onset
-        start_sample = int(max(0, (onset_time - window_size/2) * self.sr))
-        end_sample = int(min(len(audio), (onset_time + window_size/2) * self.sr))
+        start_sample, end_sample = self._attack_window(len(audio), onset_time, window_size)
         
         if end_sample <= start_sample:
             # Return empty result for invalid window
-            return TFRAnalysisResult(
-                attack_time=0.0,
-                attack_sharpness=0.0,
-                transient_strength=0.0,
-                spectral_centroid_evolution=np.array([]),
-                frequency_modulation={},
-                spectral_flux=np.array([]),
-                reassigned_data=None
-            )
+            return self._empty_attack_result()
         
         window_audio = audio[start_sample:end_sample]
         
         # Compute reassigned spectrogram
         reassigned_data = self.compute_reassigned_spectrogram(
-            window_audio, n_fft=1024, hop_length=64
+            window_audio, n_fft=ATTACK_N_FFT, hop_length=ATTACK_HOP_LENGTH
         )
         
+        return self._attack_result(reassigned_data)
+    
+    def analyze_drum_attacks(self, audio: np.ndarray, onset_times: List[float],
+                             window_size: float = 0.05,
+                             batch_size: int = 128) -> List[TFRAnalysisResult]:
+        """
+        Analyze the attacks of many drum hits in one stem.
+        
+        Onset windows of equal length are stacked and run through one batched
+        multi-window STFT and reassignment, ``batch_size`` hits at a time,
+        instead of setting up a transform per hit. Each result matches
+        analyze_drum_attack for that onset.
+        
+        Args:
+            audio: Full audio signal
+            onset_times: Drum onset times in seconds
+            window_size: Analysis window size in seconds
+            batch_size: Hits transformed together (bounds memory)
+        
+        Returns:
+            One TFRAnalysisResult per onset, in input order
+        """
+        
+        if self.use_gpu:
+            # The GPU path transforms one window at a time
+            return [self.analyze_drum_attack(audio, onset_time, window_size)
+                    for onset_time in onset_times]
+        
+        results: List[Optional[TFRAnalysisResult]] = [None] * len(onset_times)
+        
+        # Group onsets by window length (windows at the stem edges are shorter)
+        groups: Dict[int, List[Tuple[int, int]]] = {}
+        for k, onset_time in enumerate(onset_times):
+            start_sample, end_sample = self._attack_window(len(audio), onset_time, window_size)
+            if end_sample <= start_sample:
+                results[k] = self._empty_attack_result()
+            else:
+                groups.setdefault(end_sample - start_sample, []).append((k, start_sample))
+        
+        for length, members in groups.items():
+            for lo in range(0, len(members), batch_size):
+                batch = members[lo:lo + batch_size]
+                windows = np.stack([audio[start:start + length] for _, start in batch])
+                batch_data = self._compute_reassigned_cpu(
+                    windows, ATTACK_N_FFT, ATTACK_HOP_LENGTH, 'hann'
+                )
+                for b, (k, _) in enumerate(batch):
+                    results[k] = self._attack_result(self._select_batch_item(batch_data, b))
+        
+        return results
+    
+    def _attack_window(self, n_samples: int, onset_time: float,
+                       window_size: float) -> Tuple[int, int]:
+        """Sample range analysed around an onset"""
+        start_sample = int(max(0, (onset_time - window_size/2) * self.sr))
+        end_sample = int(min(n_samples, (onset_time + window_size/2) * self.sr))
+        return start_sample, end_sample
+    
+    def _empty_attack_result(self) -> TFRAnalysisResult:
+        return TFRAnalysisResult(
+            attack_time=0.0,
+            attack_sharpness=0.0,
+            transient_strength=0.0,
+            spectral_centroid_evolution=np.array([]),
+            frequency_modulation={},
+            spectral_flux=np.array([]),
+            reassigned_data=None
+        )
+    
+    def _select_batch_item(self, data: ReassignedSpectrogramData, index: int) -> ReassignedSpectrogramData:
+        """One hit's spectrogram data out of a batched transform"""
+        return ReassignedSpectrogramData(
+            reassigned_stft=data.reassigned_stft[index],
+            time_reassignment=data.time_reassignment[index],
+            freq_reassignment=data.freq_reassignment[index],
+            original_stft=data.original_stft[index],
+            frequencies=data.frequencies,
+            times=data.times,
+            instantaneous_frequency=data.instantaneous_frequency[index],
+            group_delay=data.group_delay[index]
+        )
+    
+    def _attack_result(self, reassigned_data: ReassignedSpectrogramData) -> TFRAnalysisResult:
+        """Attack characteristics from an onset window's reassigned spectrogram"""
+        
         # Compute spectral flux
         spectral_flux = self._compute_spectral_flux(reassigned_data.reassigned_stft)
         
@@ -58,6 +58,9 @@ class MVSepService:
     # Network settings
     MAX_RETRIES = 3
     RETRY_DELAY = 2.0
+    MAX_CONNECTIONS = 10
+    MAX_CONCURRENT_DOWNLOADS = 4
+    DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
     def __init__(self, api_key: str, base_url: str = "https://mvsep.com/api"):
         """
@@ -136,18 +139,23 @@ class MVSepService:
         else:
             self._resource_stats["gpu_available"] = False
 
-    async def _get_session(self):
-        """Get or create aiohttp session"""
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Get or create the service's pooled aiohttp session.
+
+        Uploads, status checks and stem downloads of a processing run share
+        its connections; the session is closed when the run finishes.
+        The API token travels in the upload form, so no auth header is set
+        (download links may point at other hosts).
+        """
         if self._session is None or self._session.closed:
-            connector = aiohttp.TCPConnector(limit=10)
-            timeout = aiohttp.ClientTimeout(total=300)
+            connector = aiohttp.TCPConnector(limit=self.MAX_CONNECTIONS)
+            # No total limit: large stems stream for longer than any fixed cap
+            timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=300)
             self._session = aiohttp.ClientSession(
                 connector=connector,
                 timeout=timeout,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "User-Agent": "DrumTracKAI MVSep Client/1.0"
-                }
+                headers={"User-Agent": "DrumTracKAI MVSep Client/1.0"}
             )
         return self._session
 
@@ -377,7 +385,7 @@ class MVSepService:
         
         try:
             # Real MVSep API upload using correct endpoint from documentation
-            upload_url = "https://mvsep.com/api/separation/create"
+            upload_url = f"{self.base_url}/separation/create"
             
             # Create multipart form data using correct MVSep API parameters
             data = aiohttp.FormData()
@@ -390,28 +398,28 @@ class MVSepService:
             with open(file_path, 'rb') as audio_file:
                 data.add_field('audiofile', audio_file, filename=os.path.basename(file_path), content_type='audio/mpeg')
                 
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(upload_url, data=data) as response:
-                        if response.status != 200:
-                            error_text = await response.text()
-                            raise Exception(f"MVSep API upload failed: {response.status} - {error_text}")
+                session = await self._get_session()
+                async with session.post(upload_url, data=data) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        raise Exception(f"MVSep API upload failed: {response.status} - {error_text}")
+                    
+                    result = await response.json()
+                    
+                    # MVSep API returns success response with hash in data
+                    if result.get('success') is True:
+                        # Extract hash from the response data
+                        data = result.get('data', {})
+                        job_hash = data.get('hash')
                         
-                        result = await response.json()
+                        if not job_hash:
+                            raise Exception("MVSep API did not return a hash in the response")
                         
-                        # MVSep API returns success response with hash in data
-                        if result.get('success') is True:
-                            # Extract hash from the response data
-                            data = result.get('data', {})
-                            job_hash = data.get('hash')
-                            
-                            if not job_hash:
-                                raise Exception("MVSep API did not return a hash in the response")
-                            
-                            logger.info(f"Successfully uploaded to MVSep API. Hash: {job_hash}")
-                            return job_hash
-                        else:
-                            error_msg = result.get('error', 'Unknown error')
-                            raise Exception(f"MVSep API upload failed: {error_msg}")
+                        logger.info(f"Successfully uploaded to MVSep API. Hash: {job_hash}")
+                        return job_hash
+                    else:
+                        error_msg = result.get('error', 'Unknown error')
+                        raise Exception(f"MVSep API upload failed: {error_msg}")
                         
         except Exception as e:
             logger.error(f"Error uploading to MVSep API: {str(e)}")
@@ -434,75 +442,80 @@ class MVSepService:
         
         try:
             # Use correct MVSep API endpoint for getting results
-            status_url = "https://mvsep.com/api/separation/get"
+            status_url = f"{self.base_url}/separation/get"
             
-            async with aiohttp.ClientSession() as session:
-                # Monitor job status
-                for check_num in range(max_checks):
-                    if self._cancelled:
-                        logger.info(f"{job_type} job {job_id} cancelled by user")
-                        break
+            session = await self._get_session()
+            # Monitor job status
+            for check_num in range(max_checks):
+                if self._cancelled:
+                    logger.info(f"{job_type} job {job_id} cancelled by user")
+                    break
+                
+                # Check job status using correct parameters
+                async with session.get(status_url, params={'hash': job_id}) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        raise Exception(f"MVSep status check failed: {response.status} - {error_text}")
+                    
+                    status_data = await response.json()
+                    status = status_data.get('status')
+                    progress = status_data.get('progress', 0)
                     
-                    # Check job status using correct parameters
-                    async with session.get(status_url, params={'hash': job_id}) as response:
-                        if response.status != 200:
-                            error_text = await response.text()
-                            raise Exception(f"MVSep status check failed: {response.status} - {error_text}")
+                    if progress_callback:
+                        progress_callback(progress / 100.0, f"{job_type}: {status} ({progress}%)")
+                    
+                    if status == 'done':
+                        # Download results - MVSep API provides download links in the response
+                        if progress_callback:
+                            progress_callback(0.95, f"{job_type}: Downloading results")
                         
-                        status_data = await response.json()
-                        status = status_data.get('status')
-                        progress = status_data.get('progress', 0)
+                        # Extract download links from the correct MVSep API format
+                        data = status_data.get('data', {})
+                        files_list = data.get('files', [])
                         
-                        if progress_callback:
-                            progress_callback(progress / 100.0, f"{job_type}: {status} ({progress}%)")
+                        if not files_list:
+                            logger.error(f"No files found in MVSep response. Full response: {status_data}")
+                            raise Exception(f"No files found in MVSep response. Available keys: {list(status_data.keys())}")
                         
-                        if status == 'done':
-                            # Download results - MVSep API provides download links in the response
-                            if progress_callback:
-                                progress_callback(0.95, f"{job_type}: Downloading results")
-                            
-                            # Extract download links from the correct MVSep API format
-                            data = status_data.get('data', {})
-                            files_list = data.get('files', [])
-                            
-                            if not files_list:
-                                logger.error(f"No files found in MVSep response. Full response: {status_data}")
-                                raise Exception(f"No files found in MVSep response. Available keys: {list(status_data.keys())}")
-                            
-                            # Convert files list to download_links dict mapping stem type to URL
-                            download_links = {}
-                            for file_info in files_list:
-                                stem_type = file_info.get('type', '').lower()
-                                download_url = file_info.get('url')
-                                
-                                if stem_type and download_url:
-                                    download_links[stem_type] = download_url
-                                    logger.info(f"Found {stem_type} stem: {download_url}")
+                        # Convert files list to download_links dict mapping stem type to file info
+                        # (URL plus size/md5 when the API provides them, for verification)
+                        download_links = {}
+                        for file_info in files_list:
+                            stem_type = file_info.get('type', '').lower()
+                            download_url = file_info.get('url')
                             
-                            if not download_links:
-                                logger.error(f"No valid download URLs found in files list: {files_list}")
-                                raise Exception("No valid download URLs found in MVSep files")
-                            
-                            logger.info(f"Successfully extracted {len(download_links)} download links: {list(download_links.keys())}")
-                            return await self._download_stems_from_links(session, download_links, output_dir, job_type)
+                            if stem_type and download_url:
+                                download_links[stem_type] = file_info
+                                logger.info(f"Found {stem_type} stem: {download_url}")
+                        
+                        if not download_links:
+                            logger.error(f"No valid download URLs found in files list: {files_list}")
+                            raise Exception("No valid download URLs found in MVSep files")
                         
-                        elif status == 'failed':
-                            error_msg = status_data.get('error', 'Unknown error')
-                            raise Exception(f"MVSep processing failed: {error_msg}")
+                        logger.info(f"Successfully extracted {len(download_links)} download links: {list(download_links.keys())}")
+                        return await self._download_stems_from_links(session, download_links, output_dir, job_type)
                     
-                    await asyncio.sleep(check_interval)
-                
-                raise Exception(f"{job_type} job timed out after {max_wait_time} seconds")
+                    elif status == 'failed':
+                        error_msg = status_data.get('error', 'Unknown error')
+                        raise Exception(f"MVSep processing failed: {error_msg}")
                 
+                await asyncio.sleep(check_interval)
+            
+            raise Exception(f"{job_type} job timed out after {max_wait_time} seconds")
+            
         except Exception as e:
             logger.error(f"Error monitoring MVSep job {job_id}: {str(e)}")
             raise
     
     async def _download_stems_from_links(self, session: aiohttp.ClientSession, download_links: Dict, output_dir: str, job_type: str) -> Dict[str, str]:
-        """Download real audio stems from MVSep API using download links - NO SIMULATION"""
+        """
+        Download real audio stems from MVSep API using download links - NO SIMULATION
+
+        Up to MAX_CONCURRENT_DOWNLOADS stems download at once, each streamed
+        to disk. download_links maps stem names to a URL or a file info dict
+        with 'url' and optional 'size'/'md5'. Stems that fail are skipped.
+        """
         try:
-            result_files = {}
-            
             logger.info(f"Starting {job_type} stem downloads to: {output_dir}")
             logger.info(f"Found {len(download_links)} download links: {list(download_links.keys())}")
             
@@ -510,68 +523,136 @@ class MVSepService:
             os.makedirs(output_dir, exist_ok=True)
             logger.info(f"Output directory created/verified: {output_dir}")
             
-            # Download each stem file from the provided links
-            for stem_name, download_url in download_links.items():
-                if not download_url:
-                    logger.warning(f"Empty download URL for {stem_name}, skipping")
-                    continue
-                    
-                logger.info(f"[{job_type}] Downloading {stem_name} stem from: {download_url}")
+            semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_DOWNLOADS)
+            
+            async def download(stem_name: str, link: Any) -> Tuple[str, Optional[str]]:
+                file_info = link if isinstance(link, dict) else {'url': link}
+                # Save the audio file with job_type prefix for DrumSep
+                if job_type == "DrumSep":
+                    stem_filename = f"drumsep_{stem_name}.wav"
+                else:
+                    stem_filename = f"{stem_name}.wav"
+                stem_path = os.path.join(output_dir, stem_filename)
                 
-                try:
-                    async with session.get(download_url) as response:
-                        if response.status != 200:
-                            logger.error(f"[{job_type}] Failed to download {stem_name}: HTTP {response.status}")
-                            continue
-                        
-                        # Get content length for logging
-                        content_length = response.headers.get('content-length', 'unknown')
-                        logger.info(f"[{job_type}] Response for {stem_name}: {response.status}, Content-Length: {content_length}")
-                        
-                        # Save the audio file with job_type prefix for DrumSep
-                        if job_type == "DrumSep":
-                            stem_filename = f"drumsep_{stem_name}.wav"
-                        else:
-                            stem_filename = f"{stem_name}.wav"
-                        
-                        stem_path = os.path.join(output_dir, stem_filename)
-                        logger.info(f"[{job_type}] Saving {stem_name} to: {stem_path}")
-                        
-                        audio_content = await response.read()
-                        with open(stem_path, 'wb') as f:
-                            f.write(audio_content)
-                        
-                        # Verify file was written successfully
-                        if os.path.exists(stem_path):
-                            file_size = os.path.getsize(stem_path)
-                            logger.info(f"[{job_type}] Successfully downloaded {stem_name} stem: {stem_path} ({file_size} bytes)")
-                            result_files[stem_name] = stem_path
-                        else:
-                            logger.error(f"[{job_type}] File was not created: {stem_path}")
-                            
-                except Exception as download_error:
-                    logger.error(f"[{job_type}] Error downloading {stem_name}: {str(download_error)}")
+                async with semaphore:
+                    logger.info(f"[{job_type}] Downloading {stem_name} stem from: {file_info['url']}")
+                    try:
+                        await self._download_stem(session, file_info, stem_path, f"[{job_type}] {stem_name}")
+                        return stem_name, stem_path
+                    except Exception as download_error:
+                        logger.error(f"[{job_type}] Error downloading {stem_name}: {str(download_error)}")
+                        return stem_name, None
+            
+            downloads = []
+            for stem_name, link in download_links.items():
+                url = link.get('url') if isinstance(link, dict) else link
+                if not url:
+                    logger.warning(f"Empty download URL for {stem_name}, skipping")
                     continue
+                downloads.append(download(stem_name, link))
+            
+            result_files = {stem_name: stem_path
+                            for stem_name, stem_path in await asyncio.gather(*downloads) if stem_path}
             
             logger.info(f"[{job_type}] Download completed. Successfully downloaded {len(result_files)} stems: {list(result_files.keys())}")
             
             if not result_files:
                 raise Exception(f"No {job_type} audio stems could be downloaded from MVSep")
             
-            # Final verification of all downloaded files
-            for stem_name, stem_path in result_files.items():
-                if os.path.exists(stem_path):
-                    file_size = os.path.getsize(stem_path)
-                    logger.info(f"[{job_type}] Final verification - {stem_name}: {stem_path} ({file_size} bytes) ")
-                else:
-                    logger.error(f"[{job_type}] Final verification - {stem_name}: {stem_path} MISSING ")
-            
             return result_files
                 
         except Exception as e:
             logger.error(f"Error downloading stems from links: {str(e)}")
             raise
 
+    async def _download_stem(self, session: aiohttp.ClientSession, file_info: Dict, stem_path: str, label: str):
+        """
+        Stream one stem to stem_path, retrying up to MAX_RETRIES times.
+
+        Data goes to a '.part' file that is renamed once complete and
+        verified. A transfer cut short leaves the part in place and the next
+        attempt (or a later run) resumes it with a Range request; a part that
+        fails verification is discarded.
+        """
+        part_path = stem_path + '.part'
+        for attempt in range(1, self.MAX_RETRIES + 1):
+            try:
+                await self._stream_to_part(session, file_info, part_path, label)
+                os.replace(part_path, stem_path)
+                logger.info(f"{label}: downloaded {stem_path} ({os.path.getsize(stem_path)} bytes)")
+                return
+            except Exception as e:
+                if self._cancelled or attempt == self.MAX_RETRIES:
+                    raise
+                resumable = os.path.exists(part_path)
+                logger.warning(f"{label}: attempt {attempt} failed ({e}), "
+                               f"{'resuming' if resumable else 'retrying'} in {self.RETRY_DELAY * attempt}s")
+                await asyncio.sleep(self.RETRY_DELAY * attempt)
+
+    async def _stream_to_part(self, session: aiohttp.ClientSession, file_info: Dict, part_path: str, label: str):
+        """Fetch the rest of a stem into part_path, then verify its size and checksum"""
+        expected_size = file_info.get('size')
+        expected_size = int(expected_size) if expected_size else None
+        expected_md5 = (file_info.get('md5') or '').lower() or None
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        md5 = hashlib.md5()
+        total = expected_size
+
+        if offset and offset == expected_size:
+            # Completed by an earlier run that stopped before the rename
+            await self._hash_file(part_path, md5)
+        else:
+            headers = {'Range': f'bytes={offset}-'} if offset else {}
+            async with session.get(file_info['url'], headers=headers) as response:
+                if response.status == 206:
+                    # Content-Range: bytes <start>-<end>/<total or *>
+                    content_range = response.headers.get('Content-Range', '')
+                    span, _, length = content_range.partition(' ')[2].partition('/')
+                    if not span.startswith(f'{offset}-'):
+                        os.remove(part_path)
+                        raise Exception(f"Unexpected Content-Range '{content_range}' for offset {offset}")
+                    if length.isdigit():
+                        total = int(length)
+                    logger.info(f"{label}: resuming at byte {offset}")
+                    await self._hash_file(part_path, md5)
+                    mode = 'ab'
+                elif response.status == 200:
+                    # Full body (no Range sent, or the server ignored it)
+                    if response.content_length is not None:
+                        total = response.content_length
+                    mode = 'wb'
+                else:
+                    if response.status == 416 and offset:
+                        os.remove(part_path)
+                    raise Exception(f"HTTP {response.status}")
+
+                async with aiofiles.open(part_path, mode) as f:
+                    async for chunk in response.content.iter_chunked(self.DOWNLOAD_CHUNK_SIZE):
+                        if self._cancelled:
+                            raise Exception("Download cancelled")
+                        md5.update(chunk)
+                        await f.write(chunk)
+
+        size = os.path.getsize(part_path)
+        if total is not None and size < total:
+            # Cut short: keep the part for resuming
+            raise Exception(f"Incomplete download: {size} of {total} bytes")
+        if (expected_size is not None and size != expected_size) or (total is not None and size != total):
+            os.remove(part_path)
+            raise Exception(f"Size mismatch: got {size} bytes, expected {expected_size or total}")
+        if expected_md5 and md5.hexdigest() != expected_md5:
+            os.remove(part_path)
+            raise Exception(f"Checksum mismatch: md5 {md5.hexdigest()}, expected {expected_md5}")
+
+    async def _hash_file(self, path: str, md5):
+        """Feed an existing (partial) file into an md5 hash"""
+        async with aiofiles.open(path, 'rb') as f:
+            while True:
+                chunk = await f.read(self.DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                md5.update(chunk)
+
     async def cancel_processing(self):
         """Cancel any active processing jobs"""
         self._cancelled = True
@@ -579,17 +660,15 @@ class MVSepService:
         await self._cleanup_jobs()
 
     async def _cleanup_jobs(self):
-        """Clean up any active jobs"""
-        if not self._active_jobs:
-            return
-
-        logger.info(f"Cleaning up {len(self._active_jobs)} active jobs")
-        self._active_jobs.clear()
+        """Clean up any active jobs and close the run's session"""
+        if self._active_jobs:
+            logger.info(f"Cleaning up {len(self._active_jobs)} active jobs")
+            self._active_jobs.clear()
 
-        # Close session if it exists
+        # Close session if it exists (it belongs to the run's event loop)
         if self._session and not self._session.closed:
             await self._session.close()
-            self._session = None
+        self._session = None
 
     def get_status(self) -> Dict:
         """Get service status"""
@@ -57,10 +57,12 @@ class DrumTracKAI_TFR_Integration:
         
         logger.info(f"Refining {len(initial_onsets)} onsets with TFR analysis...")
         refined_onsets = []
+        tfr_results = self._analyze_attacks(audio, initial_onsets, window_size=0.03)
         
-        for onset in initial_onsets:
+        for onset, tfr_analysis in zip(initial_onsets, tfr_results):
             try:
-                tfr_analysis = self.tfr_analyzer.analyze_drum_attack(audio, onset, window_size=0.03)
+                if tfr_analysis is None:
+                    tfr_analysis = self.tfr_analyzer.analyze_drum_attack(audio, onset, window_size=0.03)
                 refined_time = onset + tfr_analysis.attack_time
                 refined_onsets.append(refined_time)
             except Exception as e:
@@ -69,6 +71,15 @@ class DrumTracKAI_TFR_Integration:
         
         return np.array(refined_onsets)
     
+    def _analyze_attacks(self, audio: np.ndarray, onsets: np.ndarray,
+                         window_size: float = 0.05) -> List[Optional[TFRAnalysisResult]]:
+        """Batched TFR attack analysis; [None] * n if the batch fails (callers retry per hit)"""
+        try:
+            return self.tfr_analyzer.analyze_drum_attacks(audio, list(onsets), window_size=window_size)
+        except Exception as e:
+            logger.warning(f"Batched TFR analysis failed, analysing hits one by one: {e}")
+            return [None] * len(onsets)
+    
     def analyze_enhanced_drum_hits(self, audio: np.ndarray, refined_onsets: np.ndarray,
                                  bass_onsets: np.ndarray = None,
                                  drum_type: str = "unknown") -> List[EnhancedDrumHit]:
@@ -76,11 +87,13 @@ class DrumTracKAI_TFR_Integration:
         
         logger.info(f"Analyzing {len(refined_onsets)} drum hits with TFR enhancement...")
         enhanced_hits = []
+        tfr_results = self._analyze_attacks(audio, refined_onsets)
         
-        for onset_time in refined_onsets:
+        for onset_time, tfr_analysis in zip(refined_onsets, tfr_results):
             try:
                 # Perform TFR analysis
-                tfr_analysis = self.tfr_analyzer.analyze_drum_attack(audio, onset_time)
+                if tfr_analysis is None:
+                    tfr_analysis = self.tfr_analyzer.analyze_drum_attack(audio, onset_time)
                 
                 # Extract basic features
                 hit_features = self._extract_basic_hit_features(audio, onset_time)